@@ -0,0 +1,102 @@
+"""
+Benchmark for DownloadSession
+
+Measures the per-item setup cost that DownloadSession saves compared with
+calling download_instagram_video once per URL: importing yt-dlp, building
+options (including the ffmpeg lookup), parsing the cookies file and
+creating/closing a YoutubeDL instance.
+
+By default no network is touched - only the setup path is timed. Pass
+--url to also time real end-to-end downloads of the same URL.
+
+Usage:
+    python scripts/bench_session.py --items 200 --cookies cookies.txt
+    python scripts/bench_session.py --items 5 --url https://www.instagram.com/reel/ID/
+"""
+
+import argparse
+import importlib.util
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from src.downloader import (  # noqa: E402
+    DownloadSession,
+    build_ydl_options,
+    download_instagram_video,
+)
+
+
+def bench_setup_per_item(items: int, output_dir: str, cookies_file: str | None) -> float:
+    """Old behaviour: full setup and teardown for every item."""
+    start = time.perf_counter()
+    for _ in range(items):
+        from yt_dlp import YoutubeDL  # type: ignore
+
+        with YoutubeDL(build_ydl_options(output_dir, cookies_file)):
+            pass
+    return time.perf_counter() - start
+
+
+def bench_setup_session(items: int, output_dir: str, cookies_file: str | None) -> float:
+    """DownloadSession: setup once, then only the per-call output override."""
+    start = time.perf_counter()
+    with DownloadSession(output_dir, cookies_file) as session:
+        for i in range(items):
+            session._set_output_dir(os.path.join(output_dir, str(i % 4)))
+    return time.perf_counter() - start
+
+
+def bench_downloads(url: str, items: int, output_dir: str, cookies_file: str | None) -> tuple[float, float]:
+    per_item_dir = os.path.join(output_dir, "per_item")
+    session_dir = os.path.join(output_dir, "session")
+
+    start = time.perf_counter()
+    for i in range(items):
+        download_instagram_video(url, os.path.join(per_item_dir, str(i)), cookies_file)
+    per_item = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with DownloadSession(session_dir, cookies_file) as session:
+        for i in range(items):
+            session.download(url, output_dir=os.path.join(session_dir, str(i)))
+    session_time = time.perf_counter() - start
+    return per_item, session_time
+
+
+def print_row(label: str, per_item: float, session: float, items: int) -> None:
+    saved_ms = (per_item - session) / items * 1000
+    print(f"{label}")
+    print(f"  per-item setup : {per_item / items * 1000:8.2f} ms/item ({per_item:.3f}s total)")
+    print(f"  DownloadSession: {session / items * 1000:8.2f} ms/item ({session:.3f}s total)")
+    print(f"  saved          : {saved_ms:8.2f} ms/item")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark DownloadSession against per-item setup")
+    parser.add_argument("--items", type=int, default=100, help="Number of items to simulate (default: 100)")
+    parser.add_argument("--cookies", dest="cookies_file", default=None, help="Cookies file to include in the setup cost")
+    parser.add_argument("--url", default=None, help="Optional real URL to time end-to-end downloads")
+    args = parser.parse_args()
+
+    if importlib.util.find_spec("yt_dlp") is None:
+        print("Error: yt-dlp is not installed. Run: pip install -r scripts/requirements.txt", file=sys.stderr)
+        sys.exit(2)
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        per_item = bench_setup_per_item(args.items, output_dir, args.cookies_file)
+        session = bench_setup_session(args.items, output_dir, args.cookies_file)
+        print("=" * 60)
+        print_row(f"Setup overhead over {args.items} items", per_item, session, args.items)
+
+        if args.url:
+            per_item, session = bench_downloads(args.url, args.items, output_dir, args.cookies_file)
+            print_row(f"End-to-end downloads of {args.url}", per_item, session, args.items)
+        print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
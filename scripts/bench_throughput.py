@@ -0,0 +1,395 @@
+"""
+Throughput benchmark against a local fake Instagram server
+
+Starts an HTTP stand-in on 127.0.0.1 that serves synthetic media files and a
+profile feed, with configurable latency, bandwidth and injected 429
+responses, and drives the real download entry points against it:
+
+    single   download_instagram_video, once per URL
+    batch    download_videos_from_excel, with a CSV list of URLs
+    profile  download_profile_videos, with the server's RSS profile feed
+
+Each scenario runs in a fresh process so that peak RSS is measured per
+scenario. Nothing leaves the machine, so the numbers are reproducible and
+the benchmark can run offline in CI. Results are written as JSON; pass
+--compare to print the change against an earlier run.
+
+Usage:
+    python scripts/bench_throughput.py
+    python scripts/bench_throughput.py --items 200 --jobs 8 --latency-ms 80 --throttle 0.02
+    python scripts/bench_throughput.py --scenarios batch --output new.json --compare old.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+SCENARIOS = ("single", "batch", "profile")
+PROFILE_NAME = "benchuser"
+MEDIA_PATH = re.compile(r"^/p/(?P<id>[A-Za-z0-9_-]+)/(?P=id)\.mp4$")
+CHUNK_SIZE = 64 * 1024
+
+
+class FakeInstagramServer(ThreadingHTTPServer):
+    """
+    Local stand-in for Instagram.
+
+    Routes:
+        /p/<id>/<id>.mp4    synthetic video of `media_size` bytes
+        /<profile>/         RSS feed listing `items` videos, newest first
+
+    Every response is delayed by `latency` seconds and media bodies are sent
+    at `bandwidth` bytes/s per connection. A `throttle` fraction of requests
+    is answered with 429 and a Retry-After header. Injection is driven by a
+    seeded RNG, so a run with the same settings sees the same responses.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        items: int,
+        media_size: int,
+        latency: float = 0.0,
+        bandwidth: Optional[float] = None,
+        throttle: float = 0.0,
+        retry_after: float = 1.0,
+        seed: int = 1,
+    ) -> None:
+        super().__init__(("127.0.0.1", 0), FakeRequestHandler)
+        self.items = items
+        self.media_size = media_size
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.throttle = throttle
+        self.retry_after = retry_after
+        self._payload = random.Random(seed).randbytes(CHUNK_SIZE)
+        self._seed = seed
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def media_ids(self, prefix: str = "B") -> List[str]:
+        return [f"{prefix}{i:06d}" for i in range(self.items)]
+
+    def media_url(self, media_id: str) -> str:
+        return f"{self.base_url}/p/{media_id}/{media_id}.mp4"
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._rng = random.Random(self._seed)
+            self.requests = 0
+            self.throttled = 0
+            self.bytes_sent = 0
+            self.first_request: Dict[str, float] = {}
+            self.completed: Dict[str, float] = {}
+
+    def should_throttle(self) -> bool:
+        with self._lock:
+            self.requests += 1
+            if self.throttle and self._rng.random() < self.throttle:
+                self.throttled += 1
+                return True
+            return False
+
+    def media_requested(self, media_id: str) -> None:
+        with self._lock:
+            self.first_request.setdefault(media_id, time.monotonic())
+
+    def media_sent(self, media_id: str, size: int) -> None:
+        with self._lock:
+            self.bytes_sent += size
+            self.completed[media_id] = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        """Server-side view of a run; latency is first request to last body byte per item."""
+        with self._lock:
+            latencies = sorted(
+                self.completed[media_id] - start
+                for media_id, start in self.first_request.items()
+                if media_id in self.completed
+            )
+            return {
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "bytes_sent": self.bytes_sent,
+                "latencies": latencies,
+            }
+
+
+class FakeRequestHandler(BaseHTTPRequestHandler):
+    server: FakeInstagramServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def do_HEAD(self) -> None:
+        self._handle(send_body=False)
+
+    def do_GET(self) -> None:
+        self._handle(send_body=True)
+
+    def _handle(self, send_body: bool) -> None:
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        if server.should_throttle():
+            self._send_headers(429, "text/plain", 0, {"Retry-After": f"{server.retry_after:g}"})
+            return
+
+        path = self.path.split("?", 1)[0]
+        match = MEDIA_PATH.match(path)
+        if match:
+            self._send_media(match.group("id"), send_body)
+        elif path.strip("/") == PROFILE_NAME:
+            body = self._feed().encode("utf-8")
+            self._send_headers(200, "application/rss+xml", len(body))
+            if send_body:
+                self.wfile.write(body)
+        else:
+            self._send_headers(404, "text/plain", 0)
+
+    def _send_headers(self, status: int, content_type: str, length: int, extra: Optional[Dict[str, str]] = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(length))
+        for key, value in (extra or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+
+    def _send_media(self, media_id: str, send_body: bool) -> None:
+        server = self.server
+        server.media_requested(media_id)
+        self._send_headers(200, "video/mp4", server.media_size, {"Accept-Ranges": "none"})
+        if not send_body:
+            return
+        remaining = server.media_size
+        try:
+            while remaining > 0:
+                chunk = server._payload[: min(CHUNK_SIZE, remaining)]
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+                if server.bandwidth:
+                    time.sleep(len(chunk) / server.bandwidth)
+        except (BrokenPipeError, ConnectionResetError):
+            # yt-dlp probes direct links with a GET and drops the connection
+            return
+        server.media_sent(media_id, server.media_size)
+
+    def _feed(self) -> str:
+        server = self.server
+        now = time.time()
+        items = []
+        for index, media_id in enumerate(server.media_ids("P")):
+            items.append(
+                f"<item><title>{media_id}</title><link>{server.media_url(media_id)}</link>"
+                f"<guid>{media_id}</guid><pubDate>{formatdate(now - index * 3600)}</pubDate></item>"
+            )
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+            f"<title>{PROFILE_NAME}</title><link>{server.base_url}/{PROFILE_NAME}/</link>"
+            + "".join(items)
+            + "</channel></rss>"
+        )
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _run_scenario(name: str, urls: List[str], profile_url: str, jobs: int, rate: float, result_queue: Any) -> None:
+    """Child process: run one scenario and report duration, outcome counts and peak RSS."""
+    sys.path.insert(0, ROOT)
+    import src.page_downloader as page_downloader
+    from src.downloader import download_instagram_video, download_videos_from_excel, _silent_progress_hook
+    from src.ratelimit import configure_rate_limiter
+
+    configure_rate_limiter(rate, rate)
+    # Profile URLs are only accepted on instagram.com; let the local feed through
+    real_extract_username = page_downloader.extract_username_from_url
+    page_downloader.extract_username_from_url = (
+        lambda url: PROFILE_NAME if url == profile_url else real_extract_username(url)
+    )
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        start = time.perf_counter()
+        if name == "single":
+            codes = [download_instagram_video(url, output_dir, None, _silent_progress_hook) for url in urls]
+            success = sum(1 for code in codes if code == 0)
+            failed = len(codes) - success
+        elif name == "batch":
+            url_list = os.path.join(output_dir, "urls.csv")
+            with open(url_list, "w", encoding="utf-8") as f:
+                f.write("url\n" + "\n".join(urls) + "\n")
+            summary = download_videos_from_excel(url_list, output_dir, None, jobs=jobs)
+            success, failed = summary["success"], summary["failed"]
+        else:
+            results = page_downloader.download_profile_videos(
+                profile_url, output_dir, None, max_videos=len(urls), custom_progress_hook=_silent_progress_hook
+            )
+            success, failed = results["success"], results["failed"]
+        duration = time.perf_counter() - start
+
+    result_queue.put({"duration": duration, "success": success, "failed": failed, "peak_rss_mb": _peak_rss_mb()})
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    index = min(len(values) - 1, max(0, int(round(fraction * (len(values) - 1)))))
+    return values[index]
+
+
+def run_benchmark(server: FakeInstagramServer, name: str, jobs: int, rate: float) -> Dict[str, Any]:
+    server.reset_stats()
+    urls = [server.media_url(media_id) for media_id in server.media_ids("B" if name != "single" else "S")]
+    if name == "single":
+        # One process per call is slow; a tenth of the items is enough to time the per-call path
+        urls = urls[: max(1, len(urls) // 10)]
+    profile_url = f"{server.base_url}/{PROFILE_NAME}/"
+
+    context = multiprocessing.get_context("spawn")
+    result_queue = context.Queue()
+    process = context.Process(target=_run_scenario, args=(name, urls, profile_url, jobs, rate, result_queue))
+    process.start()
+    outcome = result_queue.get()
+    process.join()
+
+    stats = server.stats()
+    duration = outcome["duration"]
+    latencies = stats["latencies"]
+    return {
+        "items": len(urls),
+        "success": outcome["success"],
+        "failed": outcome["failed"],
+        "duration_s": round(duration, 3),
+        "items_per_s": round(outcome["success"] / duration, 3) if duration else None,
+        "mb_per_s": round(stats["bytes_sent"] / (1024 * 1024) / duration, 3) if duration else None,
+        "latency_p50_s": round(percentile(latencies, 0.50), 3) if latencies else None,
+        "latency_p95_s": round(percentile(latencies, 0.95), 3) if latencies else None,
+        "peak_rss_mb": outcome["peak_rss_mb"],
+        "requests": stats["requests"],
+        "throttled": stats["throttled"],
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> None:
+    print("=" * 78)
+    print(f"{'scenario':<10}{'items/s':>10}{'MB/s':>10}{'p50 s':>10}{'p95 s':>10}{'RSS MB':>10}{'ok/fail':>12}{'429s':>6}")
+    for name, row in results["scenarios"].items():
+        print(
+            f"{name:<10}{row['items_per_s'] or 0:>10.2f}{row['mb_per_s'] or 0:>10.2f}"
+            f"{row['latency_p50_s'] or 0:>10.3f}{row['latency_p95_s'] or 0:>10.3f}{row['peak_rss_mb']:>10.1f}"
+            f"{str(row['success']) + '/' + str(row['failed']):>12}{row['throttled']:>6}"
+        )
+        old = (baseline or {}).get("scenarios", {}).get(name)
+        if old:
+            changes = []
+            for key in ("items_per_s", "mb_per_s", "latency_p95_s", "peak_rss_mb"):
+                if old.get(key) and row.get(key) is not None:
+                    changes.append(f"{key} {(row[key] - old[key]) / old[key] * 100:+.1f}%")
+            print(f"{'':<10}vs {baseline.get('commit') or 'baseline'}: " + ", ".join(changes))
+    print("=" * 78)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark downloads against a local fake Instagram server")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma-separated subset of {', '.join(SCENARIOS)}")
+    parser.add_argument("--items", type=int, default=50, help="Videos per batch/profile scenario (default: 50)")
+    parser.add_argument("--media-kb", type=int, default=512, help="Size of each synthetic video in KB (default: 512)")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Added latency per request (default: 20)")
+    parser.add_argument("--bandwidth-kbps", type=float, default=0, help="Per-connection bandwidth in KB/s (default: unlimited)")
+    parser.add_argument("--throttle", type=float, default=0.0, help="Fraction of requests answered with 429 (default: 0)")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After sent with 429 responses (default: 1)")
+    parser.add_argument("-j", "--jobs", type=int, default=4, help="Parallel downloads for the batch scenario (default: 4)")
+    parser.add_argument("--rate", type=float, default=100.0,
+                        help="Request rate limit in req/s, high so the server settings dominate (default: 100)")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for payloads and 429 injection (default: 1)")
+    parser.add_argument("--output", default=None, help="Write results JSON here (default: bench-results/<time>.json)")
+    parser.add_argument("--compare", default=None, help="Earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    try:
+        import yt_dlp  # type: ignore
+    except ImportError:
+        print("Error: yt-dlp is not installed. Run: pip install -r scripts/requirements.txt", file=sys.stderr)
+        sys.exit(2)
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    server = FakeInstagramServer(
+        items=args.items,
+        media_size=args.media_kb * 1024,
+        latency=args.latency_ms / 1000,
+        bandwidth=args.bandwidth_kbps * 1024 or None,
+        throttle=args.throttle,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+    threading.Thread(target=server.serve_forever, name="fake-instagram", daemon=True).start()
+
+    results: Dict[str, Any] = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "yt_dlp": getattr(getattr(yt_dlp, "version", None), "__version__", None),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "scenarios": {},
+    }
+    try:
+        for name in scenarios:
+            print(f"Running {name}...")
+            results["scenarios"][name] = run_benchmark(server, name, args.jobs, args.rate)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+
+    output = args.output or os.path.join("bench-results", time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
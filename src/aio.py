@@ -0,0 +1,232 @@
+"""
+asyncio API for embedding the downloader in async services.
+
+The blocking yt-dlp work still runs on threads, but a single event loop can
+drive hundreds of in-flight jobs: waiting jobs only hold a semaphore slot,
+progress arrives as an async iterator and every job can be cancelled.
+
+Usage:
+    async with AsyncDownloader("downloads", max_workers=8) as downloader:
+        events = ProgressEvents()
+        task = asyncio.create_task(downloader.gather(urls, events=events))
+        async for event in events.until(task):
+            print(event["url"], event["status"])
+        codes = task.result()
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional
+
+from .archive import DownloadArchive
+from .downloader import DownloadSession
+from .page_downloader import download_profile_videos
+
+
+_EVENT_KEYS = ("status", "downloaded_bytes", "total_bytes", "total_bytes_estimate", "speed", "eta", "filename")
+_CLOSED = object()
+
+
+class DownloadCancelled(BaseException):
+    """
+    Raised inside a worker thread to abort a cancelled download.
+
+    Derives from BaseException so the `except Exception` blocks of the batch
+    loops and of yt-dlp do not swallow it and carry on with the next item.
+    """
+
+
+class ProgressEvents:
+    """
+    Async iterator of progress events coming from worker threads.
+
+    Each event is a small dict with the yt-dlp progress fields plus 'url'
+    (single downloads) or 'current'/'total'/'current_video' (profile
+    progress). Events are pushed thread-safely onto the loop's queue.
+    """
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        self._loop = loop or asyncio.get_running_loop()
+        self._queue: "asyncio.Queue[Any]" = asyncio.Queue()
+
+    def push(self, event: Dict[str, Any]) -> None:
+        """Publish an event; safe to call from any thread."""
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, event)
+
+    def close(self) -> None:
+        """End the iteration once already queued events are consumed."""
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, _CLOSED)
+
+    def __aiter__(self) -> "ProgressEvents":
+        return self
+
+    async def __anext__(self) -> Dict[str, Any]:
+        event = await self._queue.get()
+        if event is _CLOSED:
+            raise StopAsyncIteration
+        return event
+
+    async def until(self, awaitable: "asyncio.Future[Any]") -> AsyncIterator[Dict[str, Any]]:
+        """Yield events until `awaitable` (usually a task) is done, then drain what is left."""
+        awaitable.add_done_callback(lambda _: self.close())
+        async for event in self:
+            yield event
+
+
+class AsyncDownloader:
+    """
+    Awaitable, cancellable front end for DownloadSession and download_profile_videos.
+
+    At most `max_workers` downloads run at the same time, each on a worker
+    thread that keeps its own warm DownloadSession.
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        cookies_file: Optional[str] = None,
+        max_workers: int = 8,
+        archive: Optional[DownloadArchive] = None,
+    ) -> None:
+        self.output_dir = output_dir
+        self.cookies_file = cookies_file
+        self.archive = archive
+        self.max_workers = max(1, max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="aio-download")
+        self._thread_state = threading.local()
+        self._sessions: List[DownloadSession] = []
+        self._lock = threading.Lock()
+
+    async def __aenter__(self) -> "AsyncDownloader":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+        with self._lock:
+            for session in self._sessions:
+                session.close()
+            self._sessions.clear()
+
+    def _session(self) -> DownloadSession:
+        session = getattr(self._thread_state, "session", None)
+        if session is None:
+            session = DownloadSession(self.output_dir, self.cookies_file, archive=self.archive).open()
+            self._thread_state.session = session
+            with self._lock:
+                self._sessions.append(session)
+        return session
+
+    def _make_hook(
+        self,
+        cancel: threading.Event,
+        events: Optional[ProgressEvents],
+        extra: Dict[str, Any],
+    ) -> Callable[[Dict[str, Any]], None]:
+        def hook(status: Dict[str, Any]) -> None:
+            if cancel.is_set():
+                raise DownloadCancelled(extra.get("url", ""))
+            if events is not None:
+                event = {key: status[key] for key in _EVENT_KEYS if key in status}
+                event.update(extra)
+                events.push(event)
+
+        return hook
+
+    async def _run(self, cancel: threading.Event, func: Callable[..., Any], *args: Any) -> Any:
+        future = asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        try:
+            return await future
+        except asyncio.CancelledError:
+            # The worker thread aborts at its next progress callback
+            cancel.set()
+            raise
+
+    async def download(
+        self,
+        url: str,
+        output_dir: Optional[str] = None,
+        events: Optional[ProgressEvents] = None,
+    ) -> int:
+        """
+        Download one URL.
+
+        Returns:
+            0 on success, 1 on failure (same codes as download_instagram_video)
+
+        Raises:
+            asyncio.CancelledError: If the awaiting task is cancelled
+        """
+        cancel = threading.Event()
+        hook = self._make_hook(cancel, events, {"url": url})
+
+        def run() -> int:
+            return self._session().download(url, output_dir=output_dir, custom_progress_hook=hook)
+
+        return await self._run(cancel, run)
+
+    async def download_profile(
+        self,
+        profile_url: str,
+        max_videos: int = 50,
+        events: Optional[ProgressEvents] = None,
+        sync: bool = False,
+    ) -> Dict[str, Any]:
+        """Download a profile; returns the same results dict as download_profile_videos."""
+        cancel = threading.Event()
+        hook = self._make_hook(cancel, events, {"url": profile_url})
+
+        def progress_callback(current: int, total: int, current_video: str) -> None:
+            if cancel.is_set():
+                raise DownloadCancelled(profile_url)
+            if events is not None:
+                events.push({
+                    "status": "page_progress",
+                    "url": profile_url,
+                    "current": current,
+                    "total": total,
+                    "current_video": current_video,
+                })
+
+        return await self._run(
+            cancel,
+            lambda: download_profile_videos(
+                profile_url,
+                self.output_dir,
+                self.cookies_file,
+                max_videos,
+                progress_callback,
+                archive=self.archive,
+                sync=sync,
+                custom_progress_hook=hook,
+            ),
+        )
+
+    async def gather(
+        self,
+        urls: Iterable[str],
+        limit: Optional[int] = None,
+        events: Optional[ProgressEvents] = None,
+    ) -> List[int]:
+        """
+        Download many URLs, with at most `limit` (default: max_workers) in flight.
+
+        Returns the exit codes in input order. Cancelling the gathering task
+        cancels every pending and running download.
+        """
+        semaphore = asyncio.Semaphore(limit or self.max_workers)
+
+        async def guarded(url: str) -> int:
+            async with semaphore:
+                return await self.download(url, events=events)
+
+        tasks = [asyncio.ensure_future(guarded(url)) for url in urls]
+        try:
+            return list(await asyncio.gather(*tasks))
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
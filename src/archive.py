@@ -0,0 +1,281 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Set
+
+from .urls import extract_post_shortcode
+
+
+ARCHIVE_FILENAME = ".download_archive.sqlite3"
+
+MEDIA_EXTENSIONS = {".mp4", ".webm", ".mkv", ".mov", ".m4a", ".mp3", ".jpg", ".jpeg", ".png", ".webp"}
+
+_SHORTCODE_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+def default_archive_path(output_dir: str) -> str:
+    """Archive file used when only an output directory is given."""
+    return os.path.join(output_dir, ARCHIVE_FILENAME)
+
+
+def extract_shortcode(url: str) -> Optional[str]:
+    """Extract the post shortcode from an Instagram post/reel URL, or None for other URLs."""
+    return extract_post_shortcode(url)
+
+
+def shortcode_from_filename(filename: str) -> Optional[str]:
+    """
+    Recover the shortcode from a file named with the `%(uploader)s_%(id)s.%(ext)s` template.
+
+    Both uploader names and shortcodes may contain underscores, so the split
+    is ambiguous. Current shortcodes are 11 characters long, so that length
+    is tried first; otherwise the text after the last underscore is used.
+    """
+    stem, ext = os.path.splitext(filename)
+    if ext.lower() not in MEDIA_EXTENSIONS:
+        return None
+    # Skip unmerged format streams such as "user_ID.f137.mp4"
+    if re.search(r"\.f[0-9a-zA-Z-]+$", stem):
+        return None
+    if len(stem) > 12 and stem[-12] == "_" and _SHORTCODE_RE.match(stem[-11:]):
+        return stem[-11:]
+    if "_" in stem:
+        candidate = stem.rsplit("_", 1)[1]
+        if candidate and _SHORTCODE_RE.match(candidate):
+            return candidate
+    return None
+
+
+class DownloadArchive:
+    """
+    Persistent index of already downloaded posts, keyed by shortcode.
+
+    Rows are stored in SQLite (path, size, timestamp) so reruns can skip
+    finished posts before any network request. All known shortcodes are also
+    kept in an in-memory set, so lookups are O(1) and never touch the disk.
+    One instance can be shared by all worker threads; writes are serialized
+    with a lock, and SQLite's WAL mode keeps other processes safe as well.
+
+    The same database keeps the per-profile watermarks used by incremental
+    profile syncs, the checkpoints of windowed profile listings, and the
+    posts that failed permanently (removed, missing, unsupported) so later
+    runs do not try them again.
+    """
+
+    def __init__(self, path: str) -> None:
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS downloads (
+                shortcode TEXT PRIMARY KEY,
+                path TEXT,
+                size INTEGER,
+                downloaded_at REAL
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS watermarks (
+                username TEXT PRIMARY KEY,
+                newest_id TEXT,
+                upload_date TEXT,
+                recent_ids TEXT,
+                synced_at REAL
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS failures (
+                shortcode TEXT PRIMARY KEY,
+                error_class TEXT,
+                error TEXT,
+                failed_at REAL
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS listing_checkpoints (
+                username TEXT PRIMARY KEY,
+                next_index INTEGER,
+                updated_at REAL
+            )
+            """
+        )
+        self._conn.commit()
+        self._known: Set[str] = {row[0] for row in self._conn.execute("SELECT shortcode FROM downloads")}
+        self._failed: Set[str] = {row[0] for row in self._conn.execute("SELECT shortcode FROM failures")}
+
+    def __enter__(self) -> "DownloadArchive":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._known)
+
+    def __contains__(self, shortcode: object) -> bool:
+        return shortcode in self._known
+
+    def contains_url(self, url: str) -> bool:
+        shortcode = extract_shortcode(url)
+        return bool(shortcode) and shortcode in self._known
+
+    def get(self, shortcode: str) -> Optional[Dict[str, Any]]:
+        if shortcode not in self._known:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT shortcode, path, size, downloaded_at FROM downloads WHERE shortcode = ?",
+                (shortcode,),
+            ).fetchone()
+        if not row:
+            return None
+        return {"shortcode": row[0], "path": row[1], "size": row[2], "downloaded_at": row[3]}
+
+    def add(self, shortcode: Optional[str], path: Optional[str] = None, size: Optional[int] = None) -> None:
+        """Record a finished download. The file size is read from disk when not given."""
+        if not shortcode:
+            return
+        if size is None and path and os.path.exists(path):
+            size = os.path.getsize(path)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO downloads (shortcode, path, size, downloaded_at) VALUES (?, ?, ?, ?)",
+                (shortcode, path, size, time.time()),
+            )
+            self._conn.execute("DELETE FROM failures WHERE shortcode = ?", (shortcode,))
+            self._conn.commit()
+            self._known.add(shortcode)
+            self._failed.discard(shortcode)
+
+    def has_failed(self, shortcode: Optional[str]) -> bool:
+        """True when the post failed permanently in an earlier run."""
+        return bool(shortcode) and shortcode in self._failed
+
+    def get_failure(self, shortcode: str) -> Optional[Dict[str, Any]]:
+        if shortcode not in self._failed:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT error_class, error, failed_at FROM failures WHERE shortcode = ?", (shortcode,)
+            ).fetchone()
+        if not row:
+            return None
+        return {"shortcode": shortcode, "error_class": row[0], "error": row[1], "failed_at": row[2]}
+
+    def add_failure(self, shortcode: Optional[str], error_class: str, error: Any = None) -> None:
+        """Record a permanent failure; the post is skipped by later runs until clear_failures()."""
+        if not shortcode:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO failures (shortcode, error_class, error, failed_at) VALUES (?, ?, ?, ?)",
+                (shortcode, error_class, str(error)[:300] if error else None, time.time()),
+            )
+            self._conn.commit()
+            self._failed.add(shortcode)
+
+    def clear_failures(self) -> int:
+        """Forget all recorded permanent failures. Returns how many there were."""
+        with self._lock:
+            count = self._conn.execute("DELETE FROM failures").rowcount
+            self._conn.commit()
+            self._failed.clear()
+        return count
+
+    def get_watermark(self, username: str) -> Optional[Dict[str, Any]]:
+        """Newest post seen by the last profile sync of `username`, or None if never synced."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT newest_id, upload_date, recent_ids, synced_at FROM watermarks WHERE username = ?",
+                (username.lower(),),
+            ).fetchone()
+        if not row:
+            return None
+        return {
+            "newest_id": row[0],
+            "upload_date": row[1],
+            "recent_ids": json.loads(row[2] or "[]"),
+            "synced_at": row[3],
+        }
+
+    def set_watermark(self, username: str, watermark: Dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO watermarks (username, newest_id, upload_date, recent_ids, synced_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    username.lower(),
+                    watermark.get("newest_id"),
+                    watermark.get("upload_date"),
+                    json.dumps(watermark.get("recent_ids") or []),
+                    time.time(),
+                ),
+            )
+            self._conn.commit()
+
+    def get_listing_checkpoint(self, username: str) -> Optional[int]:
+        """Listing index an interrupted windowed listing of `username` resumes at, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT next_index FROM listing_checkpoints WHERE username = ?", (username.lower(),)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_listing_checkpoint(self, username: str, next_index: Optional[int]) -> None:
+        """Record where the windowed listing of `username` would resume; None once it has been listed to the end."""
+        with self._lock:
+            if next_index is None:
+                self._conn.execute("DELETE FROM listing_checkpoints WHERE username = ?", (username.lower(),))
+            else:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO listing_checkpoints (username, next_index, updated_at) VALUES (?, ?, ?)",
+                    (username.lower(), next_index, time.time()),
+                )
+            self._conn.commit()
+
+    def rebuild_from_directory(self, root_dir: str) -> int:
+        """
+        Scan an existing output tree and index every media file found.
+
+        Returns:
+            Number of files indexed
+        """
+        rows = []
+        for dirpath, _dirnames, filenames in os.walk(root_dir):
+            for filename in filenames:
+                shortcode = shortcode_from_filename(filename)
+                if not shortcode:
+                    continue
+                full_path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(full_path)
+                except OSError:
+                    continue
+                rows.append((shortcode, full_path, stat.st_size, stat.st_mtime))
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO downloads (shortcode, path, size, downloaded_at) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+            self._known.update(row[0] for row in rows)
+        return len(rows)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,258 @@
+import re
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+PRIORITIES = (INTERACTIVE, BULK)
+
+# Share of the link bulk downloads keep while an interactive download runs
+DEFAULT_BULK_SHARE = 0.1
+# Longest a bulk download waits to start while interactive downloads are running
+BULK_START_DEFER = 30.0
+# Tokens a bucket may bank, in seconds of its rate
+BURST_SECONDS = 1.0
+# Longest single sleep, so limit changes take effect quickly
+MAX_SLEEP = 0.5
+
+_RATE_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([kmg]?)i?b?(?:/s)?\s*$", re.IGNORECASE)
+_RATE_UNITS = {"": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+
+
+def parse_rate(text: str) -> int:
+    """
+    Parse a rate such as "500K", "2.5M" or "1048576" into bytes/s.
+
+    Returns:
+        Bytes per second; 0 means unlimited
+
+    Raises:
+        ValueError: If the text is not a rate
+    """
+    match = _RATE_RE.match(str(text))
+    if not match:
+        raise ValueError(f"invalid rate: {text!r} (expected e.g. 500K, 2M)")
+    return int(float(match.group(1)) * _RATE_UNITS[match.group(2).lower()])
+
+
+class _Bucket:
+    """Token bucket that may go into debt; the caller sleeps the debt off."""
+
+    __slots__ = ("rate", "tokens", "last")
+
+    def __init__(self) -> None:
+        self.rate = 0.0
+        self.tokens = 0.0
+        self.last = time.monotonic()
+
+    def take(self, nbytes: int, now: float) -> float:
+        """Seconds the caller has to wait for `nbytes` at the current rate (0 when unlimited)."""
+        if self.rate <= 0:
+            self.tokens = 0.0
+            self.last = now
+            return 0.0
+        self.tokens = min(self.rate * BURST_SECONDS, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+        self.tokens -= nbytes
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+
+class BandwidthGovernor:
+    """
+    Process-wide bandwidth cap shared by every concurrent download.
+
+    yt-dlp calls progress hooks from the download loop after every chunk,
+    so sleeping in the hook throttles that download. Each class
+    (interactive, bulk) has its own token bucket whose rate is derived from
+    the limits: without interactive downloads bulk gets the whole cap (or
+    `bulk_rate`); while one runs bulk is held to `bulk_share` of the link
+    and interactive downloads get the rest. When no cap is set the link
+    capacity is estimated from the observed throughput. Bulk downloads also
+    hold back their next start for up to BULK_START_DEFER seconds while
+    interactive downloads are running.
+
+    Limits can be changed at any time with `set_limits`.
+    """
+
+    def __init__(self, rate: int = 0, bulk_rate: int = 0, bulk_share: float = DEFAULT_BULK_SHARE) -> None:
+        self.rate = 0
+        self.bulk_rate = 0
+        self.bulk_share = DEFAULT_BULK_SHARE
+        self.bytes = {priority: 0 for priority in PRIORITIES}
+        self.waited_seconds = {priority: 0.0 for priority in PRIORITIES}
+        self._active = {priority: 0 for priority in PRIORITIES}
+        self._buckets = {priority: _Bucket() for priority in PRIORITIES}
+        self._capacity = 0.0
+        self._window_start = time.monotonic()
+        self._window_bytes = 0
+        self._cond = threading.Condition()
+        self.set_limits(rate, bulk_rate, bulk_share)
+
+    def set_limits(
+        self, rate: Optional[int] = None, bulk_rate: Optional[int] = None, bulk_share: Optional[float] = None
+    ) -> None:
+        """
+        Change the limits; running downloads pick them up with their next chunk.
+
+        Args:
+            rate: Aggregate cap in bytes/s for all downloads (0 = unlimited)
+            bulk_rate: Cap in bytes/s for bulk downloads alone (0 = only the aggregate cap)
+            bulk_share: Fraction of the link bulk downloads keep while an interactive one runs
+        """
+        with self._cond:
+            if rate is not None:
+                self.rate = max(0, int(rate))
+            if bulk_rate is not None:
+                self.bulk_rate = max(0, int(bulk_rate))
+            if bulk_share is not None:
+                self.bulk_share = min(1.0, max(0.01, bulk_share))
+            self._update_rates()
+
+    def _update_rates(self) -> None:
+        interactive, bulk = self._buckets[INTERACTIVE], self._buckets[BULK]
+        if self._active[INTERACTIVE]:
+            link = self.rate or self._capacity
+            limits = [r for r in (self.bulk_rate, link * self.bulk_share) if r]
+            bulk.rate = float(min(limits)) if limits else 0.0
+            interactive.rate = max(1.0, self.rate - bulk.rate) if self.rate else 0.0
+        else:
+            limits = [r for r in (self.rate, self.bulk_rate) if r]
+            bulk.rate = float(min(limits)) if limits else 0.0
+            interactive.rate = float(self.rate)
+
+    def start(self, priority: str) -> "Transfer":
+        """Register a download of class `priority`; bulk downloads defer to running interactive ones first."""
+        if priority not in PRIORITIES:
+            raise ValueError(f"priority must be one of {', '.join(PRIORITIES)}")
+        with self._cond:
+            if priority == BULK and self._active[INTERACTIVE]:
+                deadline = time.monotonic() + BULK_START_DEFER
+                while self._active[INTERACTIVE] and time.monotonic() < deadline:
+                    self._cond.wait(deadline - time.monotonic())
+            self._active[priority] += 1
+            self._update_rates()
+        return Transfer(self, priority)
+
+    def _finish(self, priority: str) -> None:
+        with self._cond:
+            self._active[priority] -= 1
+            self._update_rates()
+            self._cond.notify_all()
+
+    def consume(self, nbytes: int, priority: str) -> float:
+        """
+        Account `nbytes` received by a download and sleep until the class is back under its rate.
+
+        Returns:
+            Seconds slept
+        """
+        if nbytes <= 0:
+            return 0.0
+        with self._cond:
+            now = time.monotonic()
+            self.bytes[priority] += nbytes
+            self._measure(nbytes, now)
+            delay = self._buckets[priority].take(nbytes, now)
+        waited = 0.0
+        while delay > 0:
+            step = min(delay, MAX_SLEEP)
+            time.sleep(step)
+            waited += step
+            with self._cond:
+                # A raised or removed limit shortens the remaining wait
+                delay = self._buckets[priority].take(0, time.monotonic())
+        if waited:
+            with self._cond:
+                self.waited_seconds[priority] += waited
+        return waited
+
+    def _measure(self, nbytes: int, now: float) -> None:
+        """Track the aggregate throughput; its recent peak stands in for the link capacity."""
+        self._window_bytes += nbytes
+        elapsed = now - self._window_start
+        if elapsed >= 1.0:
+            throughput = self._window_bytes / elapsed
+            # Hold the estimate while bulk downloads are being held back on purpose
+            decay = 1.0 if self._active[INTERACTIVE] else 0.9
+            self._capacity = max(self._capacity * decay, throughput)
+            self._window_start = now
+            self._window_bytes = 0
+            if not self.rate:
+                self._update_rates()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Limits, current class rates and totals, for logs and metrics."""
+        with self._cond:
+            return {
+                "rate": self.rate,
+                "bulk_rate": self.bulk_rate,
+                "bulk_share": self.bulk_share,
+                "capacity_estimate": int(self._capacity),
+                "active": dict(self._active),
+                "class_rates": {priority: int(bucket.rate) for priority, bucket in self._buckets.items()},
+                "bytes": dict(self.bytes),
+                "waited_seconds": {priority: round(waited, 2) for priority, waited in self.waited_seconds.items()},
+            }
+
+
+class Transfer:
+    """
+    One download's handle on the governor.
+
+    Feed it the download's progress callbacks; it turns the cumulative
+    `downloaded_bytes` of each file into increments for the governor. The
+    first callback of a file only sets its baseline: a resumed download
+    starts counting at the bytes already on disk, which were not received
+    now.
+    """
+
+    def __init__(self, governor: BandwidthGovernor, priority: str) -> None:
+        self.governor = governor
+        self.priority = priority
+        self._offsets: Dict[str, int] = {}
+        self._closed = False
+
+    def __enter__(self) -> "Transfer":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def on_progress(self, status: Dict[str, Any]) -> None:
+        if status.get("status") != "downloading":
+            return
+        path = status.get("tmpfilename") or status.get("filename") or ""
+        downloaded = status.get("downloaded_bytes") or 0
+        previous = self._offsets.get(path)
+        self._offsets[path] = downloaded
+        if previous is not None and downloaded > previous:
+            self.governor.consume(downloaded - previous, self.priority)
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self.governor._finish(self.priority)
+
+
+_governor: Optional[BandwidthGovernor] = None
+_governor_lock = threading.Lock()
+
+
+def get_bandwidth_governor() -> BandwidthGovernor:
+    """Process-wide governor shared by every download session (unlimited until configured)."""
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            _governor = BandwidthGovernor()
+        return _governor
+
+
+def configure_bandwidth(
+    rate: Optional[int] = None, bulk_rate: Optional[int] = None, bulk_share: Optional[float] = None
+) -> BandwidthGovernor:
+    """Set the limits of the process-wide governor, e.g. from command-line options or the GUI."""
+    governor = get_bandwidth_governor()
+    governor.set_limits(rate, bulk_rate, bulk_share)
+    return governor
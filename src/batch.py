@@ -0,0 +1,130 @@
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from queue import Empty, Full, Queue
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+
+class BoundedWorkerPool:
+    """
+    Thread pool that keeps at most `jobs` tasks in flight.
+
+    Items are pulled from the input iterable lazily, so a long (or endless)
+    source is never materialized up front. The number of tasks currently
+    running and the highest value reached are tracked for reporting.
+    """
+
+    def __init__(self, jobs: int = 1) -> None:
+        self.jobs = max(1, int(jobs))
+        self.active = 0
+        self.peak_active = 0
+        self._lock = threading.Lock()
+
+    def _track(self, func: Callable[[Any], Any], item: Any) -> Any:
+        with self._lock:
+            self.active += 1
+            if self.active > self.peak_active:
+                self.peak_active = self.active
+        try:
+            return func(item)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    def map_unordered(
+        self,
+        func: Callable[[Any], Any],
+        items: Iterable[Any],
+    ) -> Iterator[Tuple[Any, Any, Optional[BaseException]]]:
+        """
+        Run `func` over `items` and yield `(item, result, error)` as each task finishes.
+
+        A failing task never stops the others; its exception is returned in
+        the `error` slot and `result` is None. That includes cancellations
+        and interrupts (BaseExceptions), which callers re-raise rather than
+        count as failures (see retry.reraise_interrupt).
+        """
+        source = iter(items)
+        pending: Dict[Future, Any] = {}
+
+        def fill(executor: ThreadPoolExecutor) -> None:
+            while len(pending) < self.jobs:
+                try:
+                    item = next(source)
+                except StopIteration:
+                    return
+                pending[executor.submit(self._track, func, item)] = item
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            fill(executor)
+            while pending:
+                done: Set[Future]
+                done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                for future in done:
+                    item = pending.pop(future)
+                    error = future.exception()
+                    yield item, (None if error else future.result()), error
+                fill(executor)
+
+
+_END = object()
+
+
+def prefetch(items: Iterable[Any], buffer_size: int = 16) -> Iterator[Any]:
+    """
+    Consume `items` on a background thread, keeping at most `buffer_size` ready.
+
+    This turns a slow producer (such as a paginated listing) into a pipeline
+    stage: the consumer gets each item as soon as it is produced, while the
+    producer keeps working ahead but never more than `buffer_size` items,
+    so memory stays flat. Exceptions raised by the producer are re-raised in
+    the consumer. Closing the returned iterator stops the producer after the
+    item it is working on and closes `items`; a consumer that may stop early
+    (including on KeyboardInterrupt) must close it, e.g. in a finally block.
+    """
+    buffer: "Queue[Any]" = Queue(maxsize=max(1, buffer_size))
+    stop = threading.Event()
+    failure: List[BaseException] = []
+
+    def put(item: Any) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for item in items:
+                if not put(item):
+                    break
+        except BaseException as e:  # re-raised on the consumer side
+            failure.append(e)
+        finally:
+            close = getattr(items, "close", None)
+            if stop.is_set() and close is not None:
+                try:
+                    close()
+                except Exception:
+                    pass
+            put(_END)
+
+    producer = threading.Thread(target=produce, name="prefetch", daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _END:
+                break
+            yield item
+        if failure:
+            raise failure[0]
+    finally:
+        stop.set()
+        # Free the buffered items; the producer sees `stop` on its next put
+        while True:
+            try:
+                buffer.get_nowait()
+            except Empty:
+                break
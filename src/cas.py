@@ -0,0 +1,254 @@
+import hashlib
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+
+CAS_DIRNAME = ".cas"
+LINK_MODES = ("hardlink", "symlink")
+
+# Bytes a growing download must gain before the streaming hasher reads them
+HASH_READ_THRESHOLD = 1 << 20
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def default_store_path(output_dir: str) -> str:
+    return os.path.join(output_dir, CAS_DIRNAME)
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class _PartialHash:
+    __slots__ = ("digest", "offset")
+
+    def __init__(self) -> None:
+        self.digest = hashlib.sha256()
+        self.offset = 0
+
+
+class StreamingHasher:
+    """
+    SHA-256 of files while yt-dlp writes them, fed from progress callbacks.
+
+    The bytes are not hashed off the network stream: yt-dlp's downloaders
+    own the reads and writes (including resumed ranges and fragments) and
+    have no hook for the data itself. Instead each callback reads back only
+    the bytes appended since the previous read (at least
+    HASH_READ_THRESHOLD at a time), straight after they were written and
+    while they are still in the page cache, so the read-back costs memory
+    bandwidth rather than disk I/O. When the download finishes the digest is
+    ready; the finished file is not read again.
+    """
+
+    def __init__(self) -> None:
+        self._partial: Dict[str, _PartialHash] = {}
+        self._digests: Dict[str, Tuple[str, int]] = {}
+
+    def on_progress(self, status: Dict[str, Any]) -> None:
+        state = status.get("status")
+        if state == "downloading":
+            path = status.get("tmpfilename") or status.get("filename")
+            if not path:
+                return
+            downloaded = status.get("downloaded_bytes") or 0
+            partial = self._partial.get(path)
+            if partial is None or downloaded < partial.offset:
+                # New file, or the download restarted from scratch
+                partial = self._partial[path] = _PartialHash()
+            if downloaded - partial.offset >= HASH_READ_THRESHOLD:
+                self._read(partial, path, downloaded)
+        elif state == "finished":
+            filename = status.get("filename")
+            if not filename:
+                return
+            partial = self._partial.pop(filename + ".part", None) or self._partial.pop(filename, None)
+            if partial is None:
+                # Nothing was streamed (e.g. the file already existed)
+                return
+            try:
+                self._read(partial, filename, None)
+            except OSError:
+                return
+            self._digests[filename] = (partial.digest.hexdigest(), partial.offset)
+
+    def _read(self, partial: _PartialHash, path: str, end: Optional[int]) -> None:
+        with open(path, "rb") as f:
+            f.seek(partial.offset)
+            while end is None or partial.offset < end:
+                size = HASH_BLOCK_SIZE if end is None else min(HASH_BLOCK_SIZE, end - partial.offset)
+                block = f.read(size)
+                if not block:
+                    break
+                partial.digest.update(block)
+                partial.offset += len(block)
+
+    def moved(self, path: str, new_path: str) -> None:
+        """Keep the digest of a finished file that was renamed to `new_path`."""
+        streamed = self._digests.pop(path, None)
+        if streamed is not None:
+            self._digests[new_path] = streamed
+
+    def digest_for(self, path: str) -> Optional[str]:
+        """Streamed digest of `path`, if the file on disk is exactly what was streamed."""
+        streamed = self._digests.get(path)
+        if streamed is None:
+            return None
+        try:
+            return streamed[0] if os.path.getsize(path) == streamed[1] else None
+        except OSError:
+            return None
+
+
+class ContentStore:
+    """
+    Content-addressed store for downloaded media.
+
+    Each distinct file is kept once under `root/ab/cd/<sha256><ext>` and
+    linked into the normal output layout (hardlinks by default, symlinks on
+    request or when hardlinks are impossible). Known digests are kept in
+    memory, so duplicate detection is a dict lookup; the SQLite index in
+    the store directory records objects and links for space accounting.
+    """
+
+    def __init__(self, root: str, link_mode: str = "hardlink") -> None:
+        if link_mode not in LINK_MODES:
+            raise ValueError(f"link_mode must be one of {', '.join(LINK_MODES)}")
+        os.makedirs(root, exist_ok=True)
+        self.root = root
+        self.link_mode = link_mode
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(root, "index.sqlite3"), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS objects (
+                sha256 TEXT PRIMARY KEY,
+                object_path TEXT,
+                size INTEGER,
+                created_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS links (
+                path TEXT PRIMARY KEY,
+                sha256 TEXT,
+                size INTEGER,
+                linked_at REAL
+            );
+            """
+        )
+        self._conn.commit()
+        self._objects: Dict[str, str] = dict(self._conn.execute("SELECT sha256, object_path FROM objects").fetchall())
+
+    def __contains__(self, digest: str) -> bool:
+        return digest in self._objects
+
+    def object_path(self, digest: str, ext: str) -> str:
+        return os.path.join(self.root, digest[:2], digest[2:4], digest + ext)
+
+    def add(self, path: str, digest: Optional[str] = None) -> bool:
+        """
+        Move a finished download into the store and link it back to `path`.
+
+        Args:
+            path: Downloaded file
+            digest: SHA-256 from a StreamingHasher (hashed here if omitted)
+
+        Returns:
+            True if the content was already stored (the new copy was replaced by a link)
+        """
+        size = os.path.getsize(path)
+        digest = digest or hash_file(path)
+        now = time.time()
+        with self._lock:
+            existing = self._objects.get(digest)
+            if existing is not None and os.path.exists(existing):
+                duplicate = not os.path.samefile(existing, path)
+                if duplicate:
+                    os.remove(path)
+                    self._link(existing, path)
+            else:
+                duplicate = False
+                existing = self.object_path(digest, os.path.splitext(path)[1])
+                os.makedirs(os.path.dirname(existing), exist_ok=True)
+                os.replace(path, existing)
+                self._link(existing, path)
+                self._objects[digest] = existing
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO objects (sha256, object_path, size, created_at) VALUES (?, ?, ?, ?)",
+                    (digest, existing, size, now),
+                )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO links (path, sha256, size, linked_at) VALUES (?, ?, ?, ?)",
+                (os.path.abspath(path), digest, size, now),
+            )
+            self._conn.commit()
+        return duplicate
+
+    def _link(self, target: str, path: str) -> None:
+        if self.link_mode == "hardlink":
+            try:
+                os.link(target, path)
+                return
+            except OSError:
+                pass  # Other filesystem or no hardlink support; fall back to a symlink
+        try:
+            os.symlink(os.path.relpath(target, os.path.dirname(os.path.abspath(path))), path)
+        except OSError:
+            # No symlink permission (e.g. Windows without developer mode): keep a plain copy
+            shutil.copy2(target, path)
+
+    def stats(self) -> Dict[str, int]:
+        """Stored objects and bytes, linked files and bytes, and the bytes saved by deduplication."""
+        with self._lock:
+            objects, stored = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM objects").fetchone()
+            links, linked = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM links").fetchone()
+        return {
+            "objects": objects,
+            "stored_bytes": stored,
+            "files": links,
+            "linked_bytes": linked,
+            "saved_bytes": max(0, linked - stored),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def store_download(store: ContentStore, path: Optional[str], hasher: Optional[StreamingHasher]) -> bool:
+    """Add a finished download to the store; errors are reported and the file is left in place."""
+    if not path or not os.path.isfile(path) or os.path.islink(path):
+        return False
+    try:
+        return store.add(path, hasher.digest_for(path) if hasher is not None else None)
+    except OSError as e:
+        print(f"Warning: could not deduplicate {path}: {e}", file=sys.stderr)
+        return False
+
+
+_store: Optional[ContentStore] = None
+_store_lock = threading.Lock()
+
+
+def get_content_store() -> Optional[ContentStore]:
+    """The process-wide content store, or None when deduplication is off."""
+    return _store
+
+
+def configure_content_store(root: str, link_mode: str = "hardlink") -> ContentStore:
+    """Turn on content-addressed storage for every download session in this process."""
+    global _store
+    with _store_lock:
+        if _store is not None:
+            _store.close()
+        _store = ContentStore(root, link_mode)
+        return _store
@@ -1,19 +1,32 @@
 import argparse
 import os
 import sys
+from typing import List, Optional
 
-from .downloader import download_instagram_video
-from .page_downloader import download_profile_videos, print_download_summary, extract_username_from_url
+from .archive import DownloadArchive, default_archive_path
+from .bandwidth import DEFAULT_BULK_SHARE, configure_bandwidth, get_bandwidth_governor, parse_rate
+from .cas import LINK_MODES, ContentStore, configure_content_store, default_store_path
+from .client import forward_cli
+from .cookies import cookie_pools, get_cookie_pool, print_cookie_pool_summary
+from .downloader import download_instagram_video, download_videos_from_excel, iter_post_metadata
+from .journal import Job, JobJournal, cleanup_partial_files, default_journal_path
+from .metadata import MetadataFilter, export_metadata
+from .metrics import configure_metrics
+from .multi_profile import download_many_profiles, iter_profiles_metadata
+from .page_downloader import (
+    download_profile_videos,
+    extract_username_from_url,
+    format_failure_classes,
+    open_profile_listing,
+    print_download_summary,
+)
+from .ratelimit import configure_rate_limiter, get_rate_limiter
+from .report import ReportWriter, summarize_report
+from .sources import iter_urls
+from .watchdog import DEFAULT_MIN_SPEED, DEFAULT_STALL_TIMEOUT, SPEED_WINDOW, configure_watchdog
 
-try:
-    from .gui import DownloaderGUI  # type: ignore
-    GUI_AVAILABLE = True
-except Exception:
-    DownloaderGUI = None  # type: ignore
-    GUI_AVAILABLE = False
 
-
-def parse_args() -> argparse.Namespace:
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="Download Instagram videos using yt-dlp")
     parser.add_argument("url", nargs="?", help="Instagram video/Reel URL or profile URL")
     parser.add_argument(
@@ -28,30 +41,454 @@ def parse_args() -> argparse.Namespace:
         "--cookies",
         dest="cookies_file",
         default=None,
-        help="Path to cookies.txt file (optional, useful if login is required)",
+        help="Path to cookies.txt file, or a directory of cookies files to rotate between several accounts "
+        "(optional, useful if login is required)",
     )
     parser.add_argument(
         "--page",
         action="store_true",
         help="Download all videos from Instagram profile (use with profile URL)",
     )
+    parser.add_argument(
+        "--profiles",
+        dest="profiles_file",
+        default=None,
+        help="Download many profiles listed in a file (Excel/CSV/JSONL/text) under one --jobs budget",
+    )
     parser.add_argument(
         "--max-videos",
         type=int,
         default=50,
-        help="Maximum number of videos to download from profile (default: 50)",
+        help="Maximum number of videos to download per profile (default: 50; 0: the whole profile)",
+    )
+    parser.add_argument(
+        "--window-size",
+        type=int,
+        default=0,
+        metavar="N",
+        help="With an archive, checkpoint profile listings every N posts so that an interrupted "
+        "listing resumes at the oldest window with unfinished posts (default: 0, no checkpoint)",
+    )
+    parser.add_argument(
+        "--sync",
+        action="store_true",
+        help="With --page: only fetch posts newer than the previous sync (uses the download archive)",
+    )
+    parser.add_argument(
+        "--excel",
+        "--input",
+        dest="excel_file",
+        default=None,
+        help="Download every URL listed in an Excel/CSV/JSONL/text file ('-' for stdin) instead of a single URL",
+    )
+    parser.add_argument(
+        "--url-column",
+        default="url",
+        help="Name of the column (or JSON field) containing URLs (default: url)",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of downloads to run in parallel (default: 1)",
+    )
+    parser.add_argument(
+        "--archive",
+        nargs="?",
+        const="",
+        default=None,
+        help="Skip posts recorded in a download archive and record new ones "
+        "(default path: OUTPUT/.download_archive.sqlite3)",
+    )
+    parser.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help="Retry posts the download archive recorded as permanently failed (removed, missing, unsupported)",
+    )
+    parser.add_argument(
+        "--rebuild-archive",
+        action="store_true",
+        help="Rebuild the download archive by scanning the output directory, then exit",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=None,
+        help="Initial rate of page and API requests per second (media downloads are not counted); "
+        "adapts down on throttling and back up (default: 1)",
+    )
+    parser.add_argument(
+        "--max-rate",
+        type=float,
+        default=None,
+        help="Upper bound for the adaptive request rate (default: 5)",
+    )
+    parser.add_argument(
+        "--limit-rate",
+        type=parse_rate,
+        default=None,
+        metavar="RATE",
+        help="Total download bandwidth for all parallel downloads, e.g. 2M or 500K (default: unlimited)",
     )
+    parser.add_argument(
+        "--bulk-limit-rate",
+        type=parse_rate,
+        default=None,
+        metavar="RATE",
+        help="Bandwidth for batch/profile downloads alone; single URLs are not limited by it",
+    )
+    parser.add_argument(
+        "--bulk-share",
+        type=float,
+        default=None,
+        help=f"Share of the bandwidth batch downloads keep while a single URL downloads (default: {DEFAULT_BULK_SHARE})",
+    )
+    parser.add_argument(
+        "--stall-timeout",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="Abort and re-queue a transfer whose connection sends no data for this long "
+        f"(socket timeout, default: {DEFAULT_STALL_TIMEOUT:.0f}; 0: yt-dlp's default)",
+    )
+    parser.add_argument(
+        "--min-speed",
+        type=parse_rate,
+        default=None,
+        metavar="RATE",
+        help=f"Abort and re-queue a transfer slower than this over {SPEED_WINDOW:.0f}s, e.g. 10K "
+        f"(default: {DEFAULT_MIN_SPEED // 1024}K; 0: off)",
+    )
+    parser.add_argument(
+        "--report",
+        default=None,
+        metavar="FILE",
+        help="Write one line per finished item (url, id, path, bytes, duration, error) to FILE "
+        "as it completes; CSV for .csv, JSON lines otherwise",
+    )
+    parser.add_argument(
+        "--report-summary",
+        default=None,
+        metavar="FILE",
+        help="Print the summary of a report file (also while its run is still going), then exit",
+    )
+    parser.add_argument(
+        "--dedup",
+        nargs="?",
+        const="hardlink",
+        choices=LINK_MODES,
+        default=None,
+        help="Store identical videos once in OUTPUT/.cas and link them into place (default link: hardlink)",
+    )
+    parser.add_argument(
+        "--dedup-stats",
+        action="store_true",
+        help="Print the space saved by the content store in OUTPUT/.cas, then exit",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="Serve Prometheus metrics at http://127.0.0.1:PORT/metrics while running",
+    )
+    parser.add_argument(
+        "--event-log",
+        default=None,
+        help="Append one JSON line per downloaded item (phase timings, bytes, errors) to this file",
+    )
+    parser.add_argument(
+        "--journal",
+        default=None,
+        help="Job journal file for --excel/--page runs (default: OUTPUT/.jobs.sqlite3)",
+    )
+    parser.add_argument(
+        "--resume",
+        metavar="JOB_ID",
+        default=None,
+        help="Resume an interrupted --excel/--page job from the journal",
+    )
+    parser.add_argument(
+        "--filter",
+        dest="filter_expression",
+        default=None,
+        metavar="EXPR",
+        help="Only download videos whose metadata match this pandas expression, e.g. "
+        "\"duration < 60 and view_count > 10000\" or \"upload_date >= '2024-01-01'\" "
+        "(columns: profile, id, url, title, uploader, upload_date, duration, view_count)",
+    )
+    parser.add_argument(
+        "--export-metadata",
+        default=None,
+        metavar="FILE",
+        help="Write the metadata of the videos of URL --page, --profiles or --excel to FILE "
+        "(.parquet, .csv or .jsonl; --filter applies) without downloading, then exit",
+    )
+    parser.add_argument("--list-jobs", action="store_true", help="List the jobs recorded in the journal, then exit")
     parser.add_argument("--gui", action="store_true", help="Launch the graphical interface")
-    return parser.parse_args()
+    parser.add_argument(
+        "--no-daemon",
+        action="store_true",
+        help="Run in this process even if a download daemon is running (see src.daemon)",
+    )
+    parser.add_argument(
+        "--detach",
+        action="store_true",
+        help="With a running daemon: print the job ID and return without waiting for the job",
+    )
+    return parser
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    return build_parser().parse_args(argv)
+
+
+def open_archive(args: argparse.Namespace) -> DownloadArchive | None:
+    if args.archive is None and not (args.rebuild_archive or args.sync):
+        return None
+    return DownloadArchive(args.archive or default_archive_path(args.output_dir))
+
+
+# Options stored with a journaled job so that --resume can rebuild the run
+JOB_PARAM_KEYS = (
+    "url", "excel_file", "url_column", "output_dir", "cookies_file", "max_videos", "jobs", "page", "sync",
+    "filter_expression", "window_size", "archive", "dedup", "report",
+)
+
+
+def restore_job_params(args: argparse.Namespace) -> None:
+    """With --resume, replace the run's options by those stored with the job."""
+    if not args.resume:
+        return
+    with JobJournal(args.journal or default_journal_path(args.output_dir)) as journal:
+        job = journal.load_job(args.resume)
+        if job is None:
+            print(f"Error: job {args.resume} not found in {journal.path}", file=sys.stderr)
+            sys.exit(1)
+    for key, value in job.params.items():
+        setattr(args, key, value)
+
+
+def open_job(args: argparse.Namespace) -> Job | None:
+    """Create (or, with --resume, reload) the journaled job for batch modes."""
+    if args.profiles_file or not (args.resume or args.excel_file or args.page):
+        return None
+    journal = JobJournal(args.journal or default_journal_path(args.output_dir))
+    if not args.resume:
+        params = {key: getattr(args, key) for key in JOB_PARAM_KEYS}
+        job = journal.create_job("excel" if args.excel_file else "profile", params)
+        print(f"Job ID: {job.id} (resume with --resume {job.id})")
+        return job
+
+    # The job's options were restored by restore_job_params
+    job = journal.load_job(args.resume)
+    if job is None:
+        print(f"Error: job {args.resume} not found in {journal.path}", file=sys.stderr)
+        sys.exit(1)
+    if args.excel_file == "-":
+        print("Warning: the job read URLs from stdin; provide the same input again to resume it.", file=sys.stderr)
+    removed = cleanup_partial_files(args.output_dir, job.finished_urls, job.interrupted_urls)
+    print(
+        f"Resuming job {job.id}: {len(job.interrupted_urls)} interrupted item(s) re-queued, "
+        f"{removed} stale partial file(s) removed"
+    )
+    return job
+
+
+def open_filter(args: argparse.Namespace) -> Optional[MetadataFilter]:
+    if not args.filter_expression:
+        return None
+    try:
+        return MetadataFilter(args.filter_expression)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+def export_run(args: argparse.Namespace, video_filter: Optional[MetadataFilter]) -> None:
+    """Write the metadata of the videos the download options select, instead of downloading them."""
+    if args.profiles_file:
+        profile_urls = iter_urls(args.profiles_file, args.url_column)
+        videos = iter_profiles_metadata(profile_urls, args.max_videos, args.cookies_file, args.jobs)
+    elif args.excel_file:
+        videos = iter_post_metadata(iter_urls(args.excel_file, args.url_column), args.cookies_file, args.jobs)
+    elif args.url and args.page:
+        username = extract_username_from_url(args.url)
+        if not username:
+            print("Error: Invalid Instagram profile URL", file=sys.stderr)
+            sys.exit(1)
+        listing = open_profile_listing(args.url, args.max_videos, args.cookies_file)
+        videos = (dict(video_info, profile=username) for video_info in listing)
+    else:
+        print("Error: --export-metadata needs a profile URL with --page, --profiles or --excel", file=sys.stderr)
+        sys.exit(1)
+    print(f"Collecting metadata for {args.export_metadata}...")
+    try:
+        count = export_metadata(videos, args.export_metadata, video_filter)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"Metadata: {count} video(s) written to {args.export_metadata}")
+    if video_filter is not None:
+        print(f"Not matching the filter: {video_filter.rejected}")
+
+
+def print_dedup_summary(store: ContentStore) -> None:
+    stats = store.stats()
+    print(
+        f"Content store: {stats['files']} files, {stats['objects']} unique, "
+        f"{stats['stored_bytes'] / 1048576:.1f} MB stored, {stats['saved_bytes'] / 1048576:.1f} MB saved"
+    )
 
 
 def main() -> None:
     args = parse_args()
-    if args.gui or not args.url:
-        if not GUI_AVAILABLE:
+    # Before anything reads the options: a resumed job brings its own
+    restore_job_params(args)
+    if args.rate or args.max_rate:
+        configure_rate_limiter(args.rate or 1.0, args.max_rate)
+    if args.limit_rate is not None or args.bulk_limit_rate is not None or args.bulk_share is not None:
+        configure_bandwidth(args.limit_rate, args.bulk_limit_rate, args.bulk_share)
+    if args.stall_timeout is not None or args.min_speed is not None:
+        configure_watchdog(args.stall_timeout, args.min_speed)
+    if args.metrics_port is not None or args.event_log:
+        configure_metrics(args.metrics_port, args.event_log)
+
+    if args.report_summary:
+        summary = summarize_report(args.report_summary)
+        print_download_summary(summary, "", f"Report summary for {args.report_summary}")
+        return
+
+    if args.dedup_stats:
+        store = ContentStore(default_store_path(args.output_dir))
+        print_dedup_summary(store)
+        store.close()
+        return
+
+    if args.cookies_file and os.path.isdir(args.cookies_file):
+        try:
+            pool = get_cookie_pool(args.cookies_file)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        print(f"Cookie pool: {len(pool.accounts)} account(s) from {args.cookies_file}")
+
+    store = configure_content_store(default_store_path(args.output_dir), args.dedup) if args.dedup else None
+    report = ReportWriter(args.report) if args.report else None
+    try:
+        run(args, report)
+    finally:
+        if report is not None:
+            report.close()
+            print(f"Report: {report.items} item(s) written to {report.path}")
+        if store is not None:
+            print_dedup_summary(store)
+        for pool in cookie_pools():
+            print_cookie_pool_summary(pool)
+
+
+def run(args: argparse.Namespace, report: Optional[ReportWriter] = None) -> None:
+    if args.list_jobs:
+        with JobJournal(args.journal or default_journal_path(args.output_dir)) as journal:
+            for info in journal.list_jobs():
+                print(f"{info['job_id']}  {info['kind']:<8} {info['status']:<10} "
+                      f"{info['done']} done, {info['failed']} failed of {info['items']} items")
+        return
+
+    video_filter = open_filter(args)
+    archive = open_archive(args)
+
+    if archive is not None and args.retry_failed:
+        print(f"Cleared {archive.clear_failures()} permanently failed post(s) from {archive.path}")
+
+    if args.rebuild_archive:
+        count = archive.rebuild_from_directory(args.output_dir)
+        print(f"Indexed {count} files from {args.output_dir} into {archive.path} ({len(archive)} posts total)")
+        archive.close()
+        return
+
+    if args.export_metadata:
+        export_run(args, video_filter)
+        return
+
+    if args.gui or not (args.url or args.excel_file or args.profiles_file):
+        # Imported here so that command-line runs never pay for tkinter
+        try:
+            from .gui import DownloaderGUI
+            gui = DownloaderGUI()
+        except Exception:
             print("GUI is unavailable in this environment.", file=sys.stderr)
             sys.exit(3)
-        DownloaderGUI().run()
+        gui.run()
+        return
+
+    # Opened only for runs that go on to download, so no job is left "running" unrun
+    job = open_job(args)
+
+    if args.profiles_file:
+        print(f"Starting bulk download of profiles from {args.profiles_file} with {args.jobs} worker(s)...")
+        all_results = download_many_profiles(
+            args.profiles_file,
+            args.output_dir,
+            args.cookies_file,
+            args.max_videos,
+            jobs=args.jobs,
+            url_column=args.url_column,
+            archive=archive,
+            sync=args.sync,
+            report=report,
+            video_filter=video_filter,
+            window_size=args.window_size,
+        )
+        for username, results in all_results.items():
+            print_download_summary(results, username)
+        total_success = sum(r['success'] for r in all_results.values())
+        total_failed = sum(r['failed'] for r in all_results.values())
+        print(f"\nAll profiles: {len(all_results)} profiles, {total_success} downloaded, {total_failed} failed")
+        if total_failed > 0:
+            sys.exit(1)
+        return
+
+    if args.excel_file:
+        print(f"Starting batch download from {args.excel_file} with {args.jobs} worker(s)...")
+        results = download_videos_from_excel(
+            args.excel_file,
+            args.output_dir,
+            args.cookies_file,
+            args.url_column,
+            jobs=args.jobs,
+            archive=archive,
+            job=job,
+            report=report,
+            video_filter=video_filter,
+        )
+        print(f"\n✅ Successfully downloaded: {results['success']}")
+        print(f"❌ Failed downloads: {results['failed']}")
+        if results['skipped']:
+            print(f"⏭️  Already downloaded (skipped): {results['skipped']}")
+        if results['invalid']:
+            print(f"⚠️  Malformed rows skipped: {results['invalid']}")
+        if results['duplicates']:
+            print(f"🔁 Duplicate URLs collapsed: {results['duplicates']}")
+        if results.get('filtered_out'):
+            print(f"🔎 Not matching the filter: {results['filtered_out']}")
+        if results['stalls']:
+            print(f"🐌 Stalled transfers aborted: {results['stalls']}")
+        if results['deferred']:
+            print(f"⏳ Deferred retries: {results['deferred']}")
+        if results['failure_classes']:
+            print(f"Failures by class: {format_failure_classes(results['failure_classes'])}")
+        print(f"Peak parallel downloads: {results['peak_concurrency']}")
+        print(f"Rate limiter: {get_rate_limiter().snapshot()}")
+        bandwidth = get_bandwidth_governor()
+        if bandwidth.rate or bandwidth.bulk_rate:
+            print(f"Bandwidth: {bandwidth.snapshot()}")
+        for error in results["errors"]:
+            print(f"  • {error}", file=sys.stderr)
+        if results["error_count"] > len(results["errors"]):
+            print(f"  ... and {results['error_count'] - len(results['errors'])} more", file=sys.stderr)
+        if results['failed'] > 0:
+            sys.exit(1)
         return
 
     # Check if it's a profile URL and page mode is requested
@@ -66,7 +503,13 @@ def main() -> None:
             args.url,
             args.output_dir,
             args.cookies_file,
-            args.max_videos
+            args.max_videos,
+            archive=archive,
+            sync=args.sync,
+            job=job,
+            report=report,
+            video_filter=video_filter,
+            window_size=args.window_size,
         )
         
         print_download_summary(results, username)
@@ -76,11 +519,12 @@ def main() -> None:
             sys.exit(1)
     else:
         # Single video download
-        exit_code = download_instagram_video(args.url, args.output_dir, args.cookies_file)
+        exit_code = download_instagram_video(args.url, args.output_dir, args.cookies_file, archive=archive)
         sys.exit(exit_code)
 
 
 if __name__ == "__main__":
+    forwarded = forward_cli(sys.argv[1:])
+    if forwarded is not None:
+        sys.exit(forwarded)
     main()
-
-
@@ -0,0 +1,267 @@
+"""
+Thin client for the download daemon (see src.daemon).
+
+Only the standard library is imported here, so forwarding a command line
+to a running daemon costs no more than an HTTP round trip.
+
+Usage:
+    python -m src.client --list
+    python -m src.client --status JOB_ID [--wait 60]
+    python -m src.client --cancel JOB_ID
+"""
+
+import argparse
+import http.client
+import json
+import os
+import socket
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+DEFAULT_DAEMON_ADDRESS = "127.0.0.1:8765"
+# Overrides the daemon address; "off" disables forwarding
+DAEMON_ENV = "IGDL_DAEMON"
+# Access token of the running daemon, in a file only its user can read
+TOKEN_FILE_ENV = "IGDL_DAEMON_TOKEN_FILE"
+DEFAULT_TOKEN_FILE = os.path.join("~", ".igdl", "daemon.token")
+PROBE_TIMEOUT = 0.5
+FINAL_STATES = ("done", "failed", "cancelled")
+
+
+def daemon_address() -> Optional[str]:
+    address = os.environ.get(DAEMON_ENV, DEFAULT_DAEMON_ADDRESS).strip()
+    return None if address.lower() in ("", "off", "0", "no") else address
+
+
+def token_file() -> str:
+    return os.path.expanduser(os.environ.get(TOKEN_FILE_ENV) or DEFAULT_TOKEN_FILE)
+
+
+def read_token(path: Optional[str] = None) -> Optional[str]:
+    """The daemon's access token, or None when no daemon wrote one (or it is not ours to read)."""
+    try:
+        with open(path or token_file(), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def parse_address(address: str) -> Tuple[str, Any]:
+    """
+    Parse "HOST:PORT" or "unix:/path/to/socket".
+
+    Returns:
+        ("unix", path) or ("tcp", (host, port))
+    """
+    if address.startswith("unix:"):
+        return "unix", address[len("unix:"):]
+    host, _, port = address.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"invalid daemon address: {address!r} (expected HOST:PORT or unix:PATH)")
+    return "tcp", (host, int(port))
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: float) -> None:
+        super().__init__("localhost", timeout=timeout)
+        self._path = path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self._path)
+
+
+class DaemonError(Exception):
+    pass
+
+
+class DaemonClient:
+    """JSON calls to the daemon's job API, authenticated with the token from token_file()."""
+
+    def __init__(self, address: Optional[str] = None, timeout: float = 30.0, token: Optional[str] = None) -> None:
+        self.address = address or daemon_address() or DEFAULT_DAEMON_ADDRESS
+        self.timeout = timeout
+        self.token = token or read_token()
+        self._kind, self._target = parse_address(self.address)
+
+    def _connection(self, timeout: float) -> http.client.HTTPConnection:
+        if self._kind == "unix":
+            return _UnixHTTPConnection(self._target, timeout)
+        return http.client.HTTPConnection(*self._target, timeout=timeout)
+
+    def request(
+        self, method: str, path: str, body: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None
+    ) -> Tuple[int, Dict[str, Any]]:
+        """
+        Send one request.
+
+        Returns:
+            (HTTP status, decoded JSON body)
+
+        Raises:
+            OSError: If the daemon cannot be reached
+        """
+        connection = self._connection(timeout or self.timeout)
+        try:
+            payload = json.dumps(body).encode("utf-8") if body is not None else None
+            headers = {"Content-Type": "application/json"} if payload is not None else {}
+            if self.token:
+                headers["Authorization"] = f"Bearer {self.token}"
+            connection.request(method, path, payload, headers)
+            response = connection.getresponse()
+            data = response.read()
+            try:
+                return response.status, json.loads(data or b"{}")
+            except ValueError:
+                return response.status, {"error": data.decode("utf-8", "replace")[:300]}
+        except http.client.HTTPException as e:
+            raise OSError(f"bad response from daemon at {self.address}: {e}") from e
+        finally:
+            connection.close()
+
+    def _call(self, method: str, path: str, body: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None) -> Dict[str, Any]:
+        status, data = self.request(method, path, body, timeout)
+        if status >= 400:
+            raise DaemonError(data.get("error") or f"HTTP {status}")
+        return data
+
+    def health(self) -> Optional[Dict[str, Any]]:
+        """Daemon info, or None when no daemon answers at the address."""
+        try:
+            status, data = self.request("GET", "/health", timeout=PROBE_TIMEOUT)
+        except OSError:
+            return None
+        return data if status == 200 and data.get("service") == "igdl-daemon" else None
+
+    def submit(self, spec: Dict[str, Any]) -> Dict[str, Any]:
+        return self._call("POST", "/jobs", spec)
+
+    def status(self, job_id: str, wait: float = 0) -> Dict[str, Any]:
+        """Job state; with `wait`, the daemon answers when the job finishes or after `wait` seconds."""
+        path = f"/jobs/{job_id}" + (f"?wait={wait:g}" if wait else "")
+        return self._call("GET", path, timeout=self.timeout + wait)
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        return self._call("GET", "/jobs")["jobs"]
+
+    def cancel(self, job_id: str) -> Dict[str, Any]:
+        return self._call("POST", f"/jobs/{job_id}/cancel")
+
+    def wait(self, job_id: str, poll: float = 30.0) -> Dict[str, Any]:
+        while True:
+            job = self.status(job_id, wait=poll)
+            if job["status"] in FINAL_STATES:
+                return job
+
+
+def print_job_result(job: Dict[str, Any]) -> None:
+    result = job.get("result") or {}
+    if job["status"] == "cancelled":
+        print(f"Job {job['id']} cancelled")
+    elif job["kind"] == "url":
+        if job["code"] == 0:
+            print(f"✅ Downloaded: {result.get('path') or job['spec'].get('url')}")
+        else:
+            print(f"❌ Download failed: {job.get('error') or result.get('error') or 'see daemon log'}", file=sys.stderr)
+    else:
+        print(f"\n✅ Successfully downloaded: {result.get('success', 0)}")
+        print(f"❌ Failed downloads: {result.get('failed', 0)}")
+        if result.get('skipped'):
+            print(f"⏭️  Already downloaded (skipped): {result['skipped']}")
+        for error in result.get('errors') or []:
+            print(f"  • {error}", file=sys.stderr)
+        if job.get("error"):
+            print(f"Error: {job['error']}", file=sys.stderr)
+
+
+def forward_cli(argv: List[str]) -> Optional[int]:
+    """
+    Run a command line on the download daemon if one is running.
+
+    The daemon decides whether it can run the command (single URLs, --page
+    and --excel runs); anything else, or no daemon, returns None and the
+    caller runs the command in-process.
+
+    Returns:
+        Exit code of the forwarded job, or None to run locally
+    """
+    if not argv or "--no-daemon" in argv or "-h" in argv or "--help" in argv:
+        return None
+    address = daemon_address()
+    if address is None:
+        return None
+    try:
+        client = DaemonClient(address)
+    except ValueError as e:
+        print(f"Warning: {e}; running locally", file=sys.stderr)
+        return None
+    if client.token is None or client.health() is None:
+        return None
+    try:
+        status, job = client.request("POST", "/jobs", {"argv": argv, "cwd": os.getcwd()})
+    except OSError:
+        return None
+    if status == 422:
+        # The daemon cannot run this command line (GUI, journal resume, local-only options, ...)
+        return None
+    if status >= 400:
+        print(f"Daemon rejected the job: {job.get('error')}; running locally", file=sys.stderr)
+        return None
+
+    print(f"Job {job['id']} submitted to the daemon at {client.address}")
+    if "--detach" in argv:
+        return 0
+    started = time.monotonic()
+    try:
+        job = client.wait(job["id"])
+    except KeyboardInterrupt:
+        try:
+            client.cancel(job["id"])
+            print(f"\nCancelled job {job['id']}", file=sys.stderr)
+        except (OSError, DaemonError):
+            pass
+        return 130
+    except (OSError, DaemonError) as e:
+        print(f"Lost contact with the daemon: {e}", file=sys.stderr)
+        return 1
+    print_job_result(job)
+    print(f"Finished in {time.monotonic() - started:.1f}s")
+    return 0 if job["status"] == "done" and job["code"] == 0 else 1
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Query and control the download daemon")
+    parser.add_argument("--daemon", default=None, help=f"Daemon address (default: ${DAEMON_ENV} or {DEFAULT_DAEMON_ADDRESS})")
+    parser.add_argument("--list", action="store_true", help="List the daemon's jobs")
+    parser.add_argument("--status", metavar="JOB_ID", default=None, help="Print a job's state")
+    parser.add_argument("--wait", type=float, default=0, help="With --status: wait up to this many seconds for the job")
+    parser.add_argument("--cancel", metavar="JOB_ID", default=None, help="Cancel a queued or running job")
+    parser.add_argument("--health", action="store_true", help="Print daemon info")
+    args = parser.parse_args()
+
+    client = DaemonClient(args.daemon)
+    try:
+        if args.list:
+            for job in client.list_jobs():
+                target = job["spec"].get("url") or job["spec"].get("source")
+                print(f"{job['id']}  {job['kind']:<7} {job['status']:<9} {target}")
+        elif args.status:
+            print(json.dumps(client.status(args.status, args.wait), indent=2))
+        elif args.cancel:
+            print(json.dumps(client.cancel(args.cancel), indent=2))
+        else:
+            info = client.health()
+            if info is None:
+                print(f"No daemon at {client.address}", file=sys.stderr)
+                sys.exit(1)
+            print(json.dumps(info, indent=2))
+    except (OSError, DaemonError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
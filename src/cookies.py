@@ -0,0 +1,305 @@
+import os
+import sys
+import threading
+import time
+from http.cookiejar import LoadError, MozillaCookieJar
+from typing import Any, Callable, Dict, List, Optional
+
+from .ratelimit import is_throttle_error, retry_after_seconds
+
+
+HEALTHY = "healthy"
+COOLING = "cooling"
+DISABLED = "disabled"
+
+# Cooldown after a throttling response; doubles with every consecutive one
+THROTTLE_COOLDOWN = 300.0
+# Cooldown after a login wall; doubles with every consecutive one
+LOGIN_COOLDOWN = 1800.0
+MAX_COOLDOWN = 6 * 3600.0
+# Consecutive login walls after which the account's session is taken as expired
+MAX_LOGIN_WALLS = 3
+# Longest single sleep while every account is cooling down
+MAX_WAIT_STEP = 5.0
+
+LOGIN_MARKERS = (
+    "login required",
+    "login_required",
+    "checkpoint_required",
+    "challenge_required",
+    "accounts/login",
+    "not logged in",
+)
+COOKIE_FILE_EXTENSIONS = (".txt", ".cookies")
+
+
+def is_login_wall(error: BaseException) -> bool:
+    """True when Instagram refused the request because the session is not (or no longer) logged in."""
+    cause = getattr(error, "cause", None) or getattr(error, "exc_info", None)
+    if isinstance(cause, tuple) and len(cause) > 1:
+        cause = cause[1]
+    if isinstance(cause, BaseException) and cause is not error and is_login_wall(cause):
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in LOGIN_MARKERS)
+
+
+class CookieAccount:
+    """
+    One Instagram account of a cookie pool: its parsed cookies and health.
+
+    The cookies file is parsed once; sessions copy the jar into their
+    YoutubeDL instance when they pick the account and copy the cookies
+    Instagram refreshed back when they are done, so the file on disk is
+    never rewritten.
+    """
+
+    def __init__(self, name: str, path: str, jar: MozillaCookieJar) -> None:
+        self.name = name
+        self.path = path
+        self.jar = jar
+        self.state = HEALTHY
+        self.cooldown_until = 0.0
+        self.in_flight = 0
+        self.uses = 0
+        self.requests = 0
+        self.successes = 0
+        self.failures = 0
+        self.throttles = 0
+        self.login_walls = 0
+        self.streak = 0
+        self.last_error: Optional[str] = None
+        self.last_used = 0.0
+        self._lock = threading.Lock()
+
+    def install(self, target: Any) -> None:
+        """Replace the cookies of `target` (a YoutubeDL cookie jar) with this account's."""
+        target.clear()
+        with self._lock:
+            for cookie in self.jar:
+                target.set_cookie(cookie)
+
+    def absorb(self, source: Any) -> None:
+        """Keep the cookies Instagram set or refreshed during a download."""
+        with self._lock:
+            for cookie in source:
+                self.jar.set_cookie(cookie)
+
+    def available(self, now: float) -> bool:
+        return self.state == HEALTHY or (self.state == COOLING and now >= self.cooldown_until)
+
+    def snapshot(self, now: float) -> Dict[str, Any]:
+        state = HEALTHY if self.available(now) else self.state
+        return {
+            "account": self.name,
+            "state": state,
+            "cooldown_remaining": round(max(0.0, self.cooldown_until - now), 1) if state == COOLING else 0.0,
+            "in_flight": self.in_flight,
+            "uses": self.uses,
+            "requests": self.requests,
+            "successes": self.successes,
+            "failures": self.failures,
+            "throttles": self.throttles,
+            "login_walls": self.login_walls,
+            "last_error": self.last_error,
+        }
+
+
+def load_cookie_file(path: str) -> MozillaCookieJar:
+    """
+    Parse a Netscape cookies.txt file (see scripts/cookie_helper.py).
+
+    Raises:
+        OSError: If the file cannot be read or is not in Netscape format
+    """
+    jar = MozillaCookieJar(path)
+    try:
+        jar.load(ignore_discard=True, ignore_expires=True)
+    except LoadError as e:
+        raise OSError(f"{path}: not a Netscape cookies file ({e})") from e
+    return jar
+
+
+class CookiePool:
+    """
+    Several Instagram accounts, one Netscape cookies file each, shared by all workers.
+
+    Every download picks a healthy account (the one with the fewest
+    downloads in flight and requests so far). Accounts that run into a
+    login wall or get throttled are cooled down, for longer with every
+    consecutive incident; a success resets the backoff. An account that
+    keeps hitting login walls is disabled, as its session has most likely
+    expired and the file has to be exported again. When every account is
+    cooling down, `acquire` waits for the first one to come back.
+
+    Usage:
+        pool = CookiePool("cookies/")
+        account = pool.acquire()
+        try:
+            ...
+        finally:
+            pool.release(account, error)
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self.accounts: List[CookieAccount] = []
+        self._cond = threading.Condition()
+        self._warned_empty = False
+        for entry in sorted(os.listdir(directory)):
+            path = os.path.join(directory, entry)
+            if not os.path.isfile(path) or not entry.lower().endswith(COOKIE_FILE_EXTENSIONS):
+                continue
+            try:
+                jar = load_cookie_file(path)
+            except OSError as e:
+                print(f"Cookie pool: skipping {e}", file=sys.stderr)
+                continue
+            if not any(cookie.name == "sessionid" for cookie in jar):
+                print(f"Cookie pool: {entry} has no sessionid cookie (not logged in?)", file=sys.stderr)
+            self.accounts.append(CookieAccount(os.path.splitext(entry)[0], path, jar))
+        if not self.accounts:
+            raise ValueError(f"no cookies files (*.txt) found in {directory}")
+
+    def acquire(self) -> Optional[CookieAccount]:
+        """
+        Pick an account for one download, waiting while every account is cooling down.
+
+        Returns:
+            The account, or None when every account is disabled
+        """
+        announced = False
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                available = [account for account in self.accounts if account.available(now)]
+                if available:
+                    account = min(available, key=lambda a: (a.in_flight, a.requests, a.uses, a.last_used))
+                    if account.state == COOLING:
+                        account.state = HEALTHY
+                        print(f"Cookie pool: account {account.name} is back in rotation", file=sys.stderr)
+                    account.in_flight += 1
+                    account.uses += 1
+                    account.last_used = now
+                    return account
+                cooling = [account.cooldown_until for account in self.accounts if account.state == COOLING]
+                if not cooling:
+                    if not self._warned_empty:
+                        self._warned_empty = True
+                        print("Cookie pool: every account is disabled, continuing without cookies", file=sys.stderr)
+                    return None
+                delay = min(cooling) - now
+                if not announced:
+                    announced = True
+                    print(f"Cookie pool: every account is cooling down, waiting {delay:.0f}s", file=sys.stderr)
+                self._cond.wait(min(delay, MAX_WAIT_STEP))
+
+    def count_request(self, account: CookieAccount) -> None:
+        with self._cond:
+            account.requests += 1
+
+    def release(self, account: Optional[CookieAccount], error: Optional[BaseException] = None) -> None:
+        """Return an account after a download and update its health from the outcome."""
+        if account is None:
+            return
+        with self._cond:
+            account.in_flight -= 1
+            if error is None:
+                account.successes += 1
+                account.streak = 0
+            else:
+                account.failures += 1
+                account.last_error = str(error)[:300]
+                if is_login_wall(error):
+                    account.login_walls += 1
+                    self._penalize(account, LOGIN_COOLDOWN, "hit a login wall", disable_after=MAX_LOGIN_WALLS)
+                elif is_throttle_error(error):
+                    account.throttles += 1
+                    self._penalize(account, THROTTLE_COOLDOWN, "was throttled", _retry_after(error))
+            self._cond.notify_all()
+
+    def _penalize(
+        self,
+        account: CookieAccount,
+        base: float,
+        reason: str,
+        retry_after: Optional[float] = None,
+        disable_after: Optional[int] = None,
+    ) -> None:
+        account.streak += 1
+        if disable_after is not None and account.streak >= disable_after:
+            account.state = DISABLED
+            print(
+                f"Cookie pool: account {account.name} {reason} {account.streak} times in a row; "
+                f"disabled until {os.path.basename(account.path)} is exported again",
+                file=sys.stderr,
+            )
+            return
+        cooldown = min(MAX_COOLDOWN, max(retry_after or 0.0, base * 2 ** (account.streak - 1)))
+        account.state = COOLING
+        account.cooldown_until = max(account.cooldown_until, time.monotonic() + cooldown)
+        print(f"Cookie pool: account {account.name} {reason}, cooling down for {cooldown:.0f}s", file=sys.stderr)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Per-account state and counters, for logs, summaries and metrics."""
+        with self._cond:
+            now = time.monotonic()
+            return [account.snapshot(now) for account in self.accounts]
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    cause = getattr(error, "cause", None)
+    return retry_after_seconds(error) or (retry_after_seconds(cause) if isinstance(cause, BaseException) else None)
+
+
+def print_cookie_pool_summary(pool: CookiePool) -> None:
+    print(f"\n🍪 Cookie accounts ({pool.directory}):")
+    for account in pool.snapshot():
+        state = account["state"]
+        if account["cooldown_remaining"]:
+            state += f" {account['cooldown_remaining']:.0f}s"
+        print(
+            f"  {account['account']:<20} {state:<14} downloads {account['uses']:>5}  requests {account['requests']:>6}  "
+            f"ok {account['successes']:>5}  throttled {account['throttles']:>3}  login walls {account['login_walls']:>3}"
+        )
+
+
+_pools: Dict[str, CookiePool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_cookie_pool(directory: str) -> CookiePool:
+    """
+    Process-wide pool for a directory of cookies files, loaded on first use.
+
+    Every session given the same directory shares one pool, so account
+    health and request counts are tracked across workers.
+
+    Raises:
+        ValueError: If the directory holds no cookies files
+    """
+    key = os.path.realpath(directory)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = CookiePool(directory)
+        return pool
+
+
+def cookie_pools() -> List[CookiePool]:
+    """Pools loaded so far in this process."""
+    with _pools_lock:
+        return list(_pools.values())
+
+
+def install_cookie_pool(ydl: Any, pool: CookiePool, current_account: Callable[[], Optional[CookieAccount]]) -> None:
+    """Count every request of a YoutubeDL instance against the account it is currently using."""
+    original_urlopen = ydl.urlopen
+
+    def counting_urlopen(req: Any, *args: Any, **kwargs: Any) -> Any:
+        account = current_account()
+        if account is not None:
+            pool.count_request(account)
+        return original_urlopen(req, *args, **kwargs)
+
+    ydl.urlopen = counting_urlopen
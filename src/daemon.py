@@ -0,0 +1,607 @@
+"""
+Long-lived download daemon with a local HTTP job API.
+
+A scheduler calling `python -m src.main URL` thousands of times a day pays
+for the interpreter start, the yt-dlp import and cookie parsing on every
+call. The daemon pays for them once: its worker threads keep warm
+DownloadSessions (one per output directory and cookies file) and jobs
+arrive over HTTP on localhost or a Unix socket. `python -m src.main` and
+`python -m src.cli` forward to it automatically when it is running.
+
+Every request must carry the token the daemon writes to its token file
+(readable by its user only) as "Authorization: Bearer TOKEN", name a
+local Host, and come without a foreign Origin, so neither other users nor
+web pages in a browser can submit jobs. Job submissions must be JSON with
+Content-Type application/json. All paths of a job (output directory,
+source, report, archive, cookies) must lie below one of the daemon's
+allowed roots (--allow-root, default: the home directory).
+
+API (JSON):
+    POST /jobs                   submit {"kind": "url" | "profile" | "excel", ...}
+                                 or a command line {"argv": [...], "cwd": "..."}
+    GET  /jobs                   list jobs
+    GET  /jobs/ID?wait=SECONDS   job state, optionally waiting for it to finish
+    POST /jobs/ID/cancel         cancel a job (DELETE /jobs/ID works too)
+    GET  /health                 daemon info
+
+Usage:
+    python -m src.daemon --listen 127.0.0.1:8765 --workers 4
+    python -m src.daemon --listen unix:/tmp/igdl.sock
+"""
+
+import argparse
+import hmac
+import json
+import os
+import secrets
+import signal
+import socketserver
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from .aio import DownloadCancelled
+from .archive import DownloadArchive, default_archive_path
+from .bandwidth import INTERACTIVE
+from .client import (
+    DAEMON_ENV,
+    FINAL_STATES,
+    TOKEN_FILE_ENV,
+    daemon_address,
+    parse_address,
+    read_token,
+    token_file,
+)
+from .cookies import cookie_pools
+from .downloader import DownloadSession, _silent_progress_hook, download_videos_from_excel
+from .page_downloader import download_profile_videos, extract_username_from_url
+from .report import ReportWriter
+
+
+JOB_KINDS = ("url", "profile", "excel")
+# Finished jobs kept for status queries; older ones are forgotten
+MAX_FINISHED_JOBS = 1000
+MAX_WAIT = 300.0
+# Warm sessions each worker keeps; the least recently used one is closed beyond that
+MAX_SESSIONS_PER_WORKER = 4
+LOCAL_HOSTS = ("localhost", "127.0.0.1", "::1")
+
+# Command-line options a daemon job can carry; any other non-default option runs locally
+_ARGV_KEYS = (
+    "url", "page", "excel_file", "url_column", "output_dir", "cookies_file", "max_videos", "jobs",
+    "archive", "sync", "report", "no_daemon", "detach",
+)
+_PATH_KEYS = ("output_dir", "cookies_file", "excel_file", "archive", "report")
+# Paths of a job spec, checked against the allowed roots
+_SPEC_PATH_KEYS = ("output_dir", "cookies_file", "source", "archive", "report")
+
+
+class UnsupportedJob(ValueError):
+    """The command line needs a local run (GUI, journal, process-wide options, ...)."""
+
+
+def write_token(path: str) -> str:
+    """Write a new random access token to `path`, readable by the current user only."""
+    token = secrets.token_urlsafe(32)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), mode=0o700, exist_ok=True)
+    if os.path.lexists(path):
+        os.remove(path)
+    # O_EXCL: never write through a file or symlink someone else put in place
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(token)
+    return token
+
+
+def _within(path: str, root: str) -> bool:
+    return path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+
+
+def job_from_argv(argv: List[str], cwd: str) -> Dict[str, Any]:
+    """
+    Translate a src.cli command line into a job spec, resolving paths against the caller's cwd.
+
+    Raises:
+        UnsupportedJob: If the command line cannot run on the daemon
+    """
+    from .cli import build_parser
+
+    parser = build_parser()
+    parser.set_defaults(output_dir=os.path.join(cwd, "downloads"))
+    parser.exit = _parser_exit  # type: ignore[method-assign]
+    parser.error = _parser_error  # type: ignore[method-assign]
+    args = parser.parse_args(argv)
+    defaults = vars(parser.parse_args([]))
+    unsupported = [
+        key for key, value in vars(args).items() if key not in _ARGV_KEYS and value != defaults.get(key)
+    ]
+    if unsupported:
+        raise UnsupportedJob(f"options not supported by the daemon: {', '.join(sorted(unsupported))}")
+    if args.excel_file == "-":
+        raise UnsupportedJob("stdin input is only available locally")
+    for key in _PATH_KEYS:
+        value = getattr(args, key)
+        if value:
+            setattr(args, key, os.path.normpath(os.path.join(cwd, os.path.expanduser(value))))
+
+    spec: Dict[str, Any] = {
+        "output_dir": args.output_dir,
+        "cookies_file": args.cookies_file,
+        "archive": args.archive if args.archive is not None or not args.sync else "",
+        "report": args.report,
+    }
+    if args.excel_file:
+        spec.update(kind="excel", source=args.excel_file, url_column=args.url_column, jobs=args.jobs)
+    elif args.url and args.page:
+        spec.update(kind="profile", url=args.url, max_videos=args.max_videos, sync=args.sync)
+    elif args.url:
+        spec.update(kind="url", url=args.url)
+    else:
+        raise UnsupportedJob("nothing to download")
+    return spec
+
+
+def _parser_exit(status: int = 0, message: Optional[str] = None) -> None:
+    raise UnsupportedJob(message or f"argument parser exited with {status}")
+
+
+def _parser_error(message: str) -> None:
+    raise UnsupportedJob(message)
+
+
+class DaemonJob:
+    def __init__(self, spec: Dict[str, Any]) -> None:
+        self.id = uuid.uuid4().hex[:12]
+        self.spec = spec
+        self.kind = spec["kind"]
+        self.status = "queued"
+        self.code: Optional[int] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.cancel = threading.Event()
+        self.done = threading.Event()
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "code": self.code,
+            "result": self.result,
+            "error": self.error,
+            "spec": self.spec,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+
+class DownloadDaemon:
+    """
+    Job registry and warm download workers behind the HTTP API.
+
+    Each worker thread keeps a DownloadSession per (output directory,
+    cookies file, archive) for single-URL jobs, in the interactive bandwidth
+    class; at most MAX_SESSIONS_PER_WORKER of them, closing the least
+    recently used. Profile and Excel jobs run the regular batch functions on
+    the worker thread. Cancelling a running job aborts it at its next
+    progress update.
+
+    Jobs may only use paths below `roots` (default: the home directory).
+    """
+
+    def __init__(self, workers: int = 4, roots: Optional[List[str]] = None) -> None:
+        self.workers = max(1, workers)
+        self.roots = [os.path.realpath(os.path.expanduser(root)) for root in roots or ["~"]]
+        self.started = time.time()
+        self._jobs: "OrderedDict[str, DaemonJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="daemon")
+        self._thread_state = threading.local()
+        self._sessions: List[DownloadSession] = []
+        self._archives: Dict[str, DownloadArchive] = {}
+
+    def submit(self, spec: Dict[str, Any]) -> DaemonJob:
+        """
+        Queue a job.
+
+        Raises:
+            ValueError: If the spec is incomplete
+        """
+        kind = spec.get("kind")
+        if kind not in JOB_KINDS:
+            raise ValueError(f"kind must be one of {', '.join(JOB_KINDS)}")
+        if kind in ("url", "profile") and not spec.get("url"):
+            raise ValueError(f"{kind} jobs need a 'url'")
+        if kind == "profile" and not extract_username_from_url(spec["url"]):
+            raise ValueError("Invalid Instagram profile URL")
+        if kind == "excel" and not spec.get("source"):
+            raise ValueError("excel jobs need a 'source' file")
+        if spec.get("source") == "-":
+            raise ValueError("stdin input is only available locally")
+        spec.setdefault("output_dir", os.path.join(os.getcwd(), "downloads"))
+        self._confine(spec)
+        job = DaemonJob(spec)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._forget_finished()
+        self._executor.submit(self._run, job)
+        return job
+
+    def _confine(self, spec: Dict[str, Any]) -> None:
+        """
+        Resolve the spec's paths; raises ValueError for one outside the allowed roots.
+
+        The job runs with the resolved paths, so a symlink swapped in after
+        the check cannot lead it out of the roots.
+        """
+        for key in _SPEC_PATH_KEYS:
+            value = spec.get(key)
+            if not value:
+                continue
+            if not isinstance(value, str):
+                raise ValueError(f"'{key}' must be a path")
+            path = os.path.realpath(os.path.expanduser(value))
+            if not any(_within(path, root) for root in self.roots):
+                raise ValueError(f"'{key}' is outside the daemon's allowed roots: {value}")
+            spec[key] = path
+
+    def _forget_finished(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in FINAL_STATES]
+        for job_id in finished[: max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[DaemonJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self) -> List[DaemonJob]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id: str) -> Optional[DaemonJob]:
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.cancel.set()
+        with self._lock:
+            if job.status == "queued":
+                job.status = "cancelled"
+                job.finished = time.time()
+                job.done.set()
+        return job
+
+    def counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for job in self.list_jobs():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return counts
+
+    def _archive(self, spec: Dict[str, Any]) -> Optional[DownloadArchive]:
+        path = spec.get("archive")
+        if path is None:
+            return None
+        path = path or default_archive_path(spec["output_dir"])
+        with self._lock:
+            if path not in self._archives:
+                self._archives[path] = DownloadArchive(path)
+            return self._archives[path]
+
+    def _session(self, spec: Dict[str, Any], archive: Optional[DownloadArchive]) -> DownloadSession:
+        sessions: Optional["OrderedDict[Tuple[Any, ...], DownloadSession]"] = getattr(
+            self._thread_state, "sessions", None
+        )
+        if sessions is None:
+            sessions = self._thread_state.sessions = OrderedDict()
+        key = (spec["output_dir"], spec.get("cookies_file"), archive.path if archive is not None else None)
+        session = sessions.get(key)
+        if session is not None:
+            sessions.move_to_end(key)
+            return session
+        session = DownloadSession(
+            spec["output_dir"], spec.get("cookies_file"), _silent_progress_hook, archive, priority=INTERACTIVE
+        ).open()
+        sessions[key] = session
+        with self._lock:
+            self._sessions.append(session)
+        while len(sessions) > MAX_SESSIONS_PER_WORKER:
+            # Sessions belong to this worker thread, so the evicted one is idle
+            _key, evicted = sessions.popitem(last=False)
+            with self._lock:
+                self._sessions.remove(evicted)
+            evicted.close()
+        return session
+
+    def _run(self, job: DaemonJob) -> None:
+        with self._lock:
+            if job.status != "queued":
+                return
+            job.status = "running"
+            job.started = time.time()
+        spec = job.spec
+        report = ReportWriter(spec["report"]) if spec.get("report") else None
+        try:
+            job.code, job.result = self._dispatch(job, self._archive(spec), report)
+            status = "done"
+        except DownloadCancelled:
+            status, job.code = "cancelled", 1
+        except Exception as e:
+            status, job.code, job.error = "failed", 1, str(e)
+            print(f"Daemon job {job.id} failed: {e}", file=sys.stderr)
+        finally:
+            if report is not None:
+                report.close()
+        with self._lock:
+            job.status = status
+            job.finished = time.time()
+        job.done.set()
+
+    def _dispatch(
+        self, job: DaemonJob, archive: Optional[DownloadArchive], report: Optional[ReportWriter]
+    ) -> Tuple[int, Dict[str, Any]]:
+        spec = job.spec
+
+        def hook(status: Dict[str, Any]) -> None:
+            if job.cancel.is_set():
+                raise DownloadCancelled(job.id)
+
+        def progress_callback(current: int, total: int, current_item: str) -> None:
+            if job.cancel.is_set():
+                raise DownloadCancelled(job.id)
+
+        if job.kind == "url":
+            session = self._session(spec, archive)
+            code = session.download(spec["url"], custom_progress_hook=hook)
+            if report is not None:
+                outcome = "skipped" if session.last_skipped else "success" if code == 0 else "failed"
+                report.write(
+                    spec["url"], outcome, (session.last_info or {}).get("id"), session.last_filepath,
+                    session.last_duration, session.last_error if code else None,
+                )
+            return code, {
+                "path": session.last_filepath,
+                "skipped": session.last_skipped,
+                "error": str(session.last_error) if session.last_error else None,
+            }
+        if job.kind == "profile":
+            results = download_profile_videos(
+                spec["url"],
+                spec["output_dir"],
+                spec.get("cookies_file"),
+                spec.get("max_videos", 50),
+                progress_callback,
+                archive=archive,
+                sync=bool(spec.get("sync")) and archive is not None,
+                custom_progress_hook=hook,
+                report=report,
+            )
+        else:
+            results = download_videos_from_excel(
+                spec["source"],
+                spec["output_dir"],
+                spec.get("cookies_file"),
+                spec.get("url_column", "url"),
+                progress_callback,
+                jobs=spec.get("jobs", 1),
+                archive=archive,
+                custom_progress_hook=hook,
+                report=report,
+            )
+        if job.cancel.is_set():
+            raise DownloadCancelled(job.id)
+        return (0 if results['failed'] == 0 else 1), results
+
+    def close(self) -> None:
+        for job in self.list_jobs():
+            job.cancel.set()
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            for session in self._sessions:
+                session.close()
+            for archive in self._archives.values():
+                archive.close()
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(daemon: DownloadDaemon, address: str, token: str) -> socketserver.BaseServer:
+    """HTTP server for the job API at "HOST:PORT" or "unix:PATH", accepting requests that carry `token`."""
+    kind, target = parse_address(address)
+    allowed_hosts = set(LOCAL_HOSTS)
+    if kind == "tcp":
+        allowed_hosts.add(target[0].strip("[]").lower())
+    expected = f"Bearer {token}".encode("utf-8")
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+        def _authorized(self) -> bool:
+            """Reject foreign Host and Origin headers (DNS rebinding, browsers) and requests without the token."""
+            host = urlparse("//" + (self.headers.get("Host") or "")).hostname
+            if host not in allowed_hosts:
+                self._send(403, {"error": "requests must name a local host"})
+                return False
+            origin = self.headers.get("Origin")
+            if origin is not None and urlparse(origin).hostname not in allowed_hosts:
+                self._send(403, {"error": "cross-origin requests are not allowed"})
+                return False
+            given = (self.headers.get("Authorization") or "").encode("utf-8")
+            if not hmac.compare_digest(given, expected):
+                self._send(401, {"error": "missing or wrong daemon token"})
+                return False
+            return True
+
+        def _send(self, status: int, body: Dict[str, Any]) -> None:
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _route(self) -> Tuple[List[str], Dict[str, List[str]]]:
+            parsed = urlparse(self.path)
+            return [part for part in parsed.path.split("/") if part], parse_qs(parsed.query)
+
+        def do_GET(self) -> None:
+            if not self._authorized():
+                return
+            parts, query = self._route()
+            if parts == ["health"]:
+                self._send(200, {
+                    "service": "igdl-daemon",
+                    "pid": os.getpid(),
+                    "workers": daemon.workers,
+                    "uptime": round(time.time() - daemon.started, 1),
+                    "jobs": daemon.counts(),
+                    "cookie_accounts": {pool.directory: pool.snapshot() for pool in cookie_pools()},
+                })
+            elif parts == ["jobs"]:
+                self._send(200, {"jobs": [job.as_dict() for job in daemon.list_jobs()]})
+            elif len(parts) == 2 and parts[0] == "jobs":
+                job = daemon.get(parts[1])
+                if job is None:
+                    self._send(404, {"error": f"unknown job {parts[1]}"})
+                    return
+                try:
+                    wait = min(MAX_WAIT, float(query.get("wait", ["0"])[0]))
+                except ValueError:
+                    wait = 0.0
+                if wait > 0:
+                    job.done.wait(wait)
+                self._send(200, job.as_dict())
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self) -> None:
+            if not self._authorized():
+                return
+            parts, _ = self._route()
+            if len(parts) == 3 and parts[0] == "jobs" and parts[2] == "cancel":
+                self._cancel(parts[1])
+                return
+            if parts != ["jobs"]:
+                self._send(404, {"error": "not found"})
+                return
+            content_type = (self.headers.get("Content-Type") or "").split(";", 1)[0].strip().lower()
+            if content_type != "application/json":
+                self._send(415, {"error": "request body must be application/json"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                self._send(400, {"error": "request body must be JSON"})
+                return
+            if not isinstance(body, dict):
+                self._send(400, {"error": "request body must be a JSON object"})
+                return
+            try:
+                spec = job_from_argv(body["argv"], body.get("cwd") or os.getcwd()) if "argv" in body else body
+                job = daemon.submit(spec)
+            except UnsupportedJob as e:
+                self._send(422, {"error": str(e)})
+                return
+            except ValueError as e:
+                self._send(400, {"error": str(e)})
+                return
+            self._send(202, job.as_dict())
+
+        def do_DELETE(self) -> None:
+            if not self._authorized():
+                return
+            parts, _ = self._route()
+            if len(parts) == 2 and parts[0] == "jobs":
+                self._cancel(parts[1])
+            else:
+                self._send(404, {"error": "not found"})
+
+        def _cancel(self, job_id: str) -> None:
+            job = daemon.cancel(job_id)
+            if job is None:
+                self._send(404, {"error": f"unknown job {job_id}"})
+            else:
+                self._send(200, job.as_dict())
+
+    if kind == "unix":
+        if os.path.exists(target):
+            os.remove(target)  # Stale socket of a previous daemon
+        server = _UnixHTTPServer(target, Handler)
+        os.chmod(target, 0o600)
+        return server
+    server = ThreadingHTTPServer(target, Handler)
+    server.daemon_threads = True
+    return server
+
+
+def _interrupt(signum: int, frame: Any) -> None:
+    raise KeyboardInterrupt
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the download daemon with a local HTTP job API")
+    parser.add_argument(
+        "--listen",
+        default=None,
+        help=f"HOST:PORT or unix:PATH to listen on (default: ${DAEMON_ENV} or 127.0.0.1:8765)",
+    )
+    parser.add_argument("--workers", type=int, default=4, help="Jobs running at the same time (default: 4)")
+    parser.add_argument(
+        "--allow-root",
+        dest="roots",
+        action="append",
+        default=None,
+        metavar="DIR",
+        help="Directory jobs may read and write below; repeatable (default: the home directory)",
+    )
+    parser.add_argument(
+        "--token-file",
+        default=None,
+        help=f"File the access token is written to (default: ${TOKEN_FILE_ENV} or ~/.igdl/daemon.token)",
+    )
+    args = parser.parse_args()
+
+    address = args.listen or daemon_address() or "127.0.0.1:8765"
+    path = args.token_file or token_file()
+    try:
+        token = write_token(path)
+    except OSError as e:
+        print(f"Error: cannot write the token file {path}: {e}", file=sys.stderr)
+        sys.exit(1)
+    daemon = DownloadDaemon(args.workers, args.roots)
+    try:
+        server = make_server(daemon, address, token)
+    except (OSError, ValueError) as e:
+        print(f"Error: cannot listen on {address}: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"Download daemon listening on {address} with {daemon.workers} worker(s)", flush=True)
+    print(f"Access token in {path}; jobs are confined to {', '.join(daemon.roots)}", flush=True)
+    # Service managers stop the daemon with SIGTERM: shut down like on Ctrl+C
+    signal.signal(signal.SIGTERM, _interrupt)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Shutting down...")
+    finally:
+        server.server_close()
+        daemon.close()
+        if address.startswith("unix:") and os.path.exists(address[len("unix:"):]):
+            os.remove(address[len("unix:"):])
+        if read_token(path) == token:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
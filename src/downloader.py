@@ -1,7 +1,27 @@
+import glob
 import os
 import sys
 import shutil
-from typing import Any, Dict, Callable, Optional, List
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, Callable, Iterable, Iterator, Optional, List, Tuple
+
+from .archive import DownloadArchive, extract_shortcode
+from .bandwidth import BULK, INTERACTIVE, BandwidthGovernor, Transfer, get_bandwidth_governor
+from .batch import BoundedWorkerPool
+from .cas import ContentStore, StreamingHasher, get_content_store, store_download
+from .cookies import CookieAccount, CookiePool, get_cookie_pool, install_cookie_pool
+from .journal import Job
+from .merge import SEPARATE_STREAMS_FORMAT, MergePool, merge_extension, open_merge_pool
+from .metadata import MetadataFilter
+from .metrics import ItemTrace, get_metrics, install_metrics
+from .ratelimit import AdaptiveRateLimiter, get_rate_limiter, install_rate_limiter
+from .report import ReportWriter, add_to_results, file_size, new_results
+from .retry import BATCH_RETRIES, PERMANENT, RetryQueue, classify_failure, count_failure, reraise_interrupt
+from .sources import ErrorCallback, estimate_url_count, iter_urls, report_row_error
+from .urls import UrlDeduplicator
+from .watchdog import count_stall, get_watchdog_settings, is_stall_error
 
 
 def ensure_output_directory(directory_path: str) -> None:
@@ -28,12 +48,21 @@ def progress_hook(status: Dict[str, Any]) -> None:
         sys.stdout.flush()
 
 
+def output_template(output_dir: str, separate_streams: bool = False) -> str:
+    if separate_streams:
+        # Stream files are named like "user_ID.f1234.mp4" until they are merged
+        return os.path.join(output_dir, "%(uploader)s_%(id)s.f%(format_id)s.%(ext)s")
+    return os.path.join(output_dir, "%(uploader)s_%(id)s.%(ext)s")
+
+
 def build_ydl_options(
     output_dir: str,
     cookies_file: str | None,
     custom_progress_hook: Optional[Callable[[Dict[str, Any]], None]] = None,
+    retries: int = 3,
+    socket_timeout: Optional[float] = None,
 ) -> Dict[str, Any]:
-    out_template = os.path.join(output_dir, "%(uploader)s_%(id)s.%(ext)s")
+    out_template = output_template(output_dir)
     ffmpeg_available = has_ffmpeg_installed()
     chosen_format = "bestvideo+bestaudio/best" if ffmpeg_available else "best"
     options: Dict[str, Any] = {
@@ -44,38 +73,405 @@ def build_ydl_options(
         "overwrites": False,
         "restrictfilenames": True,
         "format": chosen_format,
-        "retries": 3,
+        "retries": retries,
         "progress_hooks": [custom_progress_hook or progress_hook],
     }
     if cookies_file:
         options["cookiefile"] = cookies_file
+    if socket_timeout:
+        options["socket_timeout"] = socket_timeout
     return options
 
 
+class DownloadSession:
+    """
+    Keep one YoutubeDL instance warm across many downloads.
+
+    yt-dlp is imported, the options are built, ffmpeg is looked up and the
+    cookies file is parsed once when the session opens. The same cookie jar,
+    HTTP connections and extractor state are then reused for every URL
+    until the session is closed.
+
+    A YoutubeDL instance is not thread-safe, so concurrent batches should
+    open one session per worker thread.
+
+    Usage:
+        with DownloadSession(output_dir, cookies_file) as session:
+            for url in urls:
+                session.download(url)
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        cookies_file: Optional[str] = None,
+        custom_progress_hook: Optional[Callable[[Dict[str, Any]], None]] = None,
+        archive: Optional[DownloadArchive] = None,
+        rate_limiter: Optional[AdaptiveRateLimiter] = None,
+        content_store: Optional[ContentStore] = None,
+        merge_pool: Optional[MergePool] = None,
+        priority: str = BULK,
+        governor: Optional[BandwidthGovernor] = None,
+        retries: int = 3,
+    ) -> None:
+        """
+        Args:
+            output_dir: Default directory for downloads
+            cookies_file: Cookies file, or a directory of them: a pool of accounts
+                (see cookies.CookiePool) shared by every session given the same directory
+            custom_progress_hook: yt-dlp progress hook for every download
+            archive: Optional download archive; recorded (or permanently failed) posts
+                are skipped before any network request and successes are recorded
+            rate_limiter: Request limiter (default: the shared ratelimit.get_rate_limiter())
+            content_store: Content-addressed store for deduplication (default: the one set
+                up by cas.configure_content_store, if any)
+            merge_pool: Download video and audio as separate files and mux them here
+                instead of in yt-dlp (see download)
+            priority: Bandwidth class of the session's transfers (bandwidth.BULK or INTERACTIVE)
+            governor: Bandwidth governor (default: the shared one)
+            retries: Attempts yt-dlp makes per request within one download; batch loops
+                pass retry.BATCH_RETRIES and defer further attempts to a RetryQueue
+        """
+        self.output_dir = output_dir
+        self.cookies_file = cookies_file
+        self.cookie_pool: Optional[CookiePool] = (
+            get_cookie_pool(cookies_file) if cookies_file and os.path.isdir(cookies_file) else None
+        )
+        self.cookie_account: Optional[CookieAccount] = None
+        self.default_progress_hook = custom_progress_hook or progress_hook
+        self.archive = archive
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.content_store = content_store or get_content_store()
+        self.merge_pool = merge_pool
+        self.priority = priority
+        self.governor = governor or get_bandwidth_governor()
+        self.retries = retries
+        self.watchdog = get_watchdog_settings().create()
+        # Transfers aborted for stalling (see download)
+        self.stalls = 0
+        self.last_merge: Optional[Future] = None
+        self.last_info: Optional[Dict[str, Any]] = None
+        self.last_filepath: Optional[str] = None
+        self.last_error: Optional[BaseException] = None
+        self.last_duration: Optional[float] = None
+        self.last_skipped = False
+        self.trace: Optional[ItemTrace] = None
+        self._hasher: Optional[StreamingHasher] = None
+        self._transfer: Optional[Transfer] = None
+        self._call_progress_hook: Optional[Callable[[Dict[str, Any]], None]] = None
+        self._ydl: Any = None
+
+    def __enter__(self) -> "DownloadSession":
+        return self.open()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def open(self) -> "DownloadSession":
+        """Import yt-dlp and create the shared YoutubeDL instance. Raises ImportError if yt-dlp is missing."""
+        if self._ydl is not None:
+            return self
+        from yt_dlp import YoutubeDL  # type: ignore
+
+        cookies_file = None if self.cookie_pool is not None else self.cookies_file
+        ydl_opts = build_ydl_options(
+            self.output_dir, cookies_file, self._dispatch_progress, self.retries, self.watchdog.stall_timeout or None
+        )
+        ydl_opts["postprocessor_hooks"] = [self._dispatch_postprocessor]
+        if self.merge_pool is not None:
+            ydl_opts["format"] = SEPARATE_STREAMS_FORMAT
+            ydl_opts["outtmpl"] = output_template(self.output_dir, separate_streams=True)
+        self._ydl = YoutubeDL(ydl_opts)
+        install_rate_limiter(self._ydl, self.rate_limiter)
+        if self.cookie_pool is not None:
+            install_cookie_pool(self._ydl, self.cookie_pool, lambda: self.cookie_account)
+        if get_metrics() is not None:
+            install_metrics(self._ydl, self)
+        return self
+
+    def close(self) -> None:
+        if self._ydl is not None:
+            try:
+                self._ydl.close()
+            finally:
+                self._ydl = None
+
+    def _dispatch_progress(self, status: Dict[str, Any]) -> None:
+        self.watchdog.on_progress(status)
+        if self.trace is not None:
+            self.trace.on_progress(status)
+        if self._hasher is not None:
+            self._hasher.on_progress(status)
+        if self._transfer is not None:
+            held = time.monotonic()
+            self._transfer.on_progress(status)
+            self.watchdog.throttled(time.monotonic() - held)
+        (self._call_progress_hook or self.default_progress_hook)(status)
+
+    def _dispatch_postprocessor(self, status: Dict[str, Any]) -> None:
+        if self.trace is not None:
+            self.trace.on_postprocessor(status)
+
+    def _set_output_dir(self, output_dir: str) -> None:
+        template = output_template(output_dir, separate_streams=self.merge_pool is not None)
+        outtmpl = self._ydl.params.get("outtmpl")
+        if isinstance(outtmpl, dict):
+            outtmpl["default"] = template
+        else:
+            self._ydl.params["outtmpl"] = template
+
+    def download(
+        self,
+        url: str,
+        output_dir: Optional[str] = None,
+        custom_progress_hook: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> int:
+        """
+        Download one URL with the warm YoutubeDL instance.
+
+        Every transfer is watched for stalls (see watchdog.StallWatchdog): one
+        that stops or crawls below the minimum speed is aborted and fails as
+        transient, so batch loops re-queue it, and the session drops its
+        connections so the next attempt starts on fresh ones. With metrics
+        enabled (see metrics.configure_metrics) the download is traced through
+        yt-dlp's hooks and recorded with its phase timings. With a content
+        store, the file is hashed while it downloads and identical media is
+        stored once and linked into place.
+
+        With a merge pool the streams are handed to the pool for muxing, so
+        the session is free for the next URL while ffmpeg runs; `last_merge`
+        is then the Future of the merge and the post only counts as
+        downloaded once it resolves.
+
+        Args:
+            url: Instagram video/Reel URL
+            output_dir: Directory for this download only (default: the session's output_dir)
+            custom_progress_hook: Progress hook for this download only
+
+        Returns:
+            0 on success (or when the archive already has the post), 1 on failure
+        """
+        self.last_info = None
+        self.last_filepath = None
+        self.last_error = None
+        self.last_duration = None
+        self.last_skipped = False
+        self.last_merge = None
+        metrics = get_metrics()
+        shortcode = extract_shortcode(url)
+        if self.archive is not None and shortcode and shortcode in self.archive:
+            self.last_skipped = True
+            if metrics is not None:
+                metrics.inc("igdl_items_total", outcome="skipped")
+            print(f"Skipping {shortcode}: already in download archive")
+            return 0
+        if self.archive is not None and self.archive.has_failed(shortcode):
+            self.last_skipped = True
+            if metrics is not None:
+                metrics.inc("igdl_items_total", outcome="skipped")
+            print(f"Skipping {shortcode}: failed permanently in an earlier run")
+            return 0
+
+        self.open()
+        target_dir = output_dir or self.output_dir
+        ensure_output_directory(target_dir)
+        self._set_output_dir(target_dir)
+        self._call_progress_hook = custom_progress_hook
+        # Bulk sessions may wait here for interactive downloads, outside the item's timings
+        self._transfer = self.governor.start(self.priority)
+        self._take_cookie_account()
+        trace = ItemTrace(url) if metrics is not None else None
+        self.trace = trace
+        hasher = StreamingHasher() if self.content_store is not None else None
+        self._hasher = hasher
+        self.watchdog.start()
+        stalled = False
+        started = time.monotonic()
+        try:
+            info = self._extract(url, target_dir)
+        except Exception as e:  # pragma: no cover
+            self.last_error = e
+            stalled = is_stall_error(e)
+            if trace is not None:
+                trace.finish("failed", e)
+            print(f"Download failed: {e}", file=sys.stderr)
+            return 1
+        else:
+            if trace is not None:
+                trace.finish("success" if info else "failed")
+        finally:
+            self.last_duration = time.monotonic() - started
+            self._call_progress_hook = None
+            self._transfer.close()
+            self._transfer = None
+            self._return_cookie_account()
+            self.trace = None
+            self._hasher = None
+            if trace is not None:
+                if trace.outcome is None:
+                    trace.finish("cancelled")
+                metrics.record_item(trace)
+            if stalled:
+                self.stalls += 1
+                if metrics is not None:
+                    metrics.inc("igdl_stalls_total", help="Transfers aborted for stalling (watchdog or socket timeout)")
+                # A half-open connection may stay pooled; the next download reconnects
+                self.close()
+
+        if not info:
+            return 1
+        self.last_info = info
+        post_id = shortcode or info.get("id")
+        if self.merge_pool is not None:
+            streams = [r for r in info.get("requested_downloads") or [] if r.get("filepath")]
+            if len(streams) == 2:
+                self.last_filepath, self.last_merge = self._hand_off_merge(streams, post_id)
+                return 0
+            if len(streams) == 1:
+                # A single progressive file: only the stream suffix has to go
+                self.last_filepath = _without_format_id(streams[0]["filepath"], streams[0].get("format_id"))
+                os.replace(streams[0]["filepath"], self.last_filepath)
+                if hasher is not None:
+                    hasher.moved(streams[0]["filepath"], self.last_filepath)
+        if self.last_filepath is None:
+            self.last_filepath = _downloaded_filepath(self._ydl, info)
+        self._record_download(post_id, self.last_filepath, hasher)
+        return 0
+
+    def _extract(self, url: str, output_dir: str) -> Optional[Dict[str, Any]]:
+        """
+        Extract and download one URL.
+
+        Stream files are renamed or merged away once downloaded, so with a
+        merge pool yt-dlp never finds a finished post under its stream
+        names; the post is extracted first and not downloaded again when
+        its final file exists (the returned info then carries it as
+        `filepath`).
+        """
+        if self.merge_pool is None:
+            return self._ydl.extract_info(url, download=True)
+        info = self._ydl.extract_info(url, download=False, process=False)
+        existing = self._finished_output(info, output_dir) if info else None
+        if existing is not None:
+            print(f"{existing} has already been downloaded")
+            return {**info, "filepath": existing}
+        return self._ydl.process_ie_result(info, download=True)
+
+    def _finished_output(self, info: Dict[str, Any], output_dir: str) -> Optional[str]:
+        """Final (merged or renamed) file of a post from an earlier run, if there is one."""
+        if info.get("_type", "video") != "video" or not info.get("id"):
+            return None
+        try:
+            stem = os.path.splitext(self._ydl.prepare_filename(info, outtmpl=output_template(output_dir)))[0]
+        except Exception:
+            return None
+        for path in sorted(glob.glob(glob.escape(stem) + ".*")):
+            # "user_ID.mp4", not the stream, partial or temporary files next to it
+            ext = path[len(stem) + 1:]
+            if "." not in ext and ext not in ("part", "ytdl") and os.path.isfile(path):
+                return path
+        return None
+
+    def probe(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Metadata of one URL without downloading it (one extraction through the warm instance).
+
+        Returns:
+            yt-dlp's info dict, or None on failure (the exception is kept in last_error)
+        """
+        self.open()
+        self.last_error = None
+        self._take_cookie_account()
+        try:
+            return self._ydl.extract_info(url, download=False)
+        except Exception as e:
+            self.last_error = e
+            print(f"Metadata extraction failed for {url}: {e}", file=sys.stderr)
+            return None
+        finally:
+            self._return_cookie_account()
+
+    def _take_cookie_account(self) -> None:
+        if self.cookie_pool is None:
+            return
+        self.cookie_account = self.cookie_pool.acquire()
+        if self.cookie_account is not None:
+            self.cookie_account.install(self._ydl.cookiejar)
+        else:
+            self._ydl.cookiejar.clear()
+
+    def _return_cookie_account(self) -> None:
+        account, self.cookie_account = self.cookie_account, None
+        if account is None:
+            return
+        account.absorb(self._ydl.cookiejar)
+        self.cookie_pool.release(account, self.last_error)
+
+    def _record_download(self, post_id: Optional[str], filepath: Optional[str], hasher: Optional[StreamingHasher]) -> None:
+        if self.content_store is not None:
+            if store_download(self.content_store, filepath, hasher):
+                print(f"Duplicate content: {filepath} linked to the existing copy")
+        if self.archive is not None:
+            self.archive.add(post_id, filepath)
+
+    def _hand_off_merge(self, streams: List[Dict[str, Any]], post_id: Optional[str]) -> Tuple[str, Future]:
+        """Queue a downloaded stream pair on the merge pool (blocks while the pool is saturated)."""
+        video = next((s for s in streams if s.get("vcodec") not in (None, "none")), streams[0])
+        audio = streams[1] if video is streams[0] else streams[0]
+        stem = os.path.splitext(_without_format_id(video["filepath"], video.get("format_id")))[0]
+        output_path = f"{stem}.{merge_extension(video.get('ext') or '', audio.get('ext') or '')}"
+        merge = self.merge_pool.submit(
+            video["filepath"],
+            audio["filepath"],
+            output_path,
+            lambda path: self._record_download(post_id, path, None),
+        )
+        return output_path, merge
+
+
+def _without_format_id(path: str, format_id: Optional[str]) -> str:
+    """Final name of a stream file: "user_ID.f1234.mp4" -> "user_ID.mp4"."""
+    stem, ext = os.path.splitext(path)
+    suffix = f".f{format_id}"
+    if format_id and stem.endswith(suffix):
+        stem = stem[: -len(suffix)]
+    return stem + ext
+
+
+def _downloaded_filepath(ydl: Any, info: Dict[str, Any]) -> Optional[str]:
+    """Final path of a finished download as reported by yt-dlp."""
+    for requested in info.get("requested_downloads") or []:
+        if requested.get("filepath"):
+            return requested["filepath"]
+    if info.get("filepath"):
+        return info["filepath"]
+    try:
+        return ydl.prepare_filename(info)
+    except Exception:
+        return None
+
+
 def download_instagram_video(
     url: str,
     output_dir: str,
     cookies_file: str | None,
     custom_progress_hook: Optional[Callable[[Dict[str, Any]], None]] = None,
+    archive: Optional[DownloadArchive] = None,
 ) -> int:
+    # A single URL is someone waiting for it: it goes ahead of batch downloads
     try:
-        from yt_dlp import YoutubeDL  # type: ignore
-    except Exception as import_error:  # pragma: no cover
+        session = DownloadSession(output_dir, cookies_file, custom_progress_hook, archive, priority=INTERACTIVE).open()
+    except ImportError as import_error:  # pragma: no cover
         print("Error: yt-dlp is not installed. Run: pip install -r requirements.txt", file=sys.stderr)
         print(str(import_error), file=sys.stderr)
         return 2
-
-    ensure_output_directory(output_dir)
-    ydl_opts = build_ydl_options(output_dir, cookies_file, custom_progress_hook)
-
-    try:
-        with YoutubeDL(ydl_opts) as ydl:
-            result = ydl.download([url])
-            return 0 if result == 0 else 1
     except Exception as e:  # pragma: no cover
         print(f"Download failed: {e}", file=sys.stderr)
         return 1
 
+    with session:
+        return session.download(url)
+
 
 def read_excel_urls(excel_file_path: str, url_column: str = "url") -> List[str]:
     """
@@ -115,59 +511,267 @@ def read_excel_urls(excel_file_path: str, url_column: str = "url") -> List[str]:
         raise Exception(f"Error reading Excel file: {str(e)}")
 
 
+def iter_post_metadata(
+    urls: Iterable[str],
+    cookies_file: str | None = None,
+    jobs: int = 1,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the metadata of post URLs (see metadata.METADATA_FIELDS) without downloading them.
+
+    Every post costs one extraction; `jobs` extractions run at once, each
+    worker on its own warm session. Posts that cannot be extracted are
+    reported and left out.
+    """
+    thread_state = threading.local()
+    sessions: List[DownloadSession] = []
+    lock = threading.Lock()
+
+    def probe_one(url: str) -> Optional[Dict[str, Any]]:
+        session = getattr(thread_state, "session", None)
+        if session is None:
+            session = DownloadSession(os.getcwd(), cookies_file, _silent_progress_hook, retries=BATCH_RETRIES).open()
+            thread_state.session = session
+            with lock:
+                sessions.append(session)
+        return session.probe(url)
+
+    pool = BoundedWorkerPool(jobs)
+    try:
+        for url, info, error in pool.map_unordered(probe_one, UrlDeduplicator().filter(urls)):
+            reraise_interrupt(error)
+            if error is not None:
+                print(f"Metadata extraction failed for {url}: {error}", file=sys.stderr)
+                continue
+            if not info:
+                continue
+            yield {
+                "profile": info.get("channel") or info.get("uploader_id") or "",
+                "id": extract_shortcode(url) or info.get("id", ""),
+                "url": url,
+                "title": info.get("title", ""),
+                "uploader": info.get("uploader", ""),
+                "upload_date": info.get("upload_date", ""),
+                "duration": info.get("duration"),
+                "view_count": info.get("view_count"),
+            }
+    finally:
+        for session in sessions:
+            session.close()
+
+
+def _silent_progress_hook(status: Dict[str, Any]) -> None:
+    """Progress hook used when several downloads run at once and would garble stdout."""
+    return None
+
+
+def _journaled(urls: Iterable[str], job: Job, summary: Dict[str, Any]) -> Iterator[str]:
+    """Register streamed URLs with the job, dropping the ones it finished in an earlier run."""
+    for url in urls:
+        if job.is_finished(url):
+            summary["skipped"] += 1
+            continue
+        job.register(url)
+        yield url
+
+
 def download_videos_from_excel(
     excel_file_path: str,
     output_dir: str,
     cookies_file: str | None,
     url_column: str = "url",
     progress_callback: Optional[Callable[[int, int, str], None]] = None,
-) -> Dict[str, int]:
+    jobs: int = 1,
+    archive: Optional[DownloadArchive] = None,
+    on_row_error: Optional[ErrorCallback] = None,
+    job: Optional[Job] = None,
+    custom_progress_hook: Optional[Callable[[Dict[str, Any]], None]] = None,
+    report: Optional[ReportWriter] = None,
+    video_filter: Optional[MetadataFilter] = None,
+) -> Dict[str, Any]:
     """
     Download Instagram videos from URLs listed in an Excel file.
+
+    URLs are streamed from the source, so the first download starts as soon
+    as the first row is read. CSV, JSONL/text files and stdin ("-") are
+    accepted as well; see sources.iter_urls.
+
+    Failures are classified (see retry.classify_failure). Transient ones are
+    retried later with exponential backoff while the workers continue, and
+    permanent ones are recorded in the archive so later runs skip them.
     
     Args:
-        excel_file_path: Path to the Excel file containing URLs
+        excel_file_path: Path to the Excel file (or other URL source) containing URLs
         output_dir: Directory to save downloaded videos
         cookies_file: Optional cookies file path
         url_column: Name of the column containing URLs (default: "url")
         progress_callback: Optional callback function(current, total, current_url)
+        jobs: Number of downloads to run concurrently (default: 1)
+        archive: Optional download archive; URLs already in it are skipped without network access
+        on_row_error: Optional callback(row_number, message) for malformed rows (default: print to stderr)
+        job: Optional journaled job; every item's state is recorded, and items the job
+            already finished in an earlier run are counted as skipped
+        custom_progress_hook: yt-dlp progress hook shared by all workers; it must be
+            thread-safe when jobs > 1 (default: console progress, silent when jobs > 1)
+        report: Optional report; one line per URL (id, path, bytes, duration, error) is
+            written as soon as the URL finishes
+        video_filter: Optional metadata filter; the source is read as a table (e.g. an
+            exported metadata file, see metadata.export_metadata) and only the URLs of
+            matching rows are downloaded
     
     Returns:
-        Dictionary with 'success' and 'failed' counts
+        Dictionary with 'success', 'failed', 'skipped', 'invalid' and 'duplicates' counts, the
+        downloaded 'bytes', the first 'errors' ("url: message", 'error_count' in total), the
+        'peak_concurrency' reached, the number of 'deferred' retries and the final failures
+        per class ('failure_classes': permanent/transient/auth)
     """
+    summary = new_results()
+    summary.update({"invalid": 0, "duplicates": 0, "peak_concurrency": 0, "deferred": 0, "failure_classes": {}, "stalls": 0})
+
+    def row_error(row_number: int, message: str) -> None:
+        summary["invalid"] += 1
+        (on_row_error or report_row_error)(row_number, message)
+
     try:
-        # Read URLs from Excel
-        urls = read_excel_urls(excel_file_path, url_column)
-        
-        if not urls:
-            return {"success": 0, "failed": 0}
-        
-        success_count = 0
-        failed_count = 0
-        total_urls = len(urls)
-        
-        for i, url in enumerate(urls, 1):
-            try:
-                # Call progress callback if provided
-                if progress_callback:
-                    progress_callback(i, total_urls, url)
-                
-                # Download the video
-                result = download_instagram_video(url, output_dir, cookies_file)
-                
-                if result == 0:
-                    success_count += 1
+        # Stream URLs from the source; the total is only an estimate (0 if unknown)
+        if video_filter is not None:
+            urls = video_filter.filter_urls(excel_file_path, url_column)
+        else:
+            urls = iter_urls(excel_file_path, url_column, row_error)
+        # Variants of one post (m., /reels/, tracking queries, ...) are downloaded once
+        dedupe = UrlDeduplicator()
+        urls = dedupe.filter(urls)
+        if job is not None:
+            urls = _journaled(urls, job, summary)
+        total_urls = estimate_url_count(excel_file_path)
+        started = 0
+        lock = threading.Lock()
+        hook = custom_progress_hook or (_silent_progress_hook if jobs > 1 else None)
+        # With a cookie pool, an auth failure may pass with another account
+        retries = RetryQueue(retry_auth=bool(cookies_file) and os.path.isdir(cookies_file))
+        # ffmpeg merges run in their own pool while the download workers move on
+        merges = open_merge_pool()
+        # One warm session per worker thread: YoutubeDL is not thread-safe
+        thread_state = threading.local()
+        sessions: List[DownloadSession] = []
+
+        def session_for_thread() -> DownloadSession:
+            session = getattr(thread_state, "session", None)
+            if session is None:
+                session = DownloadSession(
+                    output_dir, cookies_file, hook, archive, merge_pool=merges, retries=BATCH_RETRIES
+                ).open()
+                thread_state.session = session
+                with lock:
+                    sessions.append(session)
+            return session
+
+        def download_one(url: str) -> Tuple[int, bool, Optional[Future], Dict[str, Any]]:
+            nonlocal started
+            first_attempt = retries.attempts(url) == 1
+            with lock:
+                started += first_attempt
+                current = started
+                total = max(total_urls, current) if total_urls else 0
+            # Call progress callback if provided
+            if progress_callback:
+                progress_callback(current, total, url)
+            if job is not None:
+                job.started(url)
+            # Archived (or permanently failed) posts are skipped before a session or any request
+            if archive is not None and (archive.contains_url(url) or archive.has_failed(extract_shortcode(url))):
+                return 0, True, None, {}
+            session = session_for_thread()
+            code = session.download(url)
+            item = {
+                "id": extract_shortcode(url) or (session.last_info or {}).get("id"),
+                "path": session.last_filepath,
+                "duration": session.last_duration,
+                "error": session.last_error,
+            }
+            return code, session.last_skipped, session.last_merge, item
+
+        def record(url: str, code: int, skipped: bool, error: Optional[BaseException], item: Dict[str, Any]) -> None:
+            if error is not None:
+                print(f"Error downloading {url}: {error}", file=sys.stderr)
+            error = error or item.get("error") or (None if code == 0 else "Download failed")
+            outcome = "skipped" if skipped else "success" if code == 0 else "failed"
+            nbytes = file_size(item.get("path")) if outcome == "success" else None
+            add_to_results(summary, outcome, f"{url}: {error}" if outcome == "failed" else None, nbytes)
+            if report is not None:
+                report.write(
+                    url, outcome, item.get("id"), item.get("path"), item.get("duration"),
+                    error if outcome == "failed" else None, nbytes,
+                )
+            if job is not None:
+                job.finished(url, code == 0, str(error) if code != 0 else None)
+
+        def settle(url: str, code: int, skipped: bool, error: Optional[BaseException], item: Dict[str, Any]) -> None:
+            """Record a finished download, or defer it to the retry queue when the failure may pass."""
+            if code != 0 and not skipped:
+                failure = error or item.get("error")
+                # A cancelled job stops here instead of walking the rest of the source
+                reraise_interrupt(failure)
+                if is_stall_error(failure):
+                    count_stall(summary)
+                error_class = classify_failure(failure)
+                delay = retries.defer(url, url, error_class)
+                if delay is not None:
+                    print(
+                        f"⏳ {url}: {error_class} failure, retrying in {delay:.0f}s "
+                        f"(attempt {retries.attempts(url)}/{retries.max_attempts})",
+                        file=sys.stderr,
+                    )
+                    return
+                count_failure(summary, error_class)
+                if error_class == PERMANENT and archive is not None:
+                    archive.add_failure(extract_shortcode(url), error_class, failure)
+            record(url, code, skipped, error, item)
+
+        # Downloaded posts whose streams are still being merged; recorded once merged
+        pending_merges: Dict[Future, Tuple[str, Dict[str, Any]]] = {}
+
+        def record_merges(wait: bool = False) -> None:
+            for merge in [m for m in pending_merges if wait or m.done()]:
+                url, item = pending_merges.pop(merge)
+                error = merge.exception()
+                record(url, 1 if error else 0, False, error, item)
+
+        def run_pass(items: Iterable[str]) -> None:
+            for url, outcome, error in pool.map_unordered(download_one, items):
+                code, skipped, merge, item = outcome if error is None else (1, False, None, {})
+                if merge is not None:
+                    pending_merges[merge] = (url, item)
                 else:
-                    failed_count += 1
-                    
-            except Exception as e:
-                print(f"Error downloading {url}: {e}", file=sys.stderr)
-                failed_count += 1
-        
-        return {"success": success_count, "failed": failed_count}
+                    settle(url, code, skipped, error, item)
+                record_merges()
+
+        pool = BoundedWorkerPool(jobs)
+        try:
+            # Transient failures wait in the retry queue while the workers move on to
+            # new URLs; they rejoin the stream when due, the rest in a final pass
+            run_pass(retries.interleave(urls))
+            while len(retries):
+                print(f"Retrying {len(retries)} deferred URL(s)...")
+                run_pass(retries.drain())
+            record_merges(wait=True)
+            if job is not None:
+                job.complete()
+        finally:
+            for session in sessions:
+                session.close()
+            if merges is not None:
+                merges.close()
+            if job is not None:
+                job.journal.flush()
+
+        summary["peak_concurrency"] = pool.peak_active
+        summary["duplicates"] = dedupe.duplicates
+        summary["deferred"] = retries.deferred
+        if video_filter is not None:
+            summary["filtered_out"] = video_filter.rejected
+        return summary
         
     except Exception as e:
         print(f"Error processing Excel file: {e}", file=sys.stderr)
-        return {"success": 0, "failed": 0}
-
-
+        return summary
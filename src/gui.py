@@ -1,7 +1,7 @@
 import os
 import threading
 from queue import Queue, Empty
-from typing import Any, Dict
+from typing import Any, Dict, List, Set
 
 try:
     import tkinter as tk
@@ -12,8 +12,14 @@ except Exception:
     filedialog = None  # type: ignore
     messagebox = None  # type: ignore
 
+from .bandwidth import configure_bandwidth
 from .downloader import download_instagram_video, download_videos_from_excel
 from .page_downloader import download_profile_videos, extract_username_from_url
+from .progress import ProgressTracker, format_bytes, format_eta
+
+
+# Finished rows kept in the downloads list before the oldest are removed
+MAX_FINISHED_ROWS = 100
 
 
 class DownloaderGUI:
@@ -33,9 +39,17 @@ class DownloaderGUI:
         self.excel_mode_var = tk.BooleanVar(value=False)
         self.excel_file_var = tk.StringVar()
         self.url_column_var = tk.StringVar(value="url")
+        self.jobs_var = tk.IntVar(value=1)
+        self.totals_var = tk.StringVar(value="")
+        self.speed_limit_var = tk.DoubleVar(value=0.0)
 
+        # Batch-level events (page progress, completion); per-chunk download
+        # progress is coalesced in the tracker instead of queued
         self.queue: Queue[Dict[str, Any]] = Queue()
-        self.downloading = False
+        self.tracker = ProgressTracker()
+        self._finished_rows: List[str] = []
+        # Kinds of download in progress: one batch ("batch") and one single URL ("single") may run together
+        self.running: Set[str] = set()
 
         self._build_ui()
         self._poll_queue()
@@ -63,8 +77,8 @@ class DownloaderGUI:
         excel_check.grid(row=2, column=0, columnspan=3, sticky="w", **pad)
 
         # Max videos (only visible when page mode is enabled)
-        self.max_videos_label = ttk.Label(frm, text="Max videos:")
-        self.max_videos_spinbox = ttk.Spinbox(frm, from_=1, to=200, width=10, textvariable=self.max_videos_var)
+        self.max_videos_label = ttk.Label(frm, text="Max videos (0 = all):")
+        self.max_videos_spinbox = ttk.Spinbox(frm, from_=0, to=100000, width=10, textvariable=self.max_videos_var)
 
         # Excel file selection (only visible when excel mode is enabled)
         self.excel_file_label = ttk.Label(frm, text="Excel file:")
@@ -74,6 +88,11 @@ class DownloaderGUI:
         # URL column name (only visible when excel mode is enabled)
         self.url_column_label = ttk.Label(frm, text="URL column name:")
         self.url_column_entry = ttk.Entry(frm, textvariable=self.url_column_var, width=20)
+
+        # Parallel downloads (only visible when excel mode is enabled)
+        self.jobs_frame = ttk.Frame(frm)
+        ttk.Label(self.jobs_frame, text="Parallel downloads:").pack(side="left")
+        ttk.Spinbox(self.jobs_frame, from_=1, to=16, width=5, textvariable=self.jobs_var).pack(side="left", padx=4)
         
         # Output directory
         ttk.Label(frm, text="Output folder:").grid(row=5, column=0, sticky="w", **pad)
@@ -99,8 +118,39 @@ class DownloaderGUI:
         self.download_btn = ttk.Button(frm, text="Download", command=self._on_download)
         self.download_btn.grid(row=9, column=0, columnspan=3, sticky="ew", **pad)
 
+        # One row per download, updated from the coalesced progress
+        tasks_frame = ttk.Frame(frm)
+        tasks_frame.grid(row=10, column=0, columnspan=3, sticky="nsew", **pad)
+        columns = ("progress", "size", "speed", "eta", "state")
+        self.tasks_view = ttk.Treeview(tasks_frame, columns=columns, height=8)
+        self.tasks_view.heading("#0", text="Video")
+        self.tasks_view.column("#0", width=260)
+        for column, title, width in (
+            ("progress", "Progress", 70), ("size", "Size", 80), ("speed", "Speed", 80),
+            ("eta", "ETA", 60), ("state", "Status", 80),
+        ):
+            self.tasks_view.heading(column, text=title)
+            self.tasks_view.column(column, width=width, anchor="e" if column != "state" else "w")
+        scrollbar = ttk.Scrollbar(tasks_frame, orient="vertical", command=self.tasks_view.yview)
+        self.tasks_view.configure(yscrollcommand=scrollbar.set)
+        self.tasks_view.pack(side="left", fill="both", expand=True)
+        scrollbar.pack(side="right", fill="y")
+
+        ttk.Label(frm, textvariable=self.totals_var).grid(row=11, column=0, columnspan=2, sticky="w", **pad)
+
+        # Applied immediately, also to downloads already running
+        speed_frame = ttk.Frame(frm)
+        speed_frame.grid(row=11, column=2, sticky="e", **pad)
+        ttk.Label(speed_frame, text="Max MB/s (0 = unlimited):").pack(side="left")
+        ttk.Spinbox(
+            speed_frame, from_=0, to=1000, increment=0.5, width=6, textvariable=self.speed_limit_var,
+            command=self._apply_speed_limit,
+        ).pack(side="left", padx=4)
+        self.speed_limit_var.trace_add("write", lambda *_: self._apply_speed_limit())
+
         for i in range(3):
             frm.columnconfigure(i, weight=1)
+        frm.rowconfigure(10, weight=1)
 
         # Bind checkboxes to show/hide controls
         page_check.configure(command=self._toggle_page_mode)
@@ -127,7 +177,7 @@ class DownloaderGUI:
             return
         file_path = filedialog.askopenfilename(
             title="Select Excel file", 
-            filetypes=[["Excel files", "*.xlsx *.xls"], ["All files", "*.*"]]
+            filetypes=[["Excel files", "*.xlsx *.xls"], ["CSV / JSONL / text", "*.csv *.tsv *.jsonl *.txt"], ["All files", "*.*"]]
         )
         if file_path:
             self.excel_file_var.set(file_path)
@@ -149,19 +199,32 @@ class DownloaderGUI:
             self.excel_file_button.grid(row=4, column=2, sticky="ew", padx=8, pady=6)
             self.url_column_label.grid(row=4, column=0, sticky="w", padx=200, pady=6)
             self.url_column_entry.grid(row=4, column=1, columnspan=2, sticky="w", padx=200, pady=6)
+            self.jobs_frame.grid(row=3, column=2, sticky="e", padx=8, pady=6)
         else:
             self.excel_file_label.grid_remove()
             self.excel_file_entry.grid_remove()
             self.excel_file_button.grid_remove()
             self.url_column_label.grid_remove()
             self.url_column_entry.grid_remove()
+            self.jobs_frame.grid_remove()
+
+    def _apply_speed_limit(self) -> None:
+        try:
+            limit = self.speed_limit_var.get()
+        except (tk.TclError, ValueError):
+            return  # Half-typed value
+        configure_bandwidth(int(max(0.0, limit) * 1024 * 1024))
 
     def _on_download(self) -> None:
-        if self.downloading:
+        excel_mode = self.excel_mode_var.get()
+        page_mode = self.page_mode_var.get()
+        # A single URL can start while a batch runs; it gets priority over the batch's downloads
+        kind = "batch" if excel_mode or page_mode else "single"
+        if kind in self.running:
             return
         
         # Validate inputs based on mode
-        if self.excel_mode_var.get():
+        if excel_mode:
             excel_file = self.excel_file_var.get().strip()
             if not excel_file:
                 if messagebox:
@@ -177,13 +240,21 @@ class DownloaderGUI:
         output = self.output_var.get().strip() or os.path.join(os.getcwd(), "downloads")
         cookies = self.cookies_var.get().strip() or None
 
-        self.downloading = True
-        self.download_btn.configure(state=tk.DISABLED)
+        if not self.running:
+            self.progress_var.set(0.0)
+            self.tracker.forget_finished()
+            for row in self.tasks_view.get_children():
+                self.tasks_view.delete(row)
+            self._finished_rows.clear()
+        self.running.add(kind)
+        if len(self.running) == 2:
+            self.download_btn.configure(state=tk.DISABLED)
         self.status_var.set("Starting download...")
-        self.progress_var.set(0.0)
-
-        def gui_progress_hook(status: Dict[str, Any]) -> None:
-            self.queue.put(status)
+        excel_file = self.excel_file_var.get().strip()
+        url_column = self.url_column_var.get().strip() or "url"
+        url = self.url_var.get().strip()
+        jobs = self.jobs_var.get()
+        max_videos = self.max_videos_var.get()
 
         def page_progress_callback(current: int, total: int, current_video: str) -> None:
             self.queue.put({
@@ -194,75 +265,113 @@ class DownloaderGUI:
             })
 
         def worker() -> None:
-            if self.excel_mode_var.get():
+            if excel_mode:
                 # Excel batch download mode
-                excel_file = self.excel_file_var.get().strip()
-                url_column = self.url_column_var.get().strip() or "url"
-                
                 try:
                     results = download_videos_from_excel(
-                        excel_file, output, cookies, url_column, page_progress_callback
+                        excel_file, output, cookies, url_column, page_progress_callback,
+                        jobs=jobs, custom_progress_hook=self.tracker.hook,
                     )
                     
                     # Send completion status
                     success_count = results['success']
                     failed_count = results['failed']
                     if failed_count == 0:
-                        self.queue.put({"status": "__done__", "code": 0, "message": f"Downloaded {success_count} videos successfully"})
+                        self.queue.put({"status": "__done__", "kind": kind, "code": 0, "message": f"Downloaded {success_count} videos successfully"})
                     else:
-                        self.queue.put({"status": "__done__", "code": 1, "message": f"Downloaded {success_count}/{success_count + failed_count} videos"})
+                        self.queue.put({"status": "__done__", "kind": kind, "code": 1, "message": f"Downloaded {success_count}/{success_count + failed_count} videos"})
                 except Exception as e:
-                    self.queue.put({"status": "__done__", "code": 1, "error": str(e)})
-            elif self.page_mode_var.get():
+                    self.queue.put({"status": "__done__", "kind": kind, "code": 1, "error": str(e)})
+            elif page_mode:
                 # Page download mode
-                url = self.url_var.get().strip()
                 username = extract_username_from_url(url)
                 if not username:
-                    self.queue.put({"status": "__done__", "code": 1, "error": "Invalid Instagram profile URL"})
+                    self.queue.put({"status": "__done__", "kind": kind, "code": 1, "error": "Invalid Instagram profile URL"})
                     return
                 
-                max_videos = self.max_videos_var.get()
-                results = download_profile_videos(
-                    url, output, cookies, max_videos, page_progress_callback
-                )
+                try:
+                    results = download_profile_videos(
+                        url, output, cookies, max_videos, page_progress_callback,
+                        custom_progress_hook=self.tracker.hook,
+                    )
+                except Exception as e:
+                    # Always report back, or the download stays marked as running
+                    self.queue.put({"status": "__done__", "kind": kind, "code": 1, "error": str(e)})
+                    return
                 
                 # Send completion status
                 success_count = results['success']
                 failed_count = results['failed']
                 if failed_count == 0:
-                    self.queue.put({"status": "__done__", "code": 0, "message": f"Downloaded {success_count} videos successfully"})
+                    self.queue.put({"status": "__done__", "kind": kind, "code": 0, "message": f"Downloaded {success_count} videos successfully"})
                 else:
-                    self.queue.put({"status": "__done__", "code": 1, "message": f"Downloaded {success_count}/{success_count + failed_count} videos"})
+                    self.queue.put({"status": "__done__", "kind": kind, "code": 1, "message": f"Downloaded {success_count}/{success_count + failed_count} videos"})
             else:
                 # Single video download mode
-                url = self.url_var.get().strip()
-                code = download_instagram_video(url, output, cookies, gui_progress_hook)
-                self.queue.put({"status": "__done__", "code": code})
+                code = download_instagram_video(url, output, cookies, self.tracker.hook)
+                self.queue.put({"status": "__done__", "kind": kind, "code": code})
 
         threading.Thread(target=worker, daemon=True).start()
 
+    def _render_tasks(self) -> None:
+        """Apply the coalesced download progress to the downloads list."""
+        single = self.running == {"single"}
+        for task in self.tracker.drain():
+            percent = task["percent"]
+            values = (
+                f"{percent:5.1f}%" if percent is not None else "-",
+                format_bytes(task["total"]),
+                f"{format_bytes(task['speed'])}/s" if task["speed"] else "-",
+                format_eta(task["eta"]),
+                task["state"],
+            )
+            key = task["key"]
+            if self.tasks_view.exists(key):
+                self.tasks_view.item(key, values=values)
+            else:
+                self.tasks_view.insert("", 0, iid=key, text=task["title"][:60], values=values)
+            if task["state"] != "downloading":
+                if key not in self._finished_rows:
+                    self._finished_rows.append(key)
+            elif key in self._finished_rows:
+                # The next format of the same video started
+                self._finished_rows.remove(key)
+            if single:
+                if task["state"] == "finished":
+                    self.progress_var.set(100.0)
+                    self.status_var.set("Processing file...")
+                elif percent is not None:
+                    self.progress_var.set(percent)
+                    self.status_var.set(f"Downloading: {percent:5.1f}%")
+
+        if len(self._finished_rows) > MAX_FINISHED_ROWS:
+            while len(self._finished_rows) > MAX_FINISHED_ROWS:
+                key = self._finished_rows.pop(0)
+                if self.tasks_view.exists(key):
+                    self.tasks_view.delete(key)
+            self.tracker.forget_finished()
+
+        totals = self.tracker.totals()
+        if totals["active"]:
+            self.totals_var.set(
+                f"{totals['active']} active · {format_bytes(totals['speed'])}/s · ETA {format_eta(totals['eta'])}"
+            )
+        else:
+            self.totals_var.set("")
+
     def _poll_queue(self) -> None:
+        self._render_tasks()
         try:
             while True:
                 status = self.queue.get_nowait()
                 state = status.get("status")
-                if state == "downloading":
-                    total = status.get("total_bytes") or status.get("total_bytes_estimate")
-                    downloaded = status.get("downloaded_bytes")
-                    if total and downloaded:
-                        pct = downloaded / total * 100.0
-                        self.progress_var.set(max(0.0, min(100.0, pct)))
-                        self.status_var.set(f"Downloading: {pct:5.1f}%")
-                elif state == "page_progress":
+                if state == "page_progress":
                     current = status.get("current", 0)
                     total = status.get("total", 1)
                     current_video = status.get("current_video", "")
                     pct = (current / total) * 100.0 if total > 0 else 0
                     self.progress_var.set(max(0.0, min(100.0, pct)))
-                    self.status_var.set(f"[{current}/{total}] {current_video[:50]}...")
-                elif state == "finished":
-                    self.progress_var.set(100.0)
-                    self.status_var.set("Processing file...")
+                    self.status_var.set(f"[{current}/{total or '?'}] {current_video[:50]}...")
                 elif state == "__done__":
                     code = status.get("code", 1)
                     message = status.get("message", "")
@@ -272,7 +381,7 @@ class DownloaderGUI:
                         error = status.get("error", "")
                         self.status_var.set(f"Failed ❌ {error or message}")
                     self.download_btn.configure(state=tk.NORMAL)
-                    self.downloading = False
+                    self.running.discard(status.get("kind", "single"))
         except Empty:
             pass
         if self.root.winfo_exists():
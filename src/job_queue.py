@@ -0,0 +1,219 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Optional
+
+
+QUEUED = "queued"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobQueue(ABC):
+    """
+    Interface of a shared job queue used by distributed workers.
+
+    A worker leases a job for `lease_seconds`, keeps the lease alive with
+    heartbeats while it works and then reports the result. A job whose lease
+    expires (because its worker died) becomes available to other workers
+    again, until it has been attempted `max_attempts` times.
+    """
+
+    @abstractmethod
+    def enqueue(self, kind: str, payload: Dict[str, Any], max_attempts: int = 3) -> int:
+        """Add a job. Returns its id."""
+
+    @abstractmethod
+    def lease(self, worker_id: str, lease_seconds: float = 60.0) -> Optional[Dict[str, Any]]:
+        """Lease the oldest available job, or return None if there is none."""
+
+    @abstractmethod
+    def heartbeat(self, job_id: int, worker_id: str, lease_seconds: float = 60.0) -> bool:
+        """Extend a lease. Returns False if the worker no longer holds it."""
+
+    @abstractmethod
+    def complete(self, job_id: int, worker_id: str, result: Dict[str, Any]) -> None:
+        """Record the result of a leased job."""
+
+    @abstractmethod
+    def fail(self, job_id: int, worker_id: str, error: str, retry: bool = True) -> None:
+        """Give a leased job back for another attempt, or fail it for good when `retry` is False."""
+
+    @abstractmethod
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        """State of one job, or None if there is no such job."""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, int]:
+        """Number of jobs per status."""
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteJobQueue(JobQueue):
+    """
+    JobQueue stored in a single SQLite file; needs no outside services.
+
+    Leasing happens in an IMMEDIATE transaction, so concurrent workers in
+    other threads or processes never lease the same job twice.
+
+    By default the file is opened in WAL mode, which only works for workers
+    on one host: WAL keeps its index in shared memory, which a network
+    filesystem does not share between machines. With `shared` the queue
+    uses SQLite's rollback journal instead, for a file on shared storage
+    whose filesystem implements POSIX locks correctly (e.g. NFSv4 with
+    locking enabled); it is slower under contention.
+    """
+
+    def __init__(self, path: str, shared: bool = False) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.shared = shared
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=60, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=DELETE" if shared else "PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS queue_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                worker_id TEXT,
+                lease_expires REAL,
+                attempts INTEGER DEFAULT 0,
+                max_attempts INTEGER DEFAULT 3,
+                result TEXT,
+                error TEXT,
+                created_at REAL,
+                updated_at REAL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS queue_jobs_status ON queue_jobs (status, id)")
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], max_attempts: int = 3) -> int:
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO queue_jobs (kind, payload, status, max_attempts, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (kind, json.dumps(payload), QUEUED, max_attempts, now, now),
+            )
+            return int(cursor.lastrowid)
+
+    def lease(self, worker_id: str, lease_seconds: float = 60.0) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Expired leases that used up their attempts are given up for good
+                self._conn.execute(
+                    "UPDATE queue_jobs SET status = ?, error = 'lease expired too many times', updated_at = ? "
+                    "WHERE status = ? AND lease_expires < ? AND attempts >= max_attempts",
+                    (FAILED, now, LEASED, now),
+                )
+                row = self._conn.execute(
+                    "SELECT id, kind, payload, attempts FROM queue_jobs "
+                    "WHERE status = ? OR (status = ? AND lease_expires < ?) ORDER BY id LIMIT 1",
+                    (QUEUED, LEASED, now),
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "UPDATE queue_jobs SET status = ?, worker_id = ?, lease_expires = ?, attempts = attempts + 1, "
+                    "updated_at = ? WHERE id = ?",
+                    (LEASED, worker_id, now + lease_seconds, now, row[0]),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return {"id": row[0], "kind": row[1], "payload": json.loads(row[2]), "attempt": row[3] + 1}
+
+    def heartbeat(self, job_id: int, worker_id: str, lease_seconds: float = 60.0) -> bool:
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE queue_jobs SET lease_expires = ?, updated_at = ? WHERE id = ? AND worker_id = ? AND status = ?",
+                (now + lease_seconds, now, job_id, worker_id, LEASED),
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, job_id: int, worker_id: str, result: Dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE queue_jobs SET status = ?, result = ?, error = NULL, updated_at = ? WHERE id = ? AND worker_id = ?",
+                (DONE, json.dumps(result), time.time(), job_id, worker_id),
+            )
+
+    def fail(self, job_id: int, worker_id: str, error: str, retry: bool = True) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE queue_jobs SET status = CASE WHEN ? AND attempts < max_attempts THEN ? ELSE ? END, "
+                "error = ?, lease_expires = NULL, updated_at = ? WHERE id = ? AND worker_id = ?",
+                (1 if retry else 0, QUEUED, FAILED, error, time.time(), job_id, worker_id),
+            )
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, kind, payload, status, worker_id, attempts, result, error FROM queue_jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if not row:
+            return None
+        return {
+            "id": row[0], "kind": row[1], "payload": json.loads(row[2]), "status": row[3],
+            "worker_id": row[4], "attempts": row[5],
+            "result": json.loads(row[6]) if row[6] else None, "error": row[7],
+        }
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM queue_jobs GROUP BY status").fetchall()
+        counts = {QUEUED: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        counts.update(dict(rows))
+        return counts
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+QUEUE_BACKENDS: Dict[str, Callable[[str], JobQueue]] = {
+    "sqlite": SQLiteJobQueue,
+    "sqlite-shared": lambda path: SQLiteJobQueue(path, shared=True),
+}
+
+
+def register_queue_backend(scheme: str, factory: Callable[[str], JobQueue]) -> None:
+    """Make another queue backend available to open_queue under `scheme://`."""
+    QUEUE_BACKENDS[scheme] = factory
+
+
+def open_queue(location: str) -> JobQueue:
+    """
+    Open a job queue from a location string.
+
+    "sqlite:///queue.db" (relative), "sqlite:////abs/queue.db" or a plain
+    file path opens a SQLiteJobQueue for workers on this host;
+    "sqlite-shared:////shared/queue.db" opens one on storage shared by
+    several machines (see SQLiteJobQueue); other schemes are looked up in
+    QUEUE_BACKENDS.
+    """
+    scheme, separator, rest = location.partition("://")
+    if not separator:
+        return SQLiteJobQueue(location)
+    if scheme not in QUEUE_BACKENDS:
+        raise ValueError(f"Unknown queue backend '{scheme}'. Available: {', '.join(sorted(QUEUE_BACKENDS))}")
+    if scheme in ("sqlite", "sqlite-shared") and rest.startswith("/"):
+        # Same convention as SQLAlchemy: sqlite:///relative.db, sqlite:////absolute.db
+        rest = rest[1:]
+    return QUEUE_BACKENDS[scheme](rest)
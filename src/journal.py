@@ -0,0 +1,230 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from .archive import extract_shortcode
+
+
+JOURNAL_FILENAME = ".jobs.sqlite3"
+
+PENDING = "pending"
+IN_FLIGHT = "in_flight"
+DONE = "done"
+FAILED = "failed"
+
+PARTIAL_SUFFIXES = (".part", ".ytdl", ".temp")
+
+
+def default_journal_path(output_dir: str) -> str:
+    return os.path.join(output_dir, JOURNAL_FILENAME)
+
+
+class JobJournal:
+    """
+    On-disk journal of batch jobs and the state of each of their items.
+
+    Every item moves through pending -> in_flight -> done/failed. State
+    changes are buffered and written in one transaction every `flush_every`
+    changes or `flush_interval` seconds, so journaling costs almost nothing
+    per item. After a crash at most one unflushed batch is lost; those items
+    are still recorded as pending/in_flight and are simply downloaded again
+    on resume.
+    """
+
+    def __init__(self, path: str, flush_every: int = 50, flush_interval: float = 2.0) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._buffer: Dict[tuple, tuple] = {}
+        self._last_flush = time.monotonic()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                kind TEXT,
+                params TEXT,
+                status TEXT,
+                created_at REAL,
+                updated_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS items (
+                job_id TEXT,
+                url TEXT,
+                seq INTEGER,
+                state TEXT,
+                error TEXT,
+                updated_at REAL,
+                PRIMARY KEY (job_id, url)
+            );
+            """
+        )
+        self._conn.commit()
+
+    def __enter__(self) -> "JobJournal":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def create_job(self, kind: str, params: Dict[str, Any]) -> "Job":
+        job_id = uuid.uuid4().hex[:12]
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, kind, params, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(params), "running", now, now),
+            )
+            self._conn.commit()
+        return Job(self, job_id, kind, params)
+
+    def load_job(self, job_id: str) -> Optional["Job"]:
+        with self._lock:
+            row = self._conn.execute("SELECT kind, params FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if not row:
+                return None
+            states = dict(
+                self._conn.execute("SELECT url, state FROM items WHERE job_id = ?", (job_id,)).fetchall()
+            )
+        job = Job(self, job_id, row[0], json.loads(row[1]))
+        job._finished = {url for url, state in states.items() if state in (DONE, FAILED)}
+        job._interrupted = {url for url, state in states.items() if state == IN_FLIGHT}
+        job._seq = len(states)
+        return job
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT j.job_id, j.kind, j.status, j.created_at, "
+                "SUM(i.state = 'done'), SUM(i.state = 'failed'), COUNT(i.url) "
+                "FROM jobs j LEFT JOIN items i ON i.job_id = j.job_id GROUP BY j.job_id ORDER BY j.created_at"
+            ).fetchall()
+        return [
+            {"job_id": r[0], "kind": r[1], "status": r[2], "created_at": r[3],
+             "done": r[4] or 0, "failed": r[5] or 0, "items": r[6]}
+            for r in rows
+        ]
+
+    def record(self, job_id: str, url: str, seq: Optional[int], state: str, error: Optional[str] = None) -> None:
+        with self._lock:
+            previous = self._buffer.get((job_id, url))
+            if seq is None and previous is not None:
+                seq = previous[0]
+            self._buffer[(job_id, url)] = (seq, state, error, time.time())
+            due = len(self._buffer) >= self.flush_every or time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def set_status(self, job_id: str, status: str) -> None:
+        self.flush()
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET status = ?, updated_at = ? WHERE job_id = ?", (status, time.time(), job_id))
+            self._conn.commit()
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._buffer:
+                self._last_flush = time.monotonic()
+                return
+            rows = [(job_id, url, seq, state, error, ts) for (job_id, url), (seq, state, error, ts) in self._buffer.items()]
+            self._buffer.clear()
+            self._conn.executemany(
+                "INSERT INTO items (job_id, url, seq, state, error, updated_at) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(job_id, url) DO UPDATE SET state = excluded.state, error = excluded.error, "
+                "updated_at = excluded.updated_at, seq = COALESCE(items.seq, excluded.seq)",
+                rows,
+            )
+            self._conn.commit()
+            self._last_flush = time.monotonic()
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+
+class Job:
+    """Handle used by the batch loops to record item states of one journaled job."""
+
+    def __init__(self, journal: JobJournal, job_id: str, kind: str, params: Dict[str, Any]) -> None:
+        self.journal = journal
+        self.id = job_id
+        self.kind = kind
+        self.params = params
+        self._finished: Set[str] = set()
+        self._interrupted: Set[str] = set()
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    @property
+    def interrupted_urls(self) -> Set[str]:
+        """Items that were in flight when the previous run stopped."""
+        return set(self._interrupted)
+
+    @property
+    def finished_urls(self) -> Set[str]:
+        """Items that are done or failed for good."""
+        return set(self._finished)
+
+    def is_finished(self, url: str) -> bool:
+        return url in self._finished
+
+    def register(self, url: str) -> None:
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+        self.journal.record(self.id, url, seq, PENDING)
+
+    def started(self, url: str) -> None:
+        self.journal.record(self.id, url, None, IN_FLIGHT)
+
+    def finished(self, url: str, success: bool, error: Optional[str] = None) -> None:
+        self._finished.add(url)
+        self.journal.record(self.id, url, None, DONE if success else FAILED, error)
+
+    def complete(self) -> None:
+        self.journal.set_status(self.id, "completed")
+
+
+def cleanup_partial_files(output_dir: str, urls: Iterable[str], keep_urls: Iterable[str] = ()) -> int:
+    """
+    Delete the leftover .part/.ytdl files of a job's items below `output_dir`.
+
+    Only partial files of the posts in `urls` are touched, so other jobs and
+    daemon workers writing to the same directory keep theirs. Those of
+    `keep_urls` (items that were in flight and are re-queued) are kept as
+    well, because yt-dlp continues them where they stopped.
+
+    Returns:
+        Number of files removed
+    """
+    keep_ids = {shortcode for shortcode in (extract_shortcode(url) for url in keep_urls) if shortcode}
+    markers = {
+        f"_{shortcode}."
+        for shortcode in (extract_shortcode(url) for url in urls)
+        if shortcode and shortcode not in keep_ids
+    }
+    if not markers:
+        return 0
+    removed = 0
+    for dirpath, _dirnames, filenames in os.walk(output_dir):
+        for filename in filenames:
+            if not (filename.endswith(PARTIAL_SUFFIXES) or ".part-Frag" in filename):
+                continue
+            if not any(marker in filename for marker in markers):
+                continue
+            try:
+                os.remove(os.path.join(dirpath, filename))
+                removed += 1
+            except OSError:
+                pass
+    return removed
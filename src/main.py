@@ -1,7 +1,16 @@
-from .cli import main
+import sys
 
+from .client import forward_cli
 
-if __name__ == "__main__":
-    main()
+
+def main() -> None:
+    # Hand the command line to a running daemon before importing the downloader at all
+    code = forward_cli(sys.argv[1:])
+    if code is not None:
+        sys.exit(code)
+    from .cli import main as cli_main
+    cli_main()
 
 
+if __name__ == "__main__":
+    main()
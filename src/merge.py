@@ -0,0 +1,148 @@
+import os
+import shutil
+import subprocess
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+
+
+# Download the best video-only and audio-only streams as separate files, or a
+# single progressive file when the site has no separate streams
+SEPARATE_STREAMS_FORMAT = "(bestvideo,bestaudio)/best"
+
+DEFAULT_MAX_PENDING_BYTES = 4 * 1024 ** 3
+
+
+class MergeError(Exception):
+    pass
+
+
+def ffmpeg_executable() -> Optional[str]:
+    return shutil.which("ffmpeg") or shutil.which("ffmpeg.exe")
+
+
+def merge_extension(video_ext: str, audio_ext: str) -> str:
+    """Container for a stream pair, following yt-dlp's choice: mp4, webm, or mkv for mixed codecs."""
+    if video_ext in ("mp4", "m4v", "mov") and audio_ext in ("m4a", "mp4", "aac"):
+        return "mp4"
+    if video_ext == "webm" and audio_ext in ("webm", "weba"):
+        return "webm"
+    return "mkv"
+
+
+class MergePool:
+    """
+    Stage that muxes downloaded video/audio stream pairs with ffmpeg.
+
+    Network workers hand a finished pair to `submit` and go on to the next
+    URL while the merge runs here. Every merge is an ffmpeg process, so the
+    pool only needs a thread per running process and is sized to the CPU
+    cores. `submit` blocks while `max_pending` pairs or `max_pending_bytes`
+    of unmerged intermediates are waiting, which throttles the downloads
+    before intermediates can fill the disk.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        max_pending_bytes: int = DEFAULT_MAX_PENDING_BYTES,
+    ) -> None:
+        self.ffmpeg = ffmpeg_executable()
+        if not self.ffmpeg:
+            raise MergeError("ffmpeg is not installed")
+        self.workers = max(1, workers or os.cpu_count() or 2)
+        self.max_pending = max(1, max_pending or self.workers * 2)
+        self.max_pending_bytes = max_pending_bytes
+        self.merged = 0
+        self.failed = 0
+        self.peak_pending = 0
+        self._pending = 0
+        self._pending_bytes = 0
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="merge")
+
+    def __enter__(self) -> "MergePool":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def submit(
+        self,
+        video_path: str,
+        audio_path: str,
+        output_path: str,
+        on_merged: Optional[Callable[[str], None]] = None,
+    ) -> "Future[str]":
+        """
+        Queue one merge; blocks while the pending limits are reached.
+
+        Args:
+            video_path: Video-only stream
+            audio_path: Audio-only stream
+            output_path: Final file; the stream files are removed after a successful merge
+            on_merged: Called with output_path on the merge thread after success
+
+        Returns:
+            Future resolving to output_path, or raising MergeError
+        """
+        size = os.path.getsize(video_path) + os.path.getsize(audio_path)
+        with self._cond:
+            # Always admit one pair, even if it alone is over the byte budget
+            while self._pending and (
+                self._pending >= self.max_pending or self._pending_bytes + size > self.max_pending_bytes
+            ):
+                self._cond.wait()
+            self._pending += 1
+            self._pending_bytes += size
+            self.peak_pending = max(self.peak_pending, self._pending)
+        future = self._executor.submit(self._merge, video_path, audio_path, output_path, on_merged)
+        future.add_done_callback(lambda _: self._release(size))
+        return future
+
+    def _release(self, size: int) -> None:
+        with self._cond:
+            self._pending -= 1
+            self._pending_bytes -= size
+            self._cond.notify_all()
+
+    def _merge(
+        self, video_path: str, audio_path: str, output_path: str, on_merged: Optional[Callable[[str], None]]
+    ) -> str:
+        stem, ext = os.path.splitext(output_path)
+        temp_path = f"{stem}.temp{ext}"
+        command = [
+            self.ffmpeg, "-y", "-loglevel", "error", "-i", video_path, "-i", audio_path,
+            "-map", "0:v:0", "-map", "1:a:0", "-c", "copy", temp_path,
+        ]
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            with self._cond:
+                self.failed += 1
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            # The streams are kept: a rerun finds them on disk and only merges again
+            raise MergeError(f"ffmpeg failed for {output_path}: {result.stderr.strip()[-300:]}")
+        os.replace(temp_path, output_path)
+        for path in (video_path, audio_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        with self._cond:
+            self.merged += 1
+        if on_merged is not None:
+            on_merged(output_path)
+        return output_path
+
+    def close(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+
+def open_merge_pool() -> Optional[MergePool]:
+    """A MergePool for batch downloads, or None when ffmpeg is missing (yt-dlp then picks single files)."""
+    try:
+        return MergePool()
+    except MergeError:
+        return None
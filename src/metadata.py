@@ -0,0 +1,189 @@
+import os
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+
+# Columns of an exported metadata table
+METADATA_FIELDS = ("profile", "id", "url", "title", "uploader", "upload_date", "duration", "view_count")
+NUMERIC_FIELDS = ("duration", "view_count")
+# Listed videos filtered at once when a filter is applied to a stream
+FILTER_CHUNK = 32
+
+
+def _pandas() -> Any:
+    try:
+        import pandas as pd  # type: ignore
+    except ImportError:
+        raise Exception("pandas is not installed. Run: pip install pandas openpyxl")
+    return pd
+
+
+def _typed(df: Any) -> Any:
+    """Give the known columns their types: upload_date as datetime, counts and durations as numbers."""
+    pd = _pandas()
+    if "upload_date" in df.columns and not pd.api.types.is_datetime64_any_dtype(df["upload_date"]):
+        # yt-dlp uses YYYYMMDD; exported CSV files have YYYY-MM-DD
+        dates = df["upload_date"].astype("string").str.replace("-", "", regex=False)
+        df["upload_date"] = pd.to_datetime(dates, format="%Y%m%d", errors="coerce")
+    for column in NUMERIC_FIELDS:
+        if column in df.columns:
+            df[column] = pd.to_numeric(df[column], errors="coerce")
+    return df
+
+
+def metadata_frame(records: Iterable[Dict[str, Any]]) -> Any:
+    """DataFrame with the METADATA_FIELDS columns of listed or probed videos (missing values as NA)."""
+    pd = _pandas()
+    return _typed(pd.DataFrame.from_records(list(records), columns=list(METADATA_FIELDS)))
+
+
+def read_metadata(path: str) -> Any:
+    """
+    Load a metadata table, or any URL sheet with metadata columns.
+
+    Parquet files keep their types. CSV files are parsed by pyarrow's
+    multithreaded reader when it is installed.
+    """
+    pd = _pandas()
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".parquet":
+        df = pd.read_parquet(path)
+    elif ext in (".csv", ".tsv"):
+        sep = "\t" if ext == ".tsv" else ","
+        try:
+            df = pd.read_csv(path, sep=sep, engine="pyarrow")
+        except (ImportError, ValueError):
+            df = pd.read_csv(path, sep=sep)
+    elif ext in (".xlsx", ".xlsm", ".xls"):
+        df = pd.read_excel(path)
+    else:
+        df = pd.read_json(path, lines=True)
+    df.columns = [str(column).strip() for column in df.columns]
+    return _typed(df)
+
+
+def write_metadata(df: Any, path: str) -> None:
+    """Write a metadata table as Parquet (needs pyarrow), CSV or JSON lines, by file extension."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".parquet":
+        try:
+            df.to_parquet(path, index=False)
+        except ImportError:
+            raise Exception("Parquet export needs pyarrow. Run: pip install pyarrow (or export to .csv)")
+    elif ext in (".csv", ".tsv"):
+        out = df.copy()
+        if "upload_date" in out.columns:
+            out["upload_date"] = out["upload_date"].dt.strftime("%Y-%m-%d")
+        out.to_csv(path, index=False, sep="\t" if ext == ".tsv" else ",")
+    else:
+        df.to_json(path, orient="records", lines=True, date_format="iso", force_ascii=False)
+
+
+class MetadataFilter:
+    """
+    Select videos by their metadata before anything is downloaded.
+
+    The expression is a pandas query over the METADATA_FIELDS columns, e.g.
+    "duration < 60 and view_count > 10000" or
+    "upload_date >= '2024-01-01' and upload_date < '2024-07-01'", evaluated
+    vectorized over a whole table (`apply`) or over chunks of a streamed
+    listing (`filter`), so downloads start while the listing paginates.
+    Because of the chunking, expressions should compare each row on its own
+    (no aggregates such as view_count.mean()). Rows with a missing value in
+    a compared column do not match.
+
+    Usage:
+        video_filter = MetadataFilter("duration < 60")
+        for video in video_filter.filter(iter_profile_videos(url)):
+            ...
+
+    One instance may be shared by several listing threads.
+
+    Raises:
+        ValueError: If the expression is not valid for the metadata columns
+    """
+
+    def __init__(self, expression: str, chunk_size: int = FILTER_CHUNK) -> None:
+        self.expression = expression
+        self.chunk_size = max(1, chunk_size)
+        self.matched = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        # Fail on syntax errors and unknown columns before any listing starts
+        self._query(metadata_frame([]))
+
+    def _query(self, df: Any) -> Any:
+        try:
+            return df.query(self.expression)
+        except Exception as e:
+            raise ValueError(f"invalid filter {self.expression!r}: {e}") from e
+
+    def apply(self, df: Any) -> Any:
+        """Rows of `df` that match."""
+        selected = self._query(df)
+        with self._lock:
+            self.matched += len(selected)
+            self.rejected += len(df) - len(selected)
+        return selected
+
+    def filter(
+        self,
+        videos: Iterable[Dict[str, Any]],
+        on_reject: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Yield the matching video dicts of a stream, evaluated FILTER_CHUNK videos at a time.
+
+        `on_reject` is called with every video that does not match.
+        """
+        chunk: List[Dict[str, Any]] = []
+        for video in videos:
+            chunk.append(video)
+            if len(chunk) >= self.chunk_size:
+                yield from self._filter_chunk(chunk, on_reject)
+                chunk = []
+        if chunk:
+            yield from self._filter_chunk(chunk, on_reject)
+
+    def _filter_chunk(
+        self, chunk: List[Dict[str, Any]], on_reject: Optional[Callable[[Dict[str, Any]], None]]
+    ) -> Iterator[Dict[str, Any]]:
+        # The frame's index is the position in the chunk
+        positions = list(self.apply(metadata_frame(chunk)).index)
+        if on_reject is not None:
+            matched = set(positions)
+            for position, video in enumerate(chunk):
+                if position not in matched:
+                    on_reject(video)
+        for position in positions:
+            yield chunk[position]
+
+    def filter_urls(self, source: str, url_column: str = "url") -> Iterator[str]:
+        """URLs of the matching rows of a metadata table (see read_metadata)."""
+        df = read_metadata(source)
+        if url_column not in df.columns:
+            raise Exception(f"Column '{url_column}' not found. Available columns: {', '.join(map(str, df.columns))}")
+        missing = [column for column in METADATA_FIELDS if column not in df.columns]
+        for column in missing:
+            df[column] = None
+        df = _typed(df)
+        for url in self.apply(df)[url_column].dropna().astype(str):
+            yield url.strip()
+
+
+def export_metadata(
+    videos: Iterable[Dict[str, Any]], path: str, video_filter: Optional[MetadataFilter] = None
+) -> int:
+    """
+    Write the metadata of listed or probed videos to `path`, optionally filtered.
+
+    Returns:
+        Number of rows written
+    """
+    df = metadata_frame(videos)
+    if video_filter is not None:
+        df = video_filter.apply(df)
+    write_metadata(df, path)
+    return len(df)
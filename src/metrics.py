@@ -0,0 +1,335 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+from .bandwidth import get_bandwidth_governor
+from .cookies import cookie_pools
+from .ratelimit import get_rate_limiter, is_throttle_error
+from .watchdog import DownloadStalled
+
+
+# Seconds; covers quick metadata calls up to long merges of big videos
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# Postprocessors that move or rename finished files
+FILESYSTEM_POSTPROCESSORS = ("MoveFiles", "MoveFilesAfterDownload")
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Dict[str, str]] = None) -> str:
+    items = list(key) + sorted((extra or {}).items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in items) + "}"
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += 1
+        self.sum += value
+
+
+class Metrics:
+    """
+    In-process counters and histograms plus an optional JSONL event log.
+
+    Only exists while instrumentation is enabled (see configure_metrics);
+    every call site checks get_metrics() for None first, so disabled metrics
+    cost one global lookup per item.
+    """
+
+    def __init__(self, event_log: Optional[str] = None) -> None:
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._help: Dict[str, str] = {}
+        self._event_file = open(event_log, "a", encoding="utf-8", buffering=1) if event_log else None
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def inc(self, name: str, value: float = 1.0, help: str = "", **labels: str) -> None:
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            key = _labels(labels)
+            series[key] = series.get(key, 0.0) + value
+            if help:
+                self._help.setdefault(name, help)
+
+    def observe(self, name: str, value: float, help: str = "", **labels: str) -> None:
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            key = _labels(labels)
+            if key not in series:
+                series[key] = Histogram()
+            series[key].observe(value)
+            if help:
+                self._help.setdefault(name, help)
+
+    def event(self, kind: str, **fields: Any) -> None:
+        """Append one record to the JSONL event log (no-op without a log file)."""
+        if self._event_file is None:
+            return
+        line = json.dumps({"ts": round(time.time(), 3), "event": kind, **fields}, default=str)
+        with self._lock:
+            self._event_file.write(line + "\n")
+
+    def record_item(self, trace: "ItemTrace") -> None:
+        """Fold a finished download into the counters, histograms and event log."""
+        self.inc("igdl_items_total", help="Downloads by outcome", outcome=trace.outcome)
+        self.observe("igdl_item_seconds", trace.duration, help="Wall time per item")
+        for phase, seconds in trace.phases.items():
+            self.observe("igdl_phase_seconds", seconds, help="Time spent per item in each phase", phase=phase)
+        if trace.bytes:
+            self.inc("igdl_downloaded_bytes_total", trace.bytes, help="Bytes transferred")
+        if trace.requests:
+            self.inc("igdl_http_requests_total", trace.requests, help="HTTP requests sent")
+        if trace.retries:
+            self.inc("igdl_retries_total", trace.retries, help="Retries reported by yt-dlp")
+        if trace.error_class:
+            self.inc("igdl_errors_total", help="Failed items by error class", error_class=trace.error_class)
+        self.event(
+            "item",
+            url=trace.url,
+            outcome=trace.outcome,
+            duration=round(trace.duration, 3),
+            phases={phase: round(seconds, 3) for phase, seconds in trace.phases.items()},
+            bytes=trace.bytes,
+            requests=trace.requests,
+            retries=trace.retries,
+            error_class=trace.error_class,
+            error=trace.error,
+        )
+
+    def render(self) -> str:
+        """Prometheus text exposition of all metrics plus rate limiter, bandwidth and cookie account gauges."""
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in series.items():
+                    lines.append(f"{name}{_format_labels(key)} {value:g}")
+            for name, histograms in sorted(self._histograms.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, histogram in histograms.items():
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        lines.append(f"{name}_bucket{_format_labels(key, {'le': f'{bound:g}'})} {count}")
+                    lines.append(f"{name}_bucket{_format_labels(key, {'le': '+Inf'})} {histogram.total}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {histogram.sum:.6f}")
+                    lines.append(f"{name}_count{_format_labels(key)} {histogram.total}")
+        limiter = get_rate_limiter().snapshot()
+        for field in ("rate", "tokens", "requests", "throttle_events", "waited_seconds", "backoff_remaining"):
+            lines.append(f"# TYPE igdl_rate_limiter_{field} gauge")
+            lines.append(f"igdl_rate_limiter_{field} {limiter[field]:g}")
+        bandwidth = get_bandwidth_governor().snapshot()
+        lines.append("# TYPE igdl_bandwidth_limit_bytes gauge")
+        lines.append(f"igdl_bandwidth_limit_bytes {bandwidth['rate']}")
+        for field, values in (
+            ("class_rate_bytes", bandwidth["class_rates"]),
+            ("active", bandwidth["active"]),
+            ("waited_seconds", bandwidth["waited_seconds"]),
+        ):
+            lines.append(f"# TYPE igdl_bandwidth_{field} gauge")
+            for priority, value in values.items():
+                lines.append(f'igdl_bandwidth_{field}{{priority="{priority}"}} {value:g}')
+        accounts = [account for pool in cookie_pools() for account in pool.snapshot()]
+        if accounts:
+            for field in ("uses", "requests", "successes", "throttles", "login_walls", "cooldown_remaining"):
+                lines.append(f"# TYPE igdl_cookie_account_{field} gauge")
+                for account in accounts:
+                    lines.append(f'igdl_cookie_account_{field}{{account="{account["account"]}"}} {account[field]:g}')
+            lines.append("# TYPE igdl_cookie_account_healthy gauge")
+            for account in accounts:
+                lines.append(f'igdl_cookie_account_healthy{{account="{account["account"]}"}} {int(account["state"] == "healthy")}')
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> int:
+        """Expose render() at http://host:port/metrics on a daemon thread. Returns the bound port."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        return self._server.server_address[1]
+
+    def close(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._event_file is not None:
+            with self._lock:
+                self._event_file.close()
+                self._event_file = None
+
+
+class ItemTrace:
+    """
+    Phase timings of one download, fed by yt-dlp's hooks.
+
+    extract   start of the call until the first progress update
+    transfer  first to last progress update (all formats)
+    merge     ffmpeg merger postprocessor
+    filesystem moving the finished files into place
+    postprocess any other postprocessor
+    """
+
+    def __init__(self, url: str) -> None:
+        self.url = url
+        self.start = time.monotonic()
+        self.phases: Dict[str, float] = {}
+        self.outcome: Optional[str] = None
+        self.bytes = 0
+        self.requests = 0
+        self.retries = 0
+        self.error_class: Optional[str] = None
+        self.error: Optional[str] = None
+        self.duration = 0.0
+        self._transfer_start: Optional[float] = None
+        self._transfer_end: Optional[float] = None
+        self._postprocessor_start: Dict[str, float] = {}
+
+    def on_progress(self, status: Dict[str, Any]) -> None:
+        now = time.monotonic()
+        if self._transfer_start is None:
+            self._transfer_start = now
+            self.phases["extract"] = now - self.start
+        self._transfer_end = now
+        if status.get("status") == "finished":
+            self.bytes += int(status.get("total_bytes") or status.get("downloaded_bytes") or 0)
+
+    def on_postprocessor(self, status: Dict[str, Any]) -> None:
+        name = status.get("postprocessor") or ""
+        if status.get("status") == "started":
+            self._postprocessor_start[name] = time.monotonic()
+        elif status.get("status") == "finished" and name in self._postprocessor_start:
+            if name == "Merger":
+                phase = "merge"
+            elif name in FILESYSTEM_POSTPROCESSORS:
+                phase = "filesystem"
+            else:
+                phase = "postprocess"
+            elapsed = time.monotonic() - self._postprocessor_start.pop(name)
+            self.phases[phase] = self.phases.get(phase, 0.0) + elapsed
+
+    def on_warning(self, message: str) -> None:
+        if "Retrying" in message:
+            self.retries += 1
+
+    def finish(self, outcome: str, error: Optional[BaseException] = None) -> None:
+        self.outcome = outcome
+        self.duration = time.monotonic() - self.start
+        if self._transfer_start is None:
+            self.phases.setdefault("extract", self.duration)
+        else:
+            self.phases["transfer"] = self._transfer_end - self._transfer_start
+        if error is not None:
+            self.error_class = classify_error(error)
+            self.error = str(error)[:300]
+
+
+def classify_error(error: BaseException) -> str:
+    """Coarse error class for metrics: throttled, an HTTP status, or the exception type."""
+    if is_throttle_error(error):
+        return "throttled"
+    if isinstance(error, DownloadStalled):
+        return "stalled"
+    cause = getattr(error, "cause", None) or getattr(error, "exc_info", None)
+    if isinstance(cause, tuple) and len(cause) > 1:
+        cause = cause[1]
+    status = getattr(cause, "status", None) or getattr(cause, "code", None)
+    if isinstance(status, int):
+        return f"http_{status}"
+    if isinstance(cause, BaseException):
+        return type(cause).__name__
+    return type(error).__name__
+
+
+def install_metrics(ydl: Any, session: Any) -> None:
+    """
+    Count requests and retries of a YoutubeDL instance into the session's current trace.
+
+    Wraps `urlopen` (after the rate limiter, so waiting is not counted as a
+    request) and `report_warning`, through which yt-dlp announces retries.
+    """
+    original_urlopen = ydl.urlopen
+    original_report_warning = ydl.report_warning
+
+    def counting_urlopen(req: Any, *args: Any, **kwargs: Any) -> Any:
+        trace = session.trace
+        if trace is not None:
+            trace.requests += 1
+        return original_urlopen(req, *args, **kwargs)
+
+    def counting_report_warning(message: str, *args: Any, **kwargs: Any) -> Any:
+        trace = session.trace
+        if trace is not None:
+            trace.on_warning(str(message))
+        return original_report_warning(message, *args, **kwargs)
+
+    ydl.urlopen = counting_urlopen
+    ydl.report_warning = counting_report_warning
+
+
+_metrics: Optional[Metrics] = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> Optional[Metrics]:
+    """The process-wide Metrics, or None when instrumentation is disabled."""
+    return _metrics
+
+
+def configure_metrics(port: Optional[int] = None, event_log: Optional[str] = None) -> Metrics:
+    """
+    Enable instrumentation for this process.
+
+    Args:
+        port: Serve Prometheus metrics at http://127.0.0.1:PORT/metrics
+        event_log: Append one JSON line per item to this file
+
+    Returns:
+        The process-wide Metrics
+    """
+    global _metrics
+    with _metrics_lock:
+        if _metrics is not None:
+            _metrics.close()
+        _metrics = Metrics(event_log)
+        if port is not None:
+            bound = _metrics.serve(port)
+            print(f"Metrics available at http://127.0.0.1:{bound}/metrics")
+        return _metrics
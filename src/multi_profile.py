@@ -0,0 +1,326 @@
+import os
+import sys
+import threading
+from concurrent.futures import Future
+from queue import Empty, Full, Queue
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .archive import DownloadArchive
+from .batch import BoundedWorkerPool
+from .downloader import DownloadSession, _silent_progress_hook
+from .page_downloader import (
+    _download_profile_item,
+    _merge_outcome,
+    build_watermark,
+    extract_username_from_url,
+    iter_new_profile_videos,
+    open_listing_checkpoint,
+    report_item,
+    settle_failure,
+    settle_listed,
+    synced_videos,
+)
+from .merge import open_merge_pool
+from .metadata import MetadataFilter
+from .pagination import ListingCheckpoint
+from .report import ReportWriter, new_results
+from .retry import BATCH_RETRIES, RetryQueue, reraise_interrupt
+from .sources import iter_urls
+
+
+_END = object()
+
+
+class ProfileFeed:
+    """Listing of one profile, produced on its own thread into a small bounded queue."""
+
+    def __init__(self, profile_url: str, username: str, buffer_size: int) -> None:
+        self.profile_url = profile_url
+        self.username = username
+        self.queue: "Queue[Any]" = Queue(maxsize=max(1, buffer_size))
+        self.listed = 0
+        # Videos the listing produced before the metadata filter (if any)
+        self.found = 0
+        self.watermark: Optional[Dict[str, Any]] = None
+        # Resume point of a windowed listing (outside sync runs)
+        self.checkpoint: Optional[ListingCheckpoint] = None
+        self.results = new_results()
+        # Outcome per listing index, used to advance the sync watermark in listing order (sync runs only)
+        self.outcomes: Dict[int, Tuple[Dict[str, Any], bool]] = {}
+
+
+class FairProfileScheduler:
+    """
+    Round-robin scheduler over many profile listings.
+
+    At most `active_limit` profiles are listed at the same time, each on its
+    own thread that runs at most `buffer_size` videos ahead. Iterating the
+    scheduler takes one ready video from each active profile in turn, so a
+    huge account only gets its fair share of download slots and can never
+    starve the others. Finished profiles are replaced with the next ones
+    from the source.
+    """
+
+    def __init__(
+        self,
+        profile_urls: Iterable[str],
+        max_videos: int = 50,
+        cookies_file: Optional[str] = None,
+        active_limit: int = 8,
+        buffer_size: int = 4,
+        archive: Optional[DownloadArchive] = None,
+        sync: bool = False,
+        video_filter: Optional[MetadataFilter] = None,
+        window_size: int = 0,
+    ) -> None:
+        self._source = iter(profile_urls)
+        self.max_videos = max_videos
+        self.cookies_file = cookies_file
+        self.active_limit = max(1, active_limit)
+        self.buffer_size = buffer_size
+        self.archive = archive
+        self.sync = sync
+        self.video_filter = video_filter
+        self.window_size = window_size
+        self.feeds: Dict[str, ProfileFeed] = {}
+        self.invalid: List[str] = []
+        self._active: List[ProfileFeed] = []
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+
+    def _produce(self, feed: ProfileFeed) -> None:
+        listing = iter_new_profile_videos(
+            feed.profile_url,
+            self.max_videos,
+            self.cookies_file,
+            feed.watermark,
+            self.archive if self.sync else None,
+            self.window_size,
+            feed.checkpoint,
+        )
+        videos = self._count_found(feed, listing)
+        if self.video_filter is not None:
+            videos = self.video_filter.filter(videos, on_reject=settle_listed(feed.checkpoint))
+        try:
+            for video_info in videos:
+                if not self._put(feed, video_info):
+                    break
+        finally:
+            listing.close()
+            self._put(feed, _END)
+
+    @staticmethod
+    def _count_found(feed: ProfileFeed, videos: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        for video_info in videos:
+            feed.found += 1
+            yield video_info
+
+    def _put(self, feed: ProfileFeed, item: Any) -> bool:
+        while not self._stop.is_set():
+            try:
+                feed.queue.put(item, timeout=0.1)
+                self._ready.set()
+                return True
+            except Full:
+                continue
+        return False
+
+    def _activate(self) -> None:
+        while len(self._active) < self.active_limit:
+            profile_url = next(self._source, None)
+            if profile_url is None:
+                return
+            username = extract_username_from_url(profile_url)
+            if not username:
+                self.invalid.append(profile_url)
+                continue
+            if username in self.feeds:
+                continue
+            feed = ProfileFeed(profile_url, username, self.buffer_size)
+            if self.sync and self.archive is not None:
+                feed.watermark = self.archive.get_watermark(username)
+            elif self.window_size > 0:
+                feed.checkpoint = open_listing_checkpoint(self.archive, profile_url)
+            self.feeds[username] = feed
+            self._active.append(feed)
+            threading.Thread(target=self._produce, args=(feed,), name=f"list-{username}", daemon=True).start()
+
+    def __iter__(self) -> Iterator[Tuple[ProfileFeed, int, Dict[str, Any]]]:
+        try:
+            while True:
+                self._activate()
+                if not self._active:
+                    return
+                self._ready.clear()
+                progressed = False
+                for feed in list(self._active):
+                    try:
+                        item = feed.queue.get_nowait()
+                    except Empty:
+                        continue
+                    progressed = True
+                    if item is _END:
+                        self._active.remove(feed)
+                        continue
+                    feed.listed += 1
+                    yield feed, feed.listed, item
+                if not progressed:
+                    self._ready.wait(0.1)
+        finally:
+            self._stop.set()
+
+
+def download_many_profiles(
+    profiles_source: str,
+    output_dir: str,
+    cookies_file: Optional[str] = None,
+    max_videos: int = 50,
+    jobs: int = 4,
+    url_column: str = "url",
+    archive: Optional[DownloadArchive] = None,
+    sync: bool = False,
+    report: Optional[ReportWriter] = None,
+    video_filter: Optional[MetadataFilter] = None,
+    window_size: int = 0,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Download many profiles under one global concurrency budget.
+
+    Args:
+        profiles_source: File listing profile URLs (any format accepted by sources.iter_urls)
+        output_dir: Base output directory (videos are organized per username/YYYY-MM)
+        cookies_file: Optional cookies file for authentication
+        max_videos: Maximum number of videos per profile
+        jobs: Total number of downloads running at once, across all profiles
+        url_column: Column holding the profile URLs in spreadsheets/CSV
+        archive: Optional download archive (skips known posts)
+        sync: Incremental sync per profile (requires archive)
+        report: Optional report; each video is written to it as soon as it finishes
+        video_filter: Optional metadata filter applied to every profile's listing
+        window_size: Checkpoint each profile's listing every this many posts (0: no
+            checkpoint), see page_downloader.download_profile_videos
+
+    Returns:
+        Dict mapping username to results in the shape used by print_download_summary
+    """
+    scheduler = FairProfileScheduler(
+        iter_urls(profiles_source, url_column),
+        max_videos,
+        cookies_file,
+        active_limit=max(2, jobs * 2),
+        archive=archive,
+        sync=sync and archive is not None,
+        video_filter=video_filter,
+        window_size=window_size,
+    )
+    thread_state = threading.local()
+    sessions: List[DownloadSession] = []
+    lock = threading.Lock()
+    hook = _silent_progress_hook if jobs > 1 else None
+    merges = open_merge_pool()
+
+    def session_for_thread() -> DownloadSession:
+        session = getattr(thread_state, "session", None)
+        if session is None:
+            session = DownloadSession(
+                output_dir, cookies_file, hook, archive, merge_pool=merges, retries=BATCH_RETRIES
+            ).open()
+            thread_state.session = session
+            with lock:
+                sessions.append(session)
+        return session
+
+    def download_one(
+        scheduled: Tuple[ProfileFeed, int, Dict[str, Any]]
+    ) -> Tuple[str, Optional[str], Optional[Future], Dict[str, Any]]:
+        feed, index, video_info = scheduled
+        return _download_profile_item(
+            session_for_thread(), video_info, index, feed.username, output_dir, max_videos, None, archive, None
+        )
+
+    def record(
+        feed: ProfileFeed,
+        index: int,
+        video_info: Dict[str, Any],
+        status: str,
+        error_msg: Optional[str],
+        item: Dict[str, Any],
+    ) -> None:
+        report_item(feed.results, report, video_info, status, error_msg, item)
+        if scheduler.sync:
+            feed.outcomes[index] = (video_info, status != 'failed')
+        if feed.checkpoint is not None:
+            feed.checkpoint.settled(video_info['url'])
+
+    pending_merges: Dict[Future, Tuple[ProfileFeed, int, Dict[str, Any], Dict[str, Any]]] = {}
+
+    def record_merges(wait: bool = False) -> None:
+        for merge in [m for m in pending_merges if wait or m.done()]:
+            feed, index, video_info, item = pending_merges.pop(merge)
+            record(feed, index, video_info, *_merge_outcome(merge, video_info, None, item))
+
+    retries = RetryQueue(retry_auth=bool(cookies_file) and os.path.isdir(cookies_file))
+
+    def run_pass(items: Iterable[Tuple[ProfileFeed, int, Dict[str, Any]]]) -> None:
+        for scheduled, outcome, error in pool.map_unordered(download_one, items):
+            feed, index, video_info = scheduled
+            reraise_interrupt(error)
+            if error is not None:
+                outcome = ('failed', f"Error downloading video {index}: {error}", None, {'error': error})
+            status, error_msg, merge, item = outcome
+            if merge is not None:
+                pending_merges[merge] = (feed, index, video_info, item)
+            elif status != 'failed' or not settle_failure(feed.results, retries, archive, video_info, item, scheduled):
+                record(feed, index, video_info, status, error_msg, item)
+            record_merges()
+
+    pool = BoundedWorkerPool(jobs)
+    try:
+        run_pass(retries.interleave(scheduler))
+        while len(retries):
+            print(f"Retrying {len(retries)} deferred video(s)...")
+            run_pass(retries.drain())
+        record_merges(wait=True)
+    finally:
+        for session in sessions:
+            session.close()
+        if merges is not None:
+            merges.close()
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for username, feed in scheduler.feeds.items():
+        if feed.found > feed.listed:
+            feed.results['filtered_out'] = feed.found - feed.listed
+        if feed.found == 0 and not feed.watermark:
+            feed.results['errors'].append('No videos found (private profile, rate limiting or authentication required)')
+            feed.results['error_count'] += 1
+        if scheduler.sync and archive is not None:
+            archive.set_watermark(username, build_watermark(feed.watermark, synced_videos(feed.outcomes)))
+        results[username] = feed.results
+    for profile_url in scheduler.invalid:
+        results[profile_url] = {'success': 0, 'failed': 0, 'skipped': 0, 'errors': ['Invalid Instagram profile URL']}
+    return results
+
+
+def iter_profiles_metadata(
+    profile_urls: Iterable[str],
+    max_videos: int = 50,
+    cookies_file: Optional[str] = None,
+    jobs: int = 4,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the listing metadata of many profiles (see metadata.METADATA_FIELDS) without downloading.
+
+    Profiles are listed `jobs` at a time through the fair scheduler, so one
+    huge account does not hold up the export of the others.
+    """
+    scheduler = FairProfileScheduler(
+        profile_urls,
+        max_videos,
+        cookies_file,
+        active_limit=max(1, jobs),
+    )
+    for feed, _index, video_info in scheduler:
+        yield dict(video_info, profile=feed.username)
+    for profile_url in scheduler.invalid:
+        print(f"Skipping invalid Instagram profile URL: {profile_url}", file=sys.stderr)
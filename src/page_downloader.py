@@ -1,97 +1,253 @@
+import itertools
 import os
 import sys
+import time
+from concurrent.futures import Future
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Callable
-from urllib.parse import urlparse
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
-from .downloader import download_instagram_video, ensure_output_directory
+from .archive import DownloadArchive, extract_shortcode
+from .batch import prefetch
+from .cookies import get_cookie_pool, install_cookie_pool
+from .downloader import DownloadSession, ensure_output_directory
+from .merge import open_merge_pool
+from .journal import Job
+from .metadata import MetadataFilter
+from .metrics import get_metrics
+from .pagination import ListingCheckpoint, WindowedProfileListing, iter_entries, listing_entry
+from .ratelimit import get_rate_limiter, install_rate_limiter
+from .report import ReportWriter, add_to_results, file_size, new_results
+from .retry import BATCH_RETRIES, PERMANENT, RetryQueue, classify_failure, count_failure, reraise_interrupt
+from .urls import extract_profile_username
+from .watchdog import count_stall, is_stall_error
 
 
 def extract_username_from_url(url: str) -> Optional[str]:
-    """Extract username from Instagram profile URL."""
-    try:
-        parsed = urlparse(url)
-        if 'instagram.com' not in parsed.netloc:
-            return None
-        
-        path_parts = parsed.path.strip('/').split('/')
-        if path_parts and path_parts[0]:
-            username = path_parts[0]
-            # Remove @ if present
-            if username.startswith('@'):
-                username = username[1:]
-            return username
-        return None
-    except Exception:
-        return None
+    """Extract username from Instagram profile URL (None for post, reel and other non-profile URLs)."""
+    return extract_profile_username(url)
+
+
+# Instagram pins at most three posts above the newest ones, so a sync only
+# stops after more consecutive known posts than can be pinned.
+KNOWN_STREAK_LIMIT = 4
+WATERMARK_RECENT_IDS = 50
+
 
+def _print_extraction_error(error_msg: str) -> None:
+    print(f"Error extracting profile videos: {error_msg}")
 
-def get_profile_videos(url: str, max_videos: int = 50, cookies_file: Optional[str] = None) -> List[Dict[str, Any]]:
+    # Check if it's a common Instagram API issue
+    if "Unable to extract data" in error_msg or "instagram:user" in error_msg:
+        print("\n" + "="*60)
+        print("INSTAGRAM API ISSUE DETECTED")
+        print("="*60)
+        print("Instagram has changed their API or requires authentication.")
+        print("Try these solutions:")
+        print("1. Use cookies file: Export cookies from your browser")
+        print("2. Try individual video URLs instead of profile")
+        print("3. Check if the profile is private")
+        print("4. Update yt-dlp: pip install --upgrade yt-dlp")
+        print("="*60)
+
+
+def iter_profile_videos(url: str, max_videos: int = 50, cookies_file: Optional[str] = None) -> Iterator[Dict[str, Any]]:
     """
-    Get list of video URLs from Instagram profile.
-    Returns list of video metadata including URLs, titles, dates.
+    Yield video metadata from an Instagram profile as the listing is paginated.
+
+    The playlist is extracted without processing, so further pages are only
+    requested while the caller keeps iterating. Breaking out of the loop
+    stops pagination. A `max_videos` of 0 lists the whole profile.
     """
     try:
         from yt_dlp import YoutubeDL  # type: ignore
     except Exception as import_error:
         print(f"Error: yt-dlp not available: {import_error}", file=sys.stderr)
-        return []
+        return
 
-    # Configure yt-dlp to extract playlist info only
+    # Configure yt-dlp to extract playlist info only; request pacing is done
+    # by the shared adaptive rate limiter instead of fixed sleep intervals
     ydl_opts = {
         'quiet': True,
         'no_warnings': True,
         'extract_flat': True,  # Don't download, just get metadata
-        'playlistend': max_videos,
-        'sleep_interval': 1,  # Add delay between requests
-        'max_sleep_interval': 5,
     }
+    if max_videos > 0:
+        ydl_opts['playlistend'] = max_videos
     
-    # Add cookies if provided
-    if cookies_file:
+    # Add cookies if provided; a directory is a pool of accounts to pick one from
+    pool = get_cookie_pool(cookies_file) if cookies_file and os.path.isdir(cookies_file) else None
+    account = pool.acquire() if pool is not None else None
+    if cookies_file and pool is None:
         ydl_opts['cookiefile'] = cookies_file
 
-    videos = []
+    count = 0
+    started = time.monotonic()
+    first_page_seconds = None
+    listing_error: Optional[BaseException] = None
     try:
         with YoutubeDL(ydl_opts) as ydl:
-            print(f"Attempting to extract videos from profile...")
-            info = ydl.extract_info(url, download=False)
+            install_rate_limiter(ydl, get_rate_limiter())
+            if account is not None:
+                install_cookie_pool(ydl, pool, lambda: account)
+                account.install(ydl.cookiejar)
+            print("Attempting to extract videos from profile...")
+            info = ydl.extract_info(url, download=False, process=False)
+            first_page_seconds = time.monotonic() - started
             
-            if info and 'entries' in info:
-                for entry in info['entries']:
-                    if entry and entry.get('url'):
-                        video_info = {
-                            'url': entry['url'],
-                            'title': entry.get('title', ''),
-                            'uploader': entry.get('uploader', ''),
-                            'upload_date': entry.get('upload_date', ''),
-                            'duration': entry.get('duration', 0),
-                            'view_count': entry.get('view_count', 0),
-                        }
-                        videos.append(video_info)
-                        
-                print(f"Successfully extracted {len(videos)} videos")
-            else:
+            if not info or 'entries' not in info:
                 print("No video entries found in profile")
+                return
+
+            for entry in iter_entries(info['entries']):
+                if 0 < max_videos <= count:
+                    break
+                video_info = listing_entry(entry)
+                if video_info is not None:
+                    count += 1
+                    yield video_info
+                        
+            print(f"Successfully extracted {count} videos")
                 
     except Exception as e:
-        error_msg = str(e)
-        print(f"Error extracting profile videos: {error_msg}")
-        
-        # Check if it's a common Instagram API issue
-        if "Unable to extract data" in error_msg or "instagram:user" in error_msg:
-            print("\n" + "="*60)
-            print("INSTAGRAM API ISSUE DETECTED")
-            print("="*60)
-            print("Instagram has changed their API or requires authentication.")
-            print("Try these solutions:")
-            print("1. Use cookies file: Export cookies from your browser")
-            print("2. Try individual video URLs instead of profile")
-            print("3. Check if the profile is private")
-            print("4. Update yt-dlp: pip install --upgrade yt-dlp")
-            print("="*60)
-    
-    return videos
+        listing_error = e
+        _print_extraction_error(str(e))
+    finally:
+        if account is not None:
+            pool.release(account, listing_error)
+        metrics = get_metrics()
+        if metrics is not None:
+            listing_seconds = time.monotonic() - started
+            metrics.observe("igdl_listing_seconds", listing_seconds, help="Profile listing time (incl. consumer waits)")
+            metrics.inc("igdl_listed_videos_total", count, help="Videos yielded by profile listings")
+            metrics.event(
+                "listing",
+                url=url,
+                videos=count,
+                first_page=round(first_page_seconds, 3) if first_page_seconds is not None else None,
+                duration=round(listing_seconds, 3),
+            )
+
+
+def settle_listed(checkpoint: Optional[ListingCheckpoint]) -> Optional[Callable[[Dict[str, Any]], None]]:
+    """Callback settling listed videos that will not be downloaded (e.g. filtered out), or None."""
+    if checkpoint is None:
+        return None
+    return lambda video_info: checkpoint.settled(video_info['url'])
+
+
+def _entry_id(video_info: Dict[str, Any]) -> Optional[str]:
+    return video_info.get('id') or extract_shortcode(video_info.get('url', ''))
+
+
+def open_listing_checkpoint(archive: Optional[DownloadArchive], url: str) -> Optional[ListingCheckpoint]:
+    """
+    Resume point of the windowed listing of a profile, kept in the archive.
+
+    The caller settles every post it is done with (ListingCheckpoint.settled),
+    so the stored index never moves past posts still downloading or waiting
+    for a retry.
+    """
+    username = extract_username_from_url(url)
+    if archive is None or not username:
+        return None
+    start = archive.get_listing_checkpoint(username) or 1
+    if start > 1:
+        print(f"Resuming the listing of @{username} at post {start}")
+    return ListingCheckpoint(start, lambda next_index: archive.set_listing_checkpoint(username, next_index))
+
+
+def open_profile_listing(
+    url: str,
+    max_videos: int = 50,
+    cookies_file: Optional[str] = None,
+    window_size: int = 0,
+    checkpoint: Optional[ListingCheckpoint] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Listing generator of a profile, paginated serially as it is consumed.
+
+    Given a `checkpoint` (see open_listing_checkpoint) and a `window_size`,
+    the listing starts at the checkpoint's index and reports every window
+    of that many posts to it, so an interrupted listing can be resumed.
+    """
+    if window_size <= 0 or checkpoint is None:
+        return iter_profile_videos(url, max_videos, cookies_file)
+    print(f"Listing in resumable windows of {window_size} posts...")
+    listing = WindowedProfileListing(url, max_videos, cookies_file, window_size, checkpoint.start, checkpoint)
+    return iter(listing)
+
+
+def iter_new_profile_videos(
+    url: str,
+    max_videos: int = 50,
+    cookies_file: Optional[str] = None,
+    watermark: Optional[Dict[str, Any]] = None,
+    archive: Optional[DownloadArchive] = None,
+    window_size: int = 0,
+    checkpoint: Optional[ListingCheckpoint] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield profile videos that are newer than a previous sync's watermark.
+
+    Pagination stops as soon as the listing reaches posts that were already
+    seen. Without a watermark every listed video is yielded. See
+    open_profile_listing for the resumable listing options.
+    """
+    listing = open_profile_listing(url, max_videos, cookies_file, window_size, checkpoint)
+    if not watermark:
+        yield from listing
+        return
+
+    known_ids = set(watermark.get('recent_ids') or [])
+    known_streak = 0
+    try:
+        for video_info in listing:
+            video_id = _entry_id(video_info)
+            known = bool(video_id) and (video_id in known_ids or (archive is not None and video_id in archive))
+            if not known:
+                known_streak = 0
+                yield video_info
+                continue
+            known_streak += 1
+            if known_streak >= KNOWN_STREAK_LIMIT:
+                print("Reached previously synced posts, stopping listing")
+                break
+    finally:
+        # Closing the generator releases the YoutubeDL instance right away
+        listing.close()
+
+
+def get_profile_videos(
+    url: str,
+    max_videos: int = 50,
+    cookies_file: Optional[str] = None,
+    watermark: Optional[Dict[str, Any]] = None,
+    archive: Optional[DownloadArchive] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Get list of video URLs from Instagram profile.
+    Returns list of video metadata including URLs, titles, dates.
+
+    When a watermark from a previous sync is given, pagination stops as soon
+    as the listing reaches posts that were already seen, and only the newer
+    posts are returned.
+    """
+    return list(iter_new_profile_videos(url, max_videos, cookies_file, watermark, archive))
+
+
+def build_watermark(previous: Optional[Dict[str, Any]], new_videos: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Merge newly listed videos into a profile watermark (newest ids first, newest upload date)."""
+    previous = previous or {}
+    recent_ids: List[str] = []
+    for video_id in [_entry_id(v) for v in new_videos] + list(previous.get('recent_ids') or []):
+        if video_id and video_id not in recent_ids:
+            recent_ids.append(video_id)
+    dates = [v.get('upload_date') or '' for v in new_videos] + [previous.get('upload_date') or '']
+    return {
+        'newest_id': recent_ids[0] if recent_ids else None,
+        'upload_date': max(dates),
+        'recent_ids': recent_ids[:WATERMARK_RECENT_IDS],
+    }
 
 
 def create_organized_path(base_dir: str, username: str, video_info: Dict[str, Any]) -> str:
@@ -128,7 +284,7 @@ def download_profile_videos_fallback(
     if not username:
         return {'success': 0, 'failed': 0, 'errors': ['Invalid Instagram profile URL']}
     
-    print(f"\nProfile extraction failed. Trying alternative method...")
+    print("\nProfile extraction failed. Trying alternative method...")
     print(f"Please provide individual video URLs from @{username}")
     print("You can:")
     print("1. Copy video URLs manually from Instagram")
@@ -145,12 +301,163 @@ def download_profile_videos_fallback(
     }
 
 
+def _download_profile_item(
+    session: DownloadSession,
+    video_info: Dict[str, Any],
+    index: int,
+    username: str,
+    output_dir: str,
+    max_videos: int,
+    progress_callback: Optional[Callable[[int, int, str], None]],
+    archive: Optional[DownloadArchive],
+    job: Optional[Job],
+) -> Tuple[str, Optional[str], Optional[Future], Dict[str, Any]]:
+    """
+    Download one listed profile video.
+
+    Returns:
+        ('success' | 'failed' | 'skipped' | 'merging', error message or None, merge Future or None,
+        report fields {'id', 'path', 'duration', 'error'}).
+        'merging' items are finished with _merge_outcome once their Future resolves;
+        'failed' items are not yet finished in the job, as they may be retried.
+    """
+    url = video_info['url']
+    shortcode = video_info.get('id') or extract_shortcode(url)
+    item: Dict[str, Any] = {'id': shortcode}
+    if job is not None and job.is_finished(url):
+        return 'skipped', None, None, item
+    if archive is not None and shortcode and (shortcode in archive or archive.has_failed(shortcode)):
+        if job is not None:
+            job.finished(url, True)
+        metrics = get_metrics()
+        if metrics is not None:
+            metrics.inc("igdl_items_total", outcome="skipped")
+        return 'skipped', None, None, item
+    if job is not None:
+        job.register(url)
+        job.started(url)
+
+    # Create organized path for this video
+    video_output_dir = create_organized_path(output_dir, username, video_info)
+
+    # Update progress (the total is the upper bound while the listing is still running)
+    if progress_callback:
+        progress_callback(index, max(index, max_videos), video_info.get('title', f'Video {index}'))
+
+    print(f"\n[{index}] Downloading: {video_info.get('title', 'Untitled')}")
+
+    # Download the video
+    exit_code = session.download(url, output_dir=video_output_dir)
+    item.update(path=session.last_filepath, duration=session.last_duration, error=session.last_error)
+
+    if exit_code == 0 and session.last_merge is not None:
+        print("⏳ Downloaded, merging streams in the background")
+        return 'merging', None, session.last_merge, item
+
+    if exit_code == 0:
+        if job is not None:
+            job.finished(url, True)
+        print("✅ Downloaded successfully")
+        return 'success', None, None, item
+
+    # The caller decides whether the failure is final (see settle_failure)
+    error_msg = f"Failed to download: {video_info.get('title', 'Untitled')}"
+    print(f"❌ {error_msg}")
+    return 'failed', error_msg, None, item
+
+
+def _merge_outcome(
+    merge: Future, video_info: Dict[str, Any], job: Optional[Job], item: Dict[str, Any]
+) -> Tuple[str, Optional[str], Dict[str, Any]]:
+    """Wait for a background merge and record the item's final outcome."""
+    error = merge.exception()
+    if error is None:
+        if job is not None:
+            job.finished(video_info['url'], True)
+        return 'success', None, item
+    error_msg = f"Failed to merge: {video_info.get('title', 'Untitled')}: {error}"
+    print(f"❌ {error_msg}")
+    return 'failed', error_msg, dict(item, error=error)
+
+
+def settle_failure(
+    results: Dict[str, Any],
+    retries: RetryQueue,
+    archive: Optional[DownloadArchive],
+    video_info: Dict[str, Any],
+    item: Dict[str, Any],
+    retry_item: Any,
+) -> bool:
+    """
+    Defer a failed profile video to `retries` if its failure may pass.
+
+    Returns:
+        True when the video was deferred; otherwise the failure is final, is
+        counted by class and, when permanent, recorded in the archive
+    """
+    url = video_info['url']
+    # Cancellation and Ctrl+C end the run; they are not failures of this video
+    reraise_interrupt(item.get('error'))
+    if is_stall_error(item.get('error')):
+        count_stall(results)
+    error_class = classify_failure(item.get('error'))
+    delay = retries.defer(url, retry_item, error_class)
+    if delay is not None:
+        print(f"⏳ {error_class} failure, retrying in {delay:.0f}s "
+              f"(attempt {retries.attempts(url)}/{retries.max_attempts})")
+        return True
+    count_failure(results, error_class)
+    if error_class == PERMANENT and archive is not None:
+        archive.add_failure(item.get('id') or extract_shortcode(url), error_class, item.get('error'))
+    return False
+
+
+def report_item(
+    results: Dict[str, Any],
+    report: Optional[ReportWriter],
+    video_info: Dict[str, Any],
+    outcome: str,
+    error_msg: Optional[str],
+    item: Dict[str, Any],
+) -> None:
+    """Count one finished profile item in `results` and stream it to the report."""
+    nbytes = file_size(item.get('path')) if outcome == 'success' else None
+    add_to_results(results, outcome, error_msg, nbytes)
+    if report is not None:
+        report.write(
+            video_info['url'], outcome, item.get('id'), item.get('path'), item.get('duration'),
+            (item.get('error') or error_msg) if outcome == 'failed' else None, nbytes,
+        )
+
+
+def synced_videos(outcomes: Dict[int, Tuple[Dict[str, Any], bool]]) -> List[Dict[str, Any]]:
+    """
+    Videos a sync watermark may advance over: the listing is newest first, so
+    it stops at the first failure and failed posts are listed again next time.
+    """
+    synced: List[Dict[str, Any]] = []
+    for index in sorted(outcomes):
+        video_info, succeeded = outcomes[index]
+        if not succeeded or len(synced) >= WATERMARK_RECENT_IDS:
+            break
+        synced.append(video_info)
+    return synced
+
+
 def download_profile_videos(
     profile_url: str,
     output_dir: str,
     cookies_file: Optional[str] = None,
     max_videos: int = 50,
-    progress_callback: Optional[Callable[[int, int, str], None]] = None
+    progress_callback: Optional[Callable[[int, int, str], None]] = None,
+    archive: Optional[DownloadArchive] = None,
+    sync: bool = False,
+    buffer_size: int = 32,
+    custom_progress_hook: Optional[Callable[[Dict[str, Any]], None]] = None,
+    job: Optional[Job] = None,
+    report: Optional[ReportWriter] = None,
+    video_filter: Optional[MetadataFilter] = None,
+    window_size: int = 0,
 ) -> Dict[str, Any]:
     """
     Download all videos from an Instagram profile.
@@ -159,81 +466,194 @@ def download_profile_videos(
         profile_url: Instagram profile URL
         output_dir: Base output directory
         cookies_file: Optional cookies file for authentication
-        max_videos: Maximum number of videos to download
+        max_videos: Maximum number of videos to download (0: the whole profile)
         progress_callback: Function to call with (current, total, current_video) progress
+        archive: Optional download archive; archived posts are skipped without network access
+        sync: Incremental sync - stop listing at the watermark stored in the archive
+            by the previous sync and only download newer posts (requires archive)
+        buffer_size: Maximum number of listed videos waiting for download
+        custom_progress_hook: yt-dlp progress hook for the individual downloads
+        job: Optional journaled job; item states are recorded and videos the job
+            already finished in an earlier run are skipped
+        report: Optional report; each video is written to it as soon as it finishes
+        video_filter: Optional metadata filter; listed videos that do not match are
+            never downloaded
+        window_size: Checkpoint the listing in the archive every this many posts
+            (0: no checkpoint). Outside sync mode the listing then resumes after an
+            interruption at the oldest window with videos that had not finished
     
     Returns:
-        Dict with download results: {'success': int, 'failed': int, 'errors': list}
+        Dict with download results: {'success': int, 'failed': int, 'skipped': int, 'bytes': int,
+        'errors': first MAX_ERRORS messages, 'error_count': int}
     """
     username = extract_username_from_url(profile_url)
     if not username:
         return {'success': 0, 'failed': 0, 'errors': ['Invalid Instagram profile URL']}
+    if sync and archive is None:
+        return {'success': 0, 'failed': 0, 'errors': ['Sync mode requires a download archive']}
     
-    print(f"Extracting videos from @{username}...")
-    videos = get_profile_videos(profile_url, max_videos, cookies_file)
-    
-    if not videos:
-        print(f"\nNo videos found. This could be due to:")
-        print("1. Instagram API changes requiring authentication")
-        print("2. Private profile")
-        print("3. Rate limiting")
-        print("4. Profile has no videos")
-        print("\nTrying fallback method...")
-        return download_profile_videos_fallback(profile_url, output_dir, cookies_file, max_videos, progress_callback)
-    
-    print(f"Found {len(videos)} videos. Starting downloads...")
-    
-    results = {'success': 0, 'failed': 0, 'errors': []}
-    
-    for i, video_info in enumerate(videos, 1):
+    watermark = archive.get_watermark(username) if sync and archive is not None else None
+    if watermark:
+        print(f"Syncing @{username} since {watermark.get('upload_date') or watermark.get('newest_id')}...")
+    else:
+        print(f"Extracting videos from @{username}...")
+    # Entries stream from the paginating listing into the download loop through a
+    # bounded buffer: the first download starts after one page fetch and memory
+    # stays flat however large the profile is.
+    # A windowed listing resumes at the oldest window with posts this run did not settle
+    checkpoint = open_listing_checkpoint(archive, profile_url) if window_size > 0 and not sync else None
+    listing = iter_new_profile_videos(
+        profile_url,
+        max_videos,
+        cookies_file,
+        watermark,
+        archive if sync else None,
+        window_size,
+        checkpoint,
+    )
+    if video_filter is not None:
+        listing = video_filter.filter(listing, on_reject=settle_listed(checkpoint))
+    videos = prefetch(listing, buffer_size)
+    # Closing the buffer stops the listing thread when downloading ends early, also on
+    # cancellation or Ctrl+C, which the per-video error handling does not catch
+    try:
+        first_video = next(videos, None)
+
+        if first_video is None and video_filter is not None and video_filter.rejected:
+            print(f"None of the {video_filter.rejected} listed videos match the filter: {video_filter.expression}")
+            if watermark:
+                archive.set_watermark(username, build_watermark(watermark, []))
+            results = new_results()
+            results['filtered_out'] = video_filter.rejected
+            return results
+
+        if first_video is None and watermark:
+            print(f"@{username} is up to date")
+            archive.set_watermark(username, build_watermark(watermark, []))
+            return {'success': 0, 'failed': 0, 'skipped': 0, 'errors': []}
+
+        if first_video is None:
+            print("\nNo videos found. This could be due to:")
+            print("1. Instagram API changes requiring authentication")
+            print("2. Private profile")
+            print("3. Rate limiting")
+            print("4. Profile has no videos")
+            print("\nTrying fallback method...")
+            return download_profile_videos_fallback(profile_url, output_dir, cookies_file, max_videos, progress_callback)
+
+        print("Found first video. Starting downloads while the listing continues...")
+
+        results = new_results()
+        # Outcome per listing index (merges finish out of order), for the sync watermark;
+        # only sync runs need it, and they only list posts newer than the watermark
+        outcomes: Dict[int, Tuple[Dict[str, Any], bool]] = {}
+        pending_merges: Dict[Future, Tuple[int, Dict[str, Any], Dict[str, Any]]] = {}
+
+        retries = RetryQueue(retry_auth=bool(cookies_file) and os.path.isdir(cookies_file))
+
+        def record(
+            index: int, video_info: Dict[str, Any], outcome: str, error_msg: Optional[str], item: Dict[str, Any]
+        ) -> None:
+            report_item(results, report, video_info, outcome, error_msg, item)
+            if outcome == 'failed' and job is not None:
+                job.finished(video_info['url'], False, error_msg)
+            if sync:
+                outcomes[index] = (video_info, outcome != 'failed')
+            if checkpoint is not None:
+                checkpoint.settled(video_info['url'])
+
+        def record_merges(wait: bool = False) -> None:
+            for merge in [m for m in pending_merges if wait or m.done()]:
+                index, video_info, item = pending_merges.pop(merge)
+                record(index, video_info, *_merge_outcome(merge, video_info, job, item))
+
+        merges = open_merge_pool()
         try:
-            # Create organized path for this video
-            video_output_dir = create_organized_path(output_dir, username, video_info)
-            
-            # Update progress
-            if progress_callback:
-                progress_callback(i, len(videos), video_info.get('title', f'Video {i}'))
-            
-            print(f"\n[{i}/{len(videos)}] Downloading: {video_info.get('title', 'Untitled')}")
-            
-            # Download the video
-            exit_code = download_instagram_video(
-                video_info['url'],
-                video_output_dir,
-                cookies_file
-            )
-            
-            if exit_code == 0:
-                results['success'] += 1
-                print(f"✅ Downloaded successfully")
-            else:
-                results['failed'] += 1
-                error_msg = f"Failed to download: {video_info.get('title', 'Untitled')}"
-                results['errors'].append(error_msg)
-                print(f"❌ {error_msg}")
-                
+            session = DownloadSession(
+                output_dir, cookies_file, custom_progress_hook, archive, merge_pool=merges, retries=BATCH_RETRIES
+            ).open()
         except Exception as e:
-            results['failed'] += 1
-            error_msg = f"Error downloading video {i}: {str(e)}"
-            results['errors'].append(error_msg)
-            print(f"❌ {error_msg}")
-    
-    return results
+            if merges is not None:
+                merges.close()
+            add_to_results(results, 'failed', f"Could not start downloader: {e}")
+            return results
+
+        def run_pass(items: Iterable[Tuple[int, Dict[str, Any]]]) -> None:
+            for i, video_info in items:
+                try:
+                    outcome, error_msg, merge, item = _download_profile_item(
+                        session, video_info, i, username, output_dir, max_videos, progress_callback, archive, job
+                    )
+                except Exception as e:
+                    outcome, merge, item = 'failed', None, {'id': video_info.get('id'), 'error': e}
+                    error_msg = f"Error downloading video {i}: {str(e)}"
+                    print(f"❌ {error_msg}")
+
+                if merge is not None:
+                    pending_merges[merge] = (i, video_info, item)
+                elif outcome != 'failed' or not settle_failure(results, retries, archive, video_info, item, (i, video_info)):
+                    record(i, video_info, outcome, error_msg, item)
+                record_merges()
+
+        try:
+            with session:
+                # Transiently failed videos are retried once their backoff expires, between
+                # newly listed ones, and in a final pass after the listing ends
+                run_pass(retries.interleave(enumerate(itertools.chain([first_video], videos), 1)))
+                while len(retries):
+                    print(f"\nRetrying {len(retries)} deferred video(s)...")
+                    run_pass(retries.drain())
+            record_merges(wait=True)
+        finally:
+            if merges is not None:
+                merges.close()
+
+        if sync and archive is not None:
+            archive.set_watermark(username, build_watermark(watermark, synced_videos(outcomes)))
+        if job is not None:
+            job.complete()
+        results['deferred'] = retries.deferred
+        if video_filter is not None:
+            results['filtered_out'] = video_filter.rejected
+
+        return results
+    finally:
+        videos.close()
 
 
-def print_download_summary(results: Dict[str, Any], username: str) -> None:
-    """Print a summary of the download results."""
+def format_failure_classes(classes: Dict[str, int]) -> str:
+    """Final failure counts per class, e.g. "2 permanent, 1 transient"."""
+    return ", ".join(f"{count} {error_class}" for error_class, count in sorted(classes.items()))
+
+
+def print_download_summary(results: Dict[str, Any], username: str, title: Optional[str] = None) -> None:
+    """Print a summary of the download results (headed "Download Summary for @username" unless `title` is given)."""
     print(f"\n{'='*50}")
-    print(f"Download Summary for @{username}")
+    print(title or f"Download Summary for @{username}")
     print(f"{'='*50}")
     print(f"✅ Successfully downloaded: {results['success']}")
     print(f"❌ Failed downloads: {results['failed']}")
+    if results.get('skipped'):
+        print(f"⏭️  Already downloaded (skipped): {results['skipped']}")
+    
+    if results.get('bytes'):
+        print(f"📦 Downloaded: {results['bytes'] / 1048576:.1f} MB")
+    if results.get('filtered_out'):
+        print(f"🔎 Not matching the filter: {results['filtered_out']}")
+    if results.get('stalls'):
+        print(f"🐌 Stalled transfers aborted: {results['stalls']}")
+    if results.get('deferred'):
+        print(f"⏳ Deferred retries: {results['deferred']}")
+    if results.get('failure_classes'):
+        print(f"Failures by class: {format_failure_classes(results['failure_classes'])}")
     
     if results['errors']:
-        print(f"\nErrors encountered:")
+        # Only the first errors are kept in memory; the report file has all of them
+        error_count = results.get('error_count', len(results['errors']))
+        print("\nErrors encountered:")
         for error in results['errors'][:5]:  # Show first 5 errors
             print(f"  • {error}")
-        if len(results['errors']) > 5:
-            print(f"  ... and {len(results['errors']) - 5} more errors")
+        if error_count > 5:
+            print(f"  ... and {error_count - 5} more errors")
     
     print(f"{'='*50}")
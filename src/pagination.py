@@ -0,0 +1,234 @@
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from .cookies import CookieAccount, get_cookie_pool, install_cookie_pool
+from .metrics import get_metrics
+from .ratelimit import get_rate_limiter, install_rate_limiter
+
+
+# Posts per listing window (the unit the listing checkpoint advances by)
+DEFAULT_WINDOW_SIZE = 100
+
+
+def iter_entries(entries: Any, skip: int = 0) -> Iterator[Any]:
+    """Iterate playlist entries lazily, whether yt-dlp returned a list, generator or paged list."""
+    if hasattr(entries, 'getslice'):
+        # Paged lists fetch the page holding an index directly
+        index = skip
+        page_size = getattr(entries, '_pagesize', None) or 50
+        while True:
+            page = entries.getslice(index, index + page_size)
+            if not page:
+                return
+            yield from page
+            index += len(page)
+    else:
+        yield from itertools.islice(entries, skip, None)
+
+
+def listing_entry(entry: Any) -> Optional[Dict[str, Any]]:
+    """Video dict of a flat playlist entry (None for entries without a URL)."""
+    if not entry or not entry.get('url'):
+        return None
+    return {
+        'url': entry['url'],
+        'id': entry.get('id', ''),
+        'title': entry.get('title', ''),
+        'uploader': entry.get('uploader', ''),
+        'upload_date': entry.get('upload_date', ''),
+        # None when the listing page does not carry them, so filters skip the video
+        'duration': entry.get('duration'),
+        'view_count': entry.get('view_count'),
+    }
+
+
+class ListingCheckpoint:
+    """
+    Resume point of a windowed listing that only moves past posts that have settled.
+
+    The listing reports every window it hands out (`listed`), the consumer
+    reports every post it is done with for good (`settled`: downloaded,
+    skipped, filtered out or finally failed; not while a retry or merge is
+    pending). `save` is called with the start of the oldest window that
+    still has unsettled posts, or of the next window to list once all are
+    settled, whenever that moves; and with None once the listing reached
+    its end and every post settled. A listing resumed at the saved index
+    therefore re-lists nothing that is still unfinished.
+
+    Thread-safe: the listing reports from its producer thread.
+    """
+
+    def __init__(self, start: int, save: Callable[[Optional[int]], None]) -> None:
+        self.start = start
+        self._save = save
+        self._saved: Optional[int] = start
+        # Unsettled URLs per window start, oldest window first
+        self._windows: "OrderedDict[int, Dict[str, int]]" = OrderedDict()
+        self._next = start
+        self._complete = False
+        self._lock = threading.Lock()
+
+    def listed(self, start: int, window_size: int, videos: List[Dict[str, Any]]) -> None:
+        """A window is about to be handed out."""
+        with self._lock:
+            pending: Dict[str, int] = {}
+            for video_info in videos:
+                pending[video_info['url']] = pending.get(video_info['url'], 0) + 1
+            self._windows[start] = pending
+            self._next = start + window_size
+            self._advance()
+
+    def settled(self, url: str) -> None:
+        """The consumer is done with a post."""
+        with self._lock:
+            for pending in self._windows.values():
+                if url in pending:
+                    pending[url] -= 1
+                    if not pending[url]:
+                        del pending[url]
+                    break
+            self._advance()
+
+    def complete(self) -> None:
+        """The listing reached its end."""
+        with self._lock:
+            self._complete = True
+            self._advance()
+
+    def _advance(self) -> None:
+        while self._windows and not next(iter(self._windows.values())):
+            self._windows.popitem(last=False)
+        if self._windows:
+            position: Optional[int] = next(iter(self._windows))
+        else:
+            position = None if self._complete else self._next
+        if position != self._saved:
+            self._saved = position
+            self._save(position)
+
+
+class WindowedProfileListing:
+    """
+    Resumable profile listing, walked once and handed out in windows of posts.
+
+    Instagram's profile listing is cursor-paged: a page can only be reached
+    through the pages before it, so windows fetched in parallel would each
+    walk all earlier pages again. The listing is therefore one lazy flat
+    extraction, paginated serially through the shared rate limiter and
+    cookie pool like iter_profile_videos. Its posts are collected
+    `window_size` at a time (1-based index, newest first) and each window
+    is handed out once it is complete, so memory stays constant however
+    many posts the profile has. The listing ends with the profile or after
+    post `max_videos` (0: no limit).
+
+    A listing resumed at `start` skips the earlier posts; listings yt-dlp
+    can address by index (paged lists) jump straight there, cursor-paged
+    ones walk the earlier pages once more.
+
+    Every window is reported to `checkpoint` before its posts are handed
+    out, and the end of the listing once it is reached; the consumer
+    settles the posts (see ListingCheckpoint), so a listing resumed at the
+    saved index re-lists the windows that still had unfinished posts (the
+    archive skips those that did finish).
+
+    Usage:
+        listing = WindowedProfileListing(url, max_videos=0, start=checkpoint.start, checkpoint=checkpoint)
+        for video_info in listing:
+            ...
+    """
+
+    def __init__(
+        self,
+        url: str,
+        max_videos: int = 0,
+        cookies_file: Optional[str] = None,
+        window_size: int = DEFAULT_WINDOW_SIZE,
+        start: int = 1,
+        checkpoint: Optional[ListingCheckpoint] = None,
+    ) -> None:
+        self.url = url
+        self.last = max_videos if max_videos > 0 else None
+        self.cookies_file = cookies_file
+        self.window_size = max(1, window_size)
+        self.start = max(1, start)
+        self.checkpoint = checkpoint
+        self.listed = 0
+        self.windows = 0
+        self.error: Optional[BaseException] = None
+        self.complete = False
+        self.pool = get_cookie_pool(cookies_file) if cookies_file and os.path.isdir(cookies_file) else None
+
+    def entries(self) -> Iterator[Any]:
+        """Flat playlist entries from post `start` on; pages are fetched as they are consumed."""
+        from yt_dlp import YoutubeDL  # type: ignore
+
+        ydl_opts: Dict[str, Any] = {'quiet': True, 'no_warnings': True, 'extract_flat': True}
+        if self.cookies_file and self.pool is None:
+            ydl_opts['cookiefile'] = self.cookies_file
+        account: Optional[CookieAccount] = self.pool.acquire() if self.pool is not None else None
+        error: Optional[BaseException] = None
+        try:
+            with YoutubeDL(ydl_opts) as ydl:
+                install_rate_limiter(ydl, get_rate_limiter())
+                if account is not None:
+                    install_cookie_pool(ydl, self.pool, lambda: account)
+                    account.install(ydl.cookiejar)
+                info = ydl.extract_info(self.url, download=False, process=False)
+                yield from iter_entries((info or {}).get('entries') or [], self.start - 1)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            if account is not None:
+                self.pool.release(account, error)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        entries = self.entries()
+        window_start = self.start
+        window: List[Dict[str, Any]] = []
+        count = 0
+        started = time.monotonic()
+        try:
+            try:
+                for entry in entries:
+                    if self.last is not None and window_start + count > self.last:
+                        break
+                    count += 1
+                    video_info = listing_entry(entry)
+                    if video_info is not None:
+                        window.append(video_info)
+                    if count == self.window_size:
+                        yield from self._hand_out(window_start, window, started)
+                        window_start += count
+                        window, count = [], 0
+                        started = time.monotonic()
+            except Exception as e:
+                self.error = e
+                print(f"Listing failed at post {window_start + count}: {e}", file=sys.stderr)
+                return
+            if count:
+                yield from self._hand_out(window_start, window, started)
+            self.complete = True
+            if self.checkpoint is not None:
+                self.checkpoint.complete()
+            print(f"Listed {self.listed} videos in {self.windows} window(s)")
+        finally:
+            entries.close()
+
+    def _hand_out(self, start: int, videos: List[Dict[str, Any]], started: float) -> Iterator[Dict[str, Any]]:
+        self.windows += 1
+        metrics = get_metrics()
+        if metrics is not None:
+            metrics.observe(
+                "igdl_listing_window_seconds", time.monotonic() - started, help="Time to list one window"
+            )
+        if self.checkpoint is not None:
+            self.checkpoint.listed(start, self.window_size, videos)
+        for video_info in videos:
+            self.listed += 1
+            yield video_info
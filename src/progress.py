@@ -0,0 +1,154 @@
+"""
+Coalesced download progress for the GUI.
+
+Download threads report every yt-dlp progress callback to a shared
+ProgressTracker; the Tk thread polls it for the rows that changed and for
+the totals shown under the downloads list.
+"""
+
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class TaskProgress:
+    """
+    Latest known state of one download.
+
+    A download of separate video and audio streams reports each stream
+    (format) on its own; their bytes are added up, so the row covers the
+    whole post.
+    """
+
+    __slots__ = ("key", "title", "state", "downloaded", "total", "speed", "eta", "updated", "streams")
+
+    def __init__(self, key: str, title: str) -> None:
+        self.key = key
+        self.title = title
+        self.state = "downloading"
+        self.downloaded = 0
+        self.total: Optional[int] = None
+        self.speed: Optional[float] = None
+        self.eta: Optional[float] = None
+        self.updated = time.monotonic()
+        # (downloaded, total) per format of the download
+        self.streams: Dict[str, Tuple[int, Optional[int]]] = {}
+
+    def update_stream(self, format_id: str, downloaded: int, total: Optional[int]) -> None:
+        """Record one stream's bytes and add up all streams seen so far."""
+        self.streams[format_id] = (downloaded, total or self.streams.get(format_id, (0, None))[1])
+        self.downloaded = sum(stream_downloaded for stream_downloaded, _total in self.streams.values())
+        totals = [stream_total for _downloaded, stream_total in self.streams.values() if stream_total]
+        self.total = sum(totals) if totals else None
+
+    @property
+    def percent(self) -> Optional[float]:
+        if not self.total:
+            return None
+        return max(0.0, min(100.0, self.downloaded / self.total * 100.0))
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "key": self.key,
+            "title": self.title,
+            "state": self.state,
+            "downloaded": self.downloaded,
+            "total": self.total,
+            "percent": self.percent,
+            "speed": self.speed,
+            "eta": self.eta,
+        }
+
+
+class ProgressTracker:
+    """
+    Coalesce yt-dlp progress callbacks from many download threads.
+
+    yt-dlp calls progress hooks once per received chunk. `hook` only
+    overwrites the latest state of the task under a lock, so a download
+    thread never queues anything. A consumer (e.g. the Tk thread) calls
+    `drain` on its own schedule and gets at most one update per task that
+    changed since the previous call, however many callbacks arrived.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._tasks: Dict[str, TaskProgress] = {}
+        self._changed: Dict[str, None] = {}
+
+    def hook(self, status: Dict[str, Any]) -> None:
+        """yt-dlp progress hook; safe to share between threads."""
+        info = status.get("info_dict") or {}
+        key = info.get("webpage_url") or info.get("id") or status.get("filename") or "download"
+        with self._lock:
+            task = self._tasks.get(key)
+            if task is None:
+                task = TaskProgress(key, info.get("title") or info.get("id") or key)
+                self._tasks[key] = task
+            state = status.get("status")
+            format_id = str(info.get("format_id") or "")
+            if state == "downloading":
+                task.state = "downloading"
+                total = status.get("total_bytes") or status.get("total_bytes_estimate")
+                task.update_stream(format_id, status.get("downloaded_bytes") or 0, total)
+                task.speed = status.get("speed")
+                task.eta = status.get("eta")
+            elif state == "finished":
+                task.state = "finished"
+                previous = task.streams.get(format_id, (0, None))
+                finished = status.get("total_bytes") or status.get("downloaded_bytes") or previous[0]
+                task.update_stream(format_id, finished, finished)
+                task.speed = None
+                task.eta = 0
+            elif state == "error":
+                task.state = "error"
+                task.speed = None
+            task.updated = time.monotonic()
+            self._changed[key] = None
+
+    def drain(self) -> List[Dict[str, Any]]:
+        """Tasks that changed since the previous call, one entry each."""
+        with self._lock:
+            changed = [self._tasks[key].as_dict() for key in self._changed]
+            self._changed.clear()
+        return changed
+
+    def totals(self) -> Dict[str, Any]:
+        """Aggregate of the downloads in progress: count, combined speed and ETA."""
+        with self._lock:
+            active = [task for task in self._tasks.values() if task.state == "downloading"]
+            speed = sum(task.speed or 0.0 for task in active)
+            remaining = sum(max(0, (task.total or 0) - task.downloaded) for task in active)
+        return {
+            "active": len(active),
+            "speed": speed,
+            "eta": remaining / speed if speed > 0 and remaining else None,
+        }
+
+    def forget_finished(self) -> None:
+        """Drop tasks that are no longer downloading."""
+        with self._lock:
+            for key in [key for key, task in self._tasks.items() if task.state != "downloading"]:
+                del self._tasks[key]
+                self._changed.pop(key, None)
+
+
+def format_bytes(value: Optional[float]) -> str:
+    """Human-readable size, e.g. "1.5 MB" ("-" when unknown)."""
+    if not value:
+        return "-"
+    for unit in ("B", "KB", "MB", "GB"):
+        if value < 1024 or unit == "GB":
+            return f"{value:.1f} {unit}" if unit != "B" else f"{value:.0f} B"
+        value /= 1024
+    return "-"
+
+
+def format_eta(seconds: Optional[float]) -> str:
+    """Remaining time as m:ss or XhYYm ("-" when unknown)."""
+    if seconds is None:
+        return "-"
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    return f"{seconds // 60}:{seconds % 60:02d}"
@@ -0,0 +1,201 @@
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+
+THROTTLE_MARKERS = ("429", "too many requests", "rate limit", "rate-limit", "please wait a few minutes")
+# Hosts serving the media files themselves; the request limit applies to pages and API calls
+MEDIA_HOSTS = ("cdninstagram.com", "fbcdn.net")
+
+
+class AdaptiveRateLimiter:
+    """
+    Token-bucket request limiter with AIMD adaptation.
+
+    Every page and API request made by yt-dlp takes one token. The refill rate grows
+    additively (by `increase` req/s per successful request, up to `max_rate`)
+    and is cut multiplicatively (by `decrease`) whenever Instagram answers
+    with a throttling response, after which all workers pause for the
+    backoff period. One instance is shared by every worker and entry point.
+    """
+
+    def __init__(
+        self,
+        rate: float = 1.0,
+        burst: int = 5,
+        min_rate: float = 0.05,
+        max_rate: float = 5.0,
+        increase: float = 0.02,
+        decrease: float = 0.5,
+        backoff: float = 30.0,
+    ) -> None:
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.min_rate = min_rate
+        self.max_rate = max(max_rate, rate)
+        self.increase = increase
+        self.decrease = decrease
+        self.backoff = backoff
+        self.tokens = float(self.burst)
+        self.requests = 0
+        self.throttle_events = 0
+        self.waited_seconds = 0.0
+        self._backoff_until = 0.0
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def acquire(self) -> float:
+        """
+        Block until a request may be sent.
+
+        Returns:
+            Seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._backoff_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    self.requests += 1
+                    self.waited_seconds += waited
+                    return waited
+                if now < self._backoff_until:
+                    delay = self._backoff_until - now
+                else:
+                    delay = (1 - self.tokens) / self.rate
+            delay = min(max(delay, 0.01), 1.0)
+            time.sleep(delay)
+            waited += delay
+
+    def on_success(self) -> None:
+        with self._lock:
+            if self.rate >= self.max_rate:
+                return
+            self.rate = min(self.max_rate, self.rate + self.increase)
+            recovered = self.rate >= self.max_rate and self.throttle_events > 0
+        if recovered:
+            print(f"Rate limiter: recovered to {self.max_rate:.2f} req/s", file=sys.stderr)
+
+    def on_throttle(self, retry_after: Optional[float] = None) -> None:
+        """Cut the rate and pause every worker after a throttling response."""
+        with self._lock:
+            old_rate = self.rate
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self.tokens = 0.0
+            pause = retry_after if retry_after and retry_after > 0 else self.backoff
+            self._backoff_until = max(self._backoff_until, time.monotonic() + pause)
+            self.throttle_events += 1
+        print(
+            f"Rate limiter: throttled by server, {old_rate:.2f} -> {self.rate:.2f} req/s, pausing {pause:.1f}s",
+            file=sys.stderr,
+        )
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current rate and backoff state, for logs and metrics."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            return {
+                "rate": round(self.rate, 3),
+                "max_rate": self.max_rate,
+                "tokens": round(self.tokens, 2),
+                "requests": self.requests,
+                "throttle_events": self.throttle_events,
+                "waited_seconds": round(self.waited_seconds, 2),
+                "backoff_remaining": round(max(0.0, self._backoff_until - now), 2),
+            }
+
+
+def is_throttle_error(error: BaseException) -> bool:
+    status = getattr(error, "status", None) or getattr(error, "code", None)
+    if status == 429:
+        return True
+    cause = getattr(error, "cause", None) or getattr(error, "exc_info", None)
+    if isinstance(cause, BaseException) and cause is not error and is_throttle_error(cause):
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in THROTTLE_MARKERS)
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Value of a Retry-After header carried by an HTTP error, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or getattr(error, "headers", None)
+    if not headers:
+        return None
+    try:
+        value = headers.get("Retry-After")
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def is_media_request(req: Any) -> bool:
+    """True for requests to the media CDN (video files, stream fragments)."""
+    url = req if isinstance(req, str) else getattr(req, "url", None)
+    if url is None and hasattr(req, "get_full_url"):
+        url = req.get_full_url()
+    host = urlparse(url or "").hostname or ""
+    return any(host == media_host or host.endswith("." + media_host) for media_host in MEDIA_HOSTS)
+
+
+def install_rate_limiter(ydl: Any, limiter: "AdaptiveRateLimiter") -> None:
+    """
+    Route the page and API requests of a YoutubeDL instance through `limiter`.
+
+    Extractors and the HTTP downloader all send requests via
+    `YoutubeDL.urlopen`, so wrapping it covers metadata and profile listing
+    pages. Media and fragment downloads from the CDN (see MEDIA_HOSTS) do not
+    wait for a token, so parallel downloads are not capped at the request
+    rate; a throttling answer from the CDN still slows the limiter down.
+    """
+    original_urlopen = ydl.urlopen
+
+    def limited_urlopen(req: Any, *args: Any, **kwargs: Any) -> Any:
+        if is_media_request(req):
+            try:
+                return original_urlopen(req, *args, **kwargs)
+            except Exception as e:
+                if is_throttle_error(e):
+                    limiter.on_throttle(retry_after_seconds(e))
+                raise
+        limiter.acquire()
+        try:
+            response = original_urlopen(req, *args, **kwargs)
+        except Exception as e:
+            if is_throttle_error(e):
+                limiter.on_throttle(retry_after_seconds(e))
+            raise
+        limiter.on_success()
+        return response
+
+    ydl.urlopen = limited_urlopen
+
+
+_default_limiter: Optional[AdaptiveRateLimiter] = None
+_default_lock = threading.Lock()
+
+
+def get_rate_limiter() -> AdaptiveRateLimiter:
+    """Process-wide limiter shared by single, Excel and profile downloads."""
+    global _default_limiter
+    with _default_lock:
+        if _default_limiter is None:
+            _default_limiter = AdaptiveRateLimiter()
+        return _default_limiter
+
+
+def configure_rate_limiter(rate: float, max_rate: Optional[float] = None) -> AdaptiveRateLimiter:
+    """Replace the process-wide limiter, e.g. from command-line options."""
+    global _default_limiter
+    with _default_lock:
+        _default_limiter = AdaptiveRateLimiter(rate=rate, max_rate=max_rate or max(rate, 5.0))
+        return _default_limiter
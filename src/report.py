@@ -0,0 +1,155 @@
+import csv
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional
+
+from .metrics import classify_error
+
+
+REPORT_FIELDS = ("time", "url", "id", "outcome", "path", "bytes", "duration", "error_class", "error")
+
+# Error messages kept in a results dict; the rest are only counted (and in the report file)
+MAX_ERRORS = 20
+
+
+def new_results() -> Dict[str, Any]:
+    """Empty results dict in the shape used by print_download_summary."""
+    return {'success': 0, 'failed': 0, 'skipped': 0, 'errors': [], 'error_count': 0, 'bytes': 0}
+
+
+def add_to_results(
+    results: Dict[str, Any], outcome: str, error: Optional[str] = None, nbytes: Optional[int] = None
+) -> None:
+    """Fold one item into a results dict; only the first MAX_ERRORS error messages are kept."""
+    results[outcome] = results.get(outcome, 0) + 1
+    if nbytes:
+        results['bytes'] = results.get('bytes', 0) + nbytes
+    if error:
+        results['error_count'] = results.get('error_count', 0) + 1
+        if len(results['errors']) < MAX_ERRORS:
+            results['errors'].append(error)
+
+
+def file_size(path: Optional[str]) -> Optional[int]:
+    if not path:
+        return None
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return None
+
+
+class ReportWriter:
+    """
+    Per-item report of a run, one line per finished item.
+
+    Lines are appended as items finish and flushed straight away, so a long
+    run can be followed with `tail -f` and nothing is held in memory. The
+    format follows the file extension: CSV for .csv, JSON lines otherwise.
+    Safe to share between threads.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.format = "csv" if path.lower().endswith(".csv") else "jsonl"
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        empty = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, "a", encoding="utf-8", newline="")
+        self._csv: Optional[csv.DictWriter] = None
+        if self.format == "csv":
+            self._csv = csv.DictWriter(self._file, REPORT_FIELDS)
+            if empty:
+                self._csv.writeheader()
+        self._lock = threading.Lock()
+        self.items = 0
+
+    def __enter__(self) -> "ReportWriter":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def write(
+        self,
+        url: str,
+        outcome: str,
+        item_id: Optional[str] = None,
+        path: Optional[str] = None,
+        duration: Optional[float] = None,
+        error: Any = None,
+        nbytes: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Append one item and return the written record.
+
+        Args:
+            url: Item URL
+            outcome: 'success', 'failed' or 'skipped'
+            item_id: Post shortcode or media id
+            path: Final file; its size is reported when `nbytes` is not given
+            duration: Seconds the download took
+            error: Exception or message of a failed item
+            nbytes: Downloaded size in bytes
+        """
+        if nbytes is None and outcome == 'success':
+            nbytes = file_size(path)
+        record = {
+            "time": round(time.time(), 3),
+            "url": url,
+            "id": item_id,
+            "outcome": outcome,
+            "path": path,
+            "bytes": nbytes,
+            "duration": round(duration, 3) if duration is not None else None,
+            "error_class": _error_class(error),
+            "error": str(error)[:300] if error else None,
+        }
+        with self._lock:
+            if self._csv is not None:
+                self._csv.writerow(record)
+            else:
+                self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._file.flush()
+            self.items += 1
+        return record
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+def _error_class(error: Any) -> Optional[str]:
+    if not error:
+        return None
+    return classify_error(error) if isinstance(error, BaseException) else "error"
+
+
+def read_report(path: str) -> Iterator[Dict[str, Any]]:
+    """Stream the records of a report file (also while it is still being written)."""
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".csv"):
+            for row in csv.DictReader(f):
+                row["bytes"] = int(row["bytes"]) if row.get("bytes") else None
+                row["duration"] = float(row["duration"]) if row.get("duration") else None
+                yield row
+            return
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue  # Line still being written
+
+
+def summarize_report(path: str) -> Dict[str, Any]:
+    """Results dict of a report file, computed in one pass with constant memory."""
+    results = new_results()
+    for record in read_report(path):
+        add_to_results(results, record.get("outcome") or "failed", record.get("error"), record.get("bytes"))
+    return results
@@ -0,0 +1,223 @@
+import heapq
+import itertools
+import random
+import socket
+import threading
+import time
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+from .cookies import is_login_wall
+from .ratelimit import is_throttle_error
+
+
+PERMANENT = "permanent"
+TRANSIENT = "transient"
+AUTH = "auth"
+
+# Download attempts per item, the first one included
+DEFAULT_MAX_ATTEMPTS = 4
+# Delay before the first retry; doubles with every further attempt
+DEFAULT_BASE_DELAY = 30.0
+MAX_DELAY = 900.0
+# Relative spread applied to every delay, so deferred items do not come back in lockstep
+JITTER = 0.5
+# yt-dlp's own HTTP retries inside one attempt of a batch download; later ones are deferred
+BATCH_RETRIES = 1
+
+PERMANENT_STATUS = (400, 404, 410)
+AUTH_STATUS = (401, 403)
+TRANSIENT_STATUS = (408, 425, 429, 500, 502, 503, 504)
+
+PERMANENT_MARKERS = (
+    "unsupported url",
+    "not found",
+    "has been removed",
+    "has been deleted",
+    "no longer available",
+    "there is no video in this post",
+    "no video formats found",
+    "this content isn't available",
+)
+AUTH_MARKERS = ("private", "only available for registered users", "use --cookies")
+TRANSIENT_MARKERS = (
+    "download stalled",
+    "timed out",
+    "timeout",
+    "connection reset",
+    "connection refused",
+    "connection aborted",
+    "temporary failure",
+    "remote end closed",
+    "incompleteread",
+    "network is unreachable",
+    "bad gateway",
+    "service unavailable",
+)
+
+
+def _cause(error: BaseException) -> Optional[BaseException]:
+    cause = getattr(error, "cause", None) or getattr(error, "exc_info", None) or error.__cause__
+    if isinstance(cause, tuple) and len(cause) > 1:
+        cause = cause[1]
+    return cause if isinstance(cause, BaseException) and cause is not error else None
+
+
+def _status(error: BaseException) -> Optional[int]:
+    for candidate in (error, _cause(error)):
+        status = getattr(candidate, "status", None) or getattr(candidate, "code", None)
+        response = getattr(candidate, "response", None)
+        status = status or getattr(response, "status", None)
+        if isinstance(status, int):
+            return status
+    return None
+
+
+def classify_failure(error: Any) -> str:
+    """
+    Sort a failed download into PERMANENT, TRANSIENT or AUTH.
+
+    Throttling, timeouts, dropped connections and server errors are
+    transient; missing, removed and unsupported posts are permanent; login
+    walls and private content need other cookies. Anything unrecognized is
+    treated as transient, so it gets retried but is never recorded as
+    permanently failed.
+    """
+    if error is None:
+        return TRANSIENT
+    if isinstance(error, BaseException):
+        if is_throttle_error(error):
+            return TRANSIENT
+        if is_login_wall(error):
+            return AUTH
+        status = _status(error)
+        if status in TRANSIENT_STATUS or (status is not None and status >= 500):
+            return TRANSIENT
+        if status in AUTH_STATUS:
+            return AUTH
+        if status in PERMANENT_STATUS:
+            return PERMANENT
+        cause = _cause(error)
+        if isinstance(error, (socket.timeout, ConnectionError)) or isinstance(cause, (socket.timeout, ConnectionError)):
+            return TRANSIENT
+    message = str(error).lower()
+    if any(marker in message for marker in TRANSIENT_MARKERS):
+        return TRANSIENT
+    if any(marker in message for marker in AUTH_MARKERS):
+        return AUTH
+    if any(marker in message for marker in PERMANENT_MARKERS):
+        return PERMANENT
+    return TRANSIENT
+
+
+def reraise_interrupt(error: Any) -> None:
+    """
+    Re-raise a cancellation or interrupt found in an item's error slot.
+
+    BaseExceptions that are not Exceptions (aio.DownloadCancelled,
+    KeyboardInterrupt, SystemExit) stop the whole run; they must never be
+    classified as an item failure and deferred for a retry.
+    """
+    if isinstance(error, BaseException) and not isinstance(error, Exception):
+        raise error
+
+
+def count_failure(results: Dict[str, Any], error_class: str) -> None:
+    """Count a final failure by class in a results dict."""
+    classes = results.setdefault('failure_classes', {})
+    classes[error_class] = classes.get(error_class, 0) + 1
+
+
+class RetryQueue:
+    """
+    Failed items held back until their backoff expires, instead of retried inline.
+
+    A batch loop defers transiently failed items here and keeps its workers
+    on fresh items; `interleave` slips items whose delay has passed back
+    into the stream between source items, and `drain` is the final pass
+    over what is still waiting once the source is exhausted. The delay
+    grows exponentially with each attempt and is jittered. Auth failures
+    are only retried when `retry_auth` is set (with a cookie pool, another
+    account may get through).
+
+    Thread-safe; `key` identifies an item across attempts (its URL).
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        base_delay: float = DEFAULT_BASE_DELAY,
+        max_delay: float = MAX_DELAY,
+        retry_auth: bool = False,
+    ) -> None:
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_auth = retry_auth
+        self.deferred = 0
+        self._heap: List[Tuple[float, int, Any]] = []
+        self._attempts: Dict[Hashable, int] = {}
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._heap)
+
+    def attempts(self, key: Hashable) -> int:
+        """Attempts made so far for `key` (1 after the first failure)."""
+        with self._lock:
+            return self._attempts.get(key, 0) + 1
+
+    def backoff(self, attempt: int) -> float:
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return delay * random.uniform(1 - JITTER, 1 + JITTER)
+
+    def defer(self, key: Hashable, item: Any, error_class: str) -> Optional[float]:
+        """
+        Queue a failed item for a later attempt if its class and attempt count allow it.
+
+        Returns:
+            Seconds until the retry, or None when the failure is final
+        """
+        if error_class == PERMANENT or (error_class == AUTH and not self.retry_auth):
+            return None
+        with self._lock:
+            attempt = self._attempts.get(key, 0) + 1
+            if attempt >= self.max_attempts:
+                return None
+            self._attempts[key] = attempt
+            delay = self.backoff(attempt)
+            heapq.heappush(self._heap, (time.monotonic() + delay, next(self._seq), item))
+            self.deferred += 1
+        return delay
+
+    def pop_due(self) -> Optional[Any]:
+        """The next item whose delay has passed, or None."""
+        with self._lock:
+            if self._heap and self._heap[0][0] <= time.monotonic():
+                return heapq.heappop(self._heap)[2]
+        return None
+
+    def interleave(self, items: Iterable[Any]) -> Iterator[Any]:
+        """Yield `items`, putting due retries ahead of each next source item."""
+        for item in items:
+            retry = self.pop_due()
+            while retry is not None:
+                yield retry
+                retry = self.pop_due()
+            yield item
+
+    def drain(self) -> Iterator[Any]:
+        """Yield every waiting item as its delay passes, sleeping in between; ends when none are left."""
+        while True:
+            with self._lock:
+                if not self._heap:
+                    return
+                due, _seq, item = self._heap[0]
+                wait = due - time.monotonic()
+                if wait <= 0:
+                    heapq.heappop(self._heap)
+            if wait > 0:
+                time.sleep(min(wait, 1.0))
+                continue
+            yield item
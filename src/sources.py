@@ -0,0 +1,162 @@
+import csv
+import json
+import os
+import sys
+from typing import Any, Callable, Iterator, Optional, TextIO
+
+
+ErrorCallback = Callable[[int, str], None]
+
+EXCEL_EXTENSIONS = {".xlsx", ".xlsm"}
+CSV_EXTENSIONS = {".csv", ".tsv"}
+
+
+def report_row_error(row_number: int, message: str) -> None:
+    """Default handler for malformed rows: report and keep going."""
+    print(f"Skipping row {row_number}: {message}", file=sys.stderr)
+
+
+def normalize_url(value: Any) -> Optional[str]:
+    """
+    Clean one cell/line into a URL.
+
+    Returns:
+        The URL, "" for empty cells (skipped silently), or None if the value is not a URL
+    """
+    if value is None:
+        return ""
+    text = str(value).strip()
+    if not text or text.lower() == "nan":
+        return ""
+    if "://" in text:
+        return text if text.lower().startswith(("http://", "https://")) else None
+    if "instagram.com" in text:
+        return "https://" + text.lstrip("/")
+    return None
+
+
+def _emit(row_number: int, value: Any, on_error: ErrorCallback) -> Iterator[str]:
+    url = normalize_url(value)
+    if url is None:
+        on_error(row_number, f"not a URL: {str(value)[:80]!r}")
+    elif url:
+        yield url
+
+
+def _iter_xlsx(path: str, url_column: str, on_error: ErrorCallback) -> Iterator[str]:
+    try:
+        from openpyxl import load_workbook  # type: ignore
+    except ImportError:
+        raise Exception("openpyxl is not installed. Run: pip install openpyxl")
+
+    # Read-only mode streams rows from the zip instead of building the whole sheet
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None) or ()
+        columns = [str(cell).strip() if cell is not None else "" for cell in header]
+        if url_column not in columns:
+            raise Exception(f"Column '{url_column}' not found. Available columns: {', '.join(c for c in columns if c)}")
+        index = columns.index(url_column)
+        for row_number, row in enumerate(rows, 2):
+            yield from _emit(row_number, row[index] if index < len(row) else None, on_error)
+    finally:
+        workbook.close()
+
+
+def _iter_xls(path: str, url_column: str, on_error: ErrorCallback) -> Iterator[str]:
+    # Legacy .xls has no streaming reader; fall back to pandas
+    try:
+        import pandas as pd  # type: ignore
+    except ImportError:
+        raise Exception("pandas is not installed. Run: pip install pandas openpyxl")
+
+    df = pd.read_excel(path, usecols=lambda name: str(name).strip() == url_column)
+    if not len(df.columns):
+        raise Exception(f"Column '{url_column}' not found")
+    for row_number, value in enumerate(df.iloc[:, 0].tolist(), 2):
+        yield from _emit(row_number, value, on_error)
+
+
+def _iter_csv(stream: TextIO, url_column: str, on_error: ErrorCallback, delimiter: str = ",") -> Iterator[str]:
+    reader = csv.DictReader(stream, delimiter=delimiter)
+    fieldnames = [name.strip() for name in reader.fieldnames or []]
+    if url_column not in fieldnames:
+        raise Exception(f"Column '{url_column}' not found. Available columns: {', '.join(fieldnames)}")
+    reader.fieldnames = fieldnames
+    for row_number, row in enumerate(reader, 2):
+        yield from _emit(row_number, row.get(url_column), on_error)
+
+
+def _iter_lines(stream: TextIO, url_column: str, on_error: ErrorCallback) -> Iterator[str]:
+    """One URL per line; lines starting with '{' are parsed as JSON objects (JSONL)."""
+    for row_number, line in enumerate(stream, 1):
+        text = line.strip()
+        if not text or text.startswith("#"):
+            continue
+        if text.startswith("{"):
+            try:
+                record = json.loads(text)
+            except ValueError as e:
+                on_error(row_number, f"invalid JSON: {e}")
+                continue
+            if url_column not in record:
+                on_error(row_number, f"missing '{url_column}' field")
+                continue
+            text = record[url_column]
+        yield from _emit(row_number, text, on_error)
+
+
+def iter_urls(source: str, url_column: str = "url", on_error: Optional[ErrorCallback] = None) -> Iterator[str]:
+    """
+    Yield URLs lazily from a spreadsheet, CSV, JSONL/text file or stdin.
+
+    Rows are read one at a time, so downloads can start on the first row and
+    memory use does not grow with the size of the source. Malformed rows are
+    passed to `on_error(row_number, message)` and skipped.
+
+    Args:
+        source: Path to a .xlsx/.xlsm/.xls/.csv/.tsv/.jsonl/.txt file, or "-" for stdin
+        url_column: Column (or JSON field) holding the URLs (default: "url")
+        on_error: Callback for malformed rows (default: print to stderr)
+
+    Raises:
+        Exception: If the file cannot be opened or has no such column
+    """
+    on_error = on_error or report_row_error
+    if source == "-":
+        yield from _iter_lines(sys.stdin, url_column, on_error)
+        return
+
+    ext = os.path.splitext(source)[1].lower()
+    if ext in EXCEL_EXTENSIONS:
+        yield from _iter_xlsx(source, url_column, on_error)
+    elif ext == ".xls":
+        yield from _iter_xls(source, url_column, on_error)
+    elif ext in CSV_EXTENSIONS:
+        with open(source, newline="", encoding="utf-8-sig") as stream:
+            yield from _iter_csv(stream, url_column, on_error, "\t" if ext == ".tsv" else ",")
+    else:
+        with open(source, encoding="utf-8-sig") as stream:
+            yield from _iter_lines(stream, url_column, on_error)
+
+
+def estimate_url_count(source: str) -> int:
+    """
+    Cheap upper bound on the number of rows in a source, used for progress display.
+
+    Returns:
+        Number of data rows for .xlsx files (read from the sheet dimensions), 0 if unknown
+    """
+    if source == "-" or os.path.splitext(source)[1].lower() not in EXCEL_EXTENSIONS:
+        return 0
+    try:
+        from openpyxl import load_workbook  # type: ignore
+
+        workbook = load_workbook(source, read_only=True)
+        try:
+            return max(0, (workbook.active.max_row or 1) - 1)
+        finally:
+            workbook.close()
+    except Exception:
+        return 0
@@ -0,0 +1,140 @@
+import re
+from functools import lru_cache
+from typing import Iterable, Iterator, NamedTuple, Optional, Set
+
+
+POST = "post"
+PROFILE = "profile"
+STORY = "story"
+
+# First path segments that are Instagram pages, never usernames
+RESERVED_PATHS = frozenset({
+    "p", "reel", "reels", "tv", "stories", "explore", "accounts", "direct", "about", "developer",
+    "legal", "web", "challenge", "emails", "session", "privacy", "terms", "static", "graphql",
+    "api", "oauth", "login", "signup", "nametag", "lite", "press", "directory", "s", "ar", "share",
+})
+
+_HOST_RE = re.compile(r"^(?:[a-z0-9-]+\.)*(?:instagram\.com|instagr\.am)$")
+_SHORTCODE_RE = re.compile(r"^[A-Za-z0-9_-]{5,64}$")
+_USERNAME_RE = re.compile(r"^[A-Za-z0-9._]{1,30}$")
+_URL_RE = re.compile(r"^(?:[a-z][a-z0-9+.-]*:)?//([^/?#]+)([^?#]*)", re.IGNORECASE)
+
+# Path kind for post URLs, kept in the canonical URL (/reel/ and /p/ both work for reels)
+_POST_KINDS = {"p": "p", "reel": "reel", "reels": "reel", "tv": "tv"}
+
+
+class InstagramURL(NamedTuple):
+    kind: str  # POST, PROFILE or STORY
+    key: str  # shortcode, lower-case username, or story media id
+    url: str  # canonical URL
+
+    @property
+    def dedupe_key(self) -> str:
+        return f"{self.kind}:{self.key}"
+
+
+@lru_cache(maxsize=65536)
+def parse_instagram_url(url: str) -> Optional[InstagramURL]:
+    """
+    Map any Instagram URL shape to (kind, key, canonical URL).
+
+    Accepts /p/, /reel/, /reels/ and /tv/ posts (also with a username in
+    front), profiles, /stories/USER/ID, any subdomain (www., m., ...),
+    instagr.am, missing scheme, "@username", tracking query strings and
+    fragments, and missing or extra slashes. Share links (/share/...) and
+    highlights are not resolved here, as their ids are not post shortcodes.
+
+    Returns:
+        InstagramURL, or None for non-Instagram URLs and Instagram pages that
+        are neither posts, profiles nor stories
+    """
+    text = url.strip()
+    if text.startswith("@"):
+        username = text[1:]
+        return _profile(username) if _USERNAME_RE.match(username) else None
+    if "://" not in text and not text.startswith("//"):
+        text = "//" + text
+    match = _URL_RE.match(text)
+    if not match:
+        return None
+    host = match.group(1).lower().rsplit("@", 1)[-1].split(":", 1)[0]
+    if not _HOST_RE.match(host):
+        return None
+    parts = [part for part in match.group(2).split("/") if part]
+    if not parts:
+        return None
+
+    first = parts[0].lower()
+    # /USER/p/CODE and /USER/reel/CODE are post URLs too; /share/reel/TOKEN is not
+    # (the share token only resolves to the post by redirect)
+    if first not in RESERVED_PATHS and len(parts) >= 3 and parts[1].lower() in _POST_KINDS:
+        parts = parts[1:]
+        first = parts[0].lower()
+
+    if first in _POST_KINDS:
+        if len(parts) < 2 or not _SHORTCODE_RE.match(parts[1]):
+            return None
+        shortcode = parts[1]
+        return InstagramURL(POST, shortcode, f"https://www.instagram.com/{_POST_KINDS[first]}/{shortcode}/")
+    if first == "stories":
+        # /stories/highlights/ID is a highlight reel, not a story of a user called "highlights"
+        owner = parts[1] if len(parts) >= 3 and parts[1].lower() != "highlights" else ""
+        if _USERNAME_RE.match(owner) and parts[2].isdigit():
+            username = owner.lower()
+            return InstagramURL(STORY, parts[2], f"https://www.instagram.com/stories/{username}/{parts[2]}/")
+        return None
+    username = parts[0][1:] if parts[0].startswith("@") else parts[0]
+    if first in RESERVED_PATHS or not _USERNAME_RE.match(username):
+        return None
+    return _profile(username)
+
+
+def _profile(username: str) -> InstagramURL:
+    username = username.lower()
+    return InstagramURL(PROFILE, username, f"https://www.instagram.com/{username}/")
+
+
+def canonical_url(url: str) -> str:
+    """Canonical form of an Instagram URL; other URLs are returned stripped but unchanged."""
+    parsed = parse_instagram_url(url)
+    return parsed.url if parsed else url.strip()
+
+
+def extract_post_shortcode(url: str) -> Optional[str]:
+    parsed = parse_instagram_url(url)
+    return parsed.key if parsed and parsed.kind == POST else None
+
+
+def extract_profile_username(url: str) -> Optional[str]:
+    parsed = parse_instagram_url(url)
+    return parsed.key if parsed and parsed.kind == PROFILE else None
+
+
+class UrlDeduplicator:
+    """
+    Collapse URL variants of the same post/profile before they are dispatched.
+
+    `filter` yields the canonical URL of every item the first time it is
+    seen and counts the repeats in `duplicates`. Non-Instagram URLs are
+    passed through and only exact repeats are dropped.
+    """
+
+    def __init__(self) -> None:
+        self.seen: Set[str] = set()
+        self.duplicates = 0
+
+    def add(self, url: str) -> Optional[str]:
+        """Canonical URL if `url` is new, None if it duplicates an earlier one."""
+        parsed = parse_instagram_url(url)
+        key = parsed.dedupe_key if parsed else url.strip()
+        if key in self.seen:
+            self.duplicates += 1
+            return None
+        self.seen.add(key)
+        return parsed.url if parsed else url.strip()
+
+    def filter(self, urls: Iterable[str]) -> Iterator[str]:
+        for url in urls:
+            canonical = self.add(url)
+            if canonical is not None:
+                yield canonical
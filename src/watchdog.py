@@ -0,0 +1,147 @@
+import socket
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+
+# yt-dlp's socket timeout: seconds a read on the connection may wait for data before
+# the transfer is given up as stalled
+DEFAULT_STALL_TIMEOUT = 60.0
+# Slowest acceptable transfer in bytes/s, averaged over SPEED_WINDOW seconds (0: no minimum)
+DEFAULT_MIN_SPEED = 4 * 1024
+SPEED_WINDOW = 60.0
+
+STALL_MARKERS = ("download stalled", "timed out", "timeout")
+
+
+class DownloadStalled(Exception):
+    """Raised from a progress hook to abort a transfer that stopped or slowed to a crawl."""
+
+
+def is_stall_error(error: Any) -> bool:
+    """True for transfers aborted by the watchdog and reads that hit the socket timeout."""
+    if error is None:
+        return False
+    if isinstance(error, (DownloadStalled, socket.timeout)):
+        return True
+    cause = getattr(error, "cause", None) or getattr(error, "exc_info", None) or getattr(error, "__cause__", None)
+    if isinstance(cause, tuple) and len(cause) > 1:
+        cause = cause[1]
+    if isinstance(cause, (DownloadStalled, socket.timeout)):
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in STALL_MARKERS)
+
+
+def count_stall(results: Dict[str, Any]) -> None:
+    results['stalls'] = results.get('stalls', 0) + 1
+
+
+class StallWatchdog:
+    """
+    Watch one download's progress callbacks and abort it when it stalls or crawls.
+
+    A transfer is crawling when it received less than `min_speed` bytes/s
+    over the last SPEED_WINDOW seconds; the next progress callback then
+    raises DownloadStalled, which aborts the download and leaves its partial
+    file to be continued by a later attempt. Time the bandwidth governor
+    holds the transfer back (see `throttled`) does not count against it.
+
+    A transfer that stops receiving data stops calling back, so it cannot
+    be caught here. `stall_timeout` is handed to yt-dlp as its socket
+    timeout instead: a read that waits that long fails with a timeout,
+    which is_stall_error recognizes.
+
+    Every file of a download (e.g. the video and the audio stream) is
+    watched on its own.
+    """
+
+    def __init__(self, stall_timeout: float = DEFAULT_STALL_TIMEOUT, min_speed: int = DEFAULT_MIN_SPEED) -> None:
+        self.stall_timeout = stall_timeout
+        self.min_speed = min_speed
+        self._path: Optional[str] = None
+        self._held = 0.0
+        # (time, bytes, held time) samples of the current file, one per second at most, oldest first
+        self._samples: Deque[Tuple[float, int, float]] = deque()
+
+    def start(self) -> None:
+        """Reset for the next download."""
+        self._path = None
+        self._samples.clear()
+
+    def throttled(self, seconds: float) -> None:
+        """Discount time the bandwidth governor made the transfer wait."""
+        self._held += seconds
+
+    def on_progress(self, status: Dict[str, Any]) -> None:
+        if status.get("status") != "downloading":
+            self._path = None
+            return
+        now = time.monotonic()
+        path = status.get("tmpfilename") or status.get("filename") or ""
+        downloaded = status.get("downloaded_bytes") or 0
+        if path != self._path:
+            self._path = path
+            self._held = 0.0
+            self._samples.clear()
+            self._samples.append((now, downloaded, 0.0))
+            return
+
+        if not self.min_speed:
+            return
+        if now - self._samples[-1][0] >= 1.0:
+            self._samples.append((now, downloaded, self._held))
+        while len(self._samples) > 2 and now - self._samples[1][0] >= SPEED_WINDOW:
+            self._samples.popleft()
+        since, bytes_then, held_then = self._samples[0]
+        elapsed = now - since - (self._held - held_then)
+        if now - since >= SPEED_WINDOW and elapsed > 0:
+            speed = (downloaded - bytes_then) / elapsed
+            if speed < self.min_speed:
+                raise DownloadStalled(
+                    f"download stalled: {speed / 1024:.1f} KB/s over {elapsed:.0f}s at {_position(status)} "
+                    f"(minimum {self.min_speed / 1024:.1f} KB/s)"
+                )
+
+
+def _position(status: Dict[str, Any]) -> str:
+    downloaded = status.get("downloaded_bytes") or 0
+    total = status.get("total_bytes") or status.get("total_bytes_estimate")
+    if total:
+        return f"{downloaded / total * 100:.0f}%"
+    return f"{downloaded} bytes"
+
+
+class WatchdogSettings:
+    """Process-wide stall limits read by every new download session."""
+
+    def __init__(self, stall_timeout: float = DEFAULT_STALL_TIMEOUT, min_speed: int = DEFAULT_MIN_SPEED) -> None:
+        self.stall_timeout = stall_timeout
+        self.min_speed = min_speed
+
+    def create(self) -> StallWatchdog:
+        return StallWatchdog(self.stall_timeout, self.min_speed)
+
+
+_settings: Optional[WatchdogSettings] = None
+_settings_lock = threading.Lock()
+
+
+def get_watchdog_settings() -> WatchdogSettings:
+    """Stall limits shared by every download session (defaults until configured)."""
+    global _settings
+    with _settings_lock:
+        if _settings is None:
+            _settings = WatchdogSettings()
+        return _settings
+
+
+def configure_watchdog(stall_timeout: Optional[float] = None, min_speed: Optional[int] = None) -> WatchdogSettings:
+    """Set the stall limits, e.g. from command-line options (0: no minimum speed, yt-dlp's socket timeout)."""
+    settings = get_watchdog_settings()
+    if stall_timeout is not None:
+        settings.stall_timeout = max(0.0, stall_timeout)
+    if min_speed is not None:
+        settings.min_speed = max(0, min_speed)
+    return settings
@@ -0,0 +1,228 @@
+"""
+Distributed worker mode.
+
+Several workers run `python -m src.worker --queue QUEUE` and pull jobs from a
+shared queue (see job_queue.py); workers on several machines need a queue
+that supports them, e.g. sqlite-shared:// on shared storage. Jobs are added
+with `--enqueue`:
+
+    python -m src.worker --queue sqlite-shared:////shared/queue.db --enqueue https://instagram.com/reel/ID/
+    python -m src.worker --queue sqlite-shared:////shared/queue.db --enqueue-file urls.txt
+    python -m src.worker --queue sqlite-shared:////shared/queue.db --enqueue https://instagram.com/username --page
+    python -m src.worker --queue sqlite-shared:////shared/queue.db -o downloads -c cookies.txt
+"""
+
+import argparse
+import os
+import socket
+import sys
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from .archive import DownloadArchive, default_archive_path, extract_shortcode
+from .bandwidth import configure_bandwidth, parse_rate
+from .cookies import cookie_pools, print_cookie_pool_summary
+from .downloader import DownloadSession
+from .job_queue import JobQueue, open_queue
+from .page_downloader import download_profile_videos, extract_username_from_url
+from .retry import PERMANENT, classify_failure
+from .sources import iter_urls
+from .urls import UrlDeduplicator
+
+
+KIND_URL = "url"
+KIND_PROFILE = "profile"
+
+
+class LeaseKeeper:
+    """Background thread that heartbeats a leased job until stopped."""
+
+    def __init__(self, queue: JobQueue, job_id: int, worker_id: str, lease_seconds: float) -> None:
+        self.queue = queue
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"heartbeat-{job_id}", daemon=True)
+
+    def __enter__(self) -> "LeaseKeeper":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.lease_seconds / 3):
+            try:
+                if not self.queue.heartbeat(self.job_id, self.worker_id, self.lease_seconds):
+                    self.lost = True
+                    print(f"Lost lease on job {self.job_id}; another worker may pick it up", file=sys.stderr)
+                    return
+            except Exception as e:
+                print(f"Heartbeat for job {self.job_id} failed: {e}", file=sys.stderr)
+
+
+def process_job(
+    job: Dict[str, Any],
+    session: DownloadSession,
+    output_dir: str,
+    cookies_file: Optional[str],
+    archive: Optional[DownloadArchive] = None,
+) -> Dict[str, Any]:
+    """Run one leased job with the existing download logic and return its result."""
+    payload = job["payload"]
+    if job["kind"] == KIND_URL:
+        code = session.download(payload["url"])
+        return {"code": code, "skipped": session.last_skipped, "path": session.last_filepath}
+    if job["kind"] == KIND_PROFILE:
+        results = download_profile_videos(
+            payload["url"],
+            output_dir,
+            cookies_file,
+            payload.get("max_videos", 50),
+            archive=archive,
+            sync=bool(payload.get("sync")) and archive is not None,
+        )
+        results["code"] = 0 if results["failed"] == 0 else 1
+        return results
+    raise ValueError(f"Unknown job kind: {job['kind']}")
+
+
+def run_worker(
+    queue: JobQueue,
+    output_dir: str,
+    cookies_file: Optional[str] = None,
+    worker_id: Optional[str] = None,
+    lease_seconds: float = 120.0,
+    poll_interval: float = 5.0,
+    max_jobs: Optional[int] = None,
+    exit_when_idle: bool = False,
+    archive: Optional[DownloadArchive] = None,
+) -> int:
+    """
+    Lease and run jobs until stopped.
+
+    Returns:
+        Number of jobs processed
+    """
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    processed = 0
+    print(f"Worker {worker_id} started")
+    with DownloadSession(output_dir, cookies_file, archive=archive) as session:
+        while max_jobs is None or processed < max_jobs:
+            job = queue.lease(worker_id, lease_seconds)
+            if job is None:
+                if exit_when_idle:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            print(f"[{worker_id}] job {job['id']} ({job['kind']}, attempt {job['attempt']}): {job['payload'].get('url')}")
+            with LeaseKeeper(queue, job["id"], worker_id, lease_seconds) as keeper:
+                try:
+                    result = process_job(job, session, output_dir, cookies_file, archive)
+                    error = None
+                except Exception as e:
+                    result, error = None, str(e)
+            processed += 1
+            if keeper.lost:
+                continue
+            if error is not None:
+                queue.fail(job["id"], worker_id, error)
+            elif result.get("code", 0) != 0 and job["kind"] == KIND_URL:
+                # Permanent failures (removed, missing, unsupported posts) are not requeued
+                error_class = classify_failure(session.last_error)
+                if error_class == PERMANENT and archive is not None:
+                    archive.add_failure(extract_shortcode(job["payload"]["url"]), error_class, session.last_error)
+                message = f"{error_class}: {session.last_error or 'download failed'}"
+                queue.fail(job["id"], worker_id, message[:300], retry=error_class != PERMANENT)
+            else:
+                queue.complete(job["id"], worker_id, result)
+    return processed
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Distributed Instagram download worker")
+    parser.add_argument("--queue", required=True, help="Queue location: SQLite file path or BACKEND://...")
+    parser.add_argument("-o", "--output", dest="output_dir", default=os.path.join(os.getcwd(), "downloads"),
+                        help="Output directory (default: ./downloads)")
+    parser.add_argument("-c", "--cookies", dest="cookies_file", default=None, help="Path to cookies.txt file, or a directory of cookies files to rotate between")
+    parser.add_argument("--archive", nargs="?", const="", default=None,
+                        help="Skip posts in the download archive (default path: OUTPUT/.download_archive.sqlite3)")
+    parser.add_argument("--worker-id", default=None, help="Worker name (default: host-pid-random)")
+    parser.add_argument("--lease", type=float, default=120.0, help="Lease duration in seconds (default: 120)")
+    parser.add_argument("--poll", type=float, default=5.0, help="Seconds between polls of an empty queue (default: 5)")
+    parser.add_argument("--max-jobs", type=int, default=None, help="Exit after this many jobs")
+    parser.add_argument("--exit-when-idle", action="store_true", help="Exit when the queue is empty")
+    parser.add_argument("--enqueue", metavar="URL", default=None, help="Add one job to the queue, then exit")
+    parser.add_argument("--enqueue-file", metavar="FILE", default=None,
+                        help="Add one job per URL in FILE (Excel/CSV/JSONL/text), then exit")
+    parser.add_argument("--url-column", default="url", help="Column holding URLs in --enqueue-file (default: url)")
+    parser.add_argument("--page", action="store_true", help="Enqueued URLs are profiles to download in full")
+    parser.add_argument("--max-videos", type=int, default=50, help="Maximum videos per profile job (default: 50)")
+    parser.add_argument("--sync", action="store_true", help="Profile jobs only fetch posts newer than the last sync")
+    parser.add_argument("--status", action="store_true", help="Print queue counts, then exit")
+    parser.add_argument("--limit-rate", type=parse_rate, default=None, metavar="RATE",
+                        help="Download bandwidth for this worker, e.g. 2M (default: unlimited)")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if args.limit_rate is not None:
+        configure_bandwidth(args.limit_rate)
+    queue = open_queue(args.queue)
+
+    if args.status:
+        print(queue.stats())
+        return
+
+    if args.enqueue or args.enqueue_file:
+        urls = [args.enqueue] if args.enqueue else iter_urls(args.enqueue_file, args.url_column)
+        dedupe = UrlDeduplicator()
+        count = 0
+        for url in dedupe.filter(urls):
+            if args.page:
+                if not extract_username_from_url(url):
+                    print(f"Skipping invalid profile URL: {url}", file=sys.stderr)
+                    continue
+                queue.enqueue(KIND_PROFILE, {"url": url, "max_videos": args.max_videos, "sync": args.sync})
+            else:
+                queue.enqueue(KIND_URL, {"url": url})
+            count += 1
+        if dedupe.duplicates:
+            print(f"Dropped {dedupe.duplicates} duplicate URL(s)")
+        print(f"Enqueued {count} job(s). Queue: {queue.stats()}")
+        return
+
+    archive = None
+    if args.archive is not None or args.sync:
+        archive = DownloadArchive(args.archive or default_archive_path(args.output_dir))
+    try:
+        processed = run_worker(
+            queue,
+            args.output_dir,
+            args.cookies_file,
+            worker_id=args.worker_id,
+            lease_seconds=args.lease,
+            poll_interval=args.poll,
+            max_jobs=args.max_jobs,
+            exit_when_idle=args.exit_when_idle,
+            archive=archive,
+        )
+    except KeyboardInterrupt:
+        print("Worker stopped; leased jobs will be re-leased after their lease expires.")
+        return
+    finally:
+        for pool in cookie_pools():
+            print_cookie_pool_summary(pool)
+    print(f"Processed {processed} job(s). Queue: {queue.stats()}")
+
+
+if __name__ == "__main__":
+    main()
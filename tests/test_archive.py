@@ -0,0 +1,18 @@
+from src.archive import DownloadArchive
+
+
+def test_add_records_shortcode(tmp_path):
+    with DownloadArchive(str(tmp_path / "archive.sqlite3")) as archive:
+        archive.add("Cabc123XYZ_", None, 10)
+        assert "Cabc123XYZ_" in archive
+        assert archive.contains_url("https://www.instagram.com/reel/Cabc123XYZ_/")
+
+
+def test_add_ignores_missing_shortcode(tmp_path):
+    path = str(tmp_path / "archive.sqlite3")
+    with DownloadArchive(path) as archive:
+        archive.add(None, "video.mp4")
+        archive.add("", "video.mp4")
+        assert len(archive) == 0
+    with DownloadArchive(path) as archive:
+        assert len(archive) == 0
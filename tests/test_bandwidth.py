@@ -0,0 +1,36 @@
+import pytest
+
+from src.bandwidth import BULK, INTERACTIVE, BandwidthGovernor, parse_rate
+
+
+def progress(path, downloaded):
+    return {"status": "downloading", "tmpfilename": path, "downloaded_bytes": downloaded}
+
+
+def test_parse_rate():
+    assert parse_rate("500") == 500
+    assert parse_rate("500K") == 500 * 1024
+    assert parse_rate("1.5M/s") == int(1.5 * 1024 ** 2)
+    assert parse_rate("2MiB") == 2 * 1024 ** 2
+    with pytest.raises(ValueError):
+        parse_rate("fast")
+
+
+def test_transfer_counts_increments_per_file():
+    governor = BandwidthGovernor()
+    with governor.start(BULK) as transfer:
+        for downloaded in (100, 300, 300, 700):
+            transfer.on_progress(progress("video.part", downloaded))
+        for downloaded in (50, 150):
+            transfer.on_progress(progress("audio.part", downloaded))
+    assert governor.bytes[BULK] == 600 + 100
+    assert governor.bytes[INTERACTIVE] == 0
+
+
+def test_resumed_download_does_not_count_bytes_on_disk():
+    governor = BandwidthGovernor()
+    with governor.start(INTERACTIVE) as transfer:
+        # The partial file already held 50 MB when the download resumed
+        transfer.on_progress(progress("video.part", 50_000_000))
+        transfer.on_progress(progress("video.part", 50_065_536))
+    assert governor.bytes[INTERACTIVE] == 65_536
@@ -0,0 +1,108 @@
+import threading
+import time
+
+import pytest
+
+from src.batch import BoundedWorkerPool, prefetch
+
+
+def test_pool_yields_in_completion_order():
+    pool = BoundedWorkerPool(jobs=3)
+
+    def work(delay):
+        time.sleep(delay)
+        return delay * 10
+
+    done = list(pool.map_unordered(work, [0.3, 0.1, 0.2]))
+    assert [item for item, _result, _error in done] == [0.1, 0.2, 0.3]
+    assert all(result == item * 10 and error is None for item, result, error in done)
+
+
+def test_pool_bounds_work_in_flight():
+    pool = BoundedWorkerPool(jobs=2)
+    pulled = []
+    finished = [0]
+
+    def items():
+        for i in range(10):
+            pulled.append(i)
+            yield i
+
+    def work(i):
+        time.sleep(0.02)
+        # The source is read lazily: never more than `jobs` items ahead of the finished ones
+        assert len(pulled) <= finished[0] + 2
+        return i
+
+    for _item, _result, error in pool.map_unordered(work, items()):
+        assert error is None
+        finished[0] += 1
+    assert finished[0] == 10
+    assert pool.peak_active == 2
+    assert pool.active == 0
+
+
+def test_pool_returns_worker_errors():
+    pool = BoundedWorkerPool(jobs=2)
+
+    def work(i):
+        if i == 1:
+            raise ValueError("bad item")
+        return i
+
+    results = {item: (result, error) for item, result, error in pool.map_unordered(work, range(3))}
+    assert results[0] == (0, None) and results[2] == (2, None)
+    result, error = results[1]
+    assert result is None and isinstance(error, ValueError)
+
+
+def test_pool_returns_interrupts():
+    pool = BoundedWorkerPool(jobs=1)
+
+    def work(_item):
+        raise KeyboardInterrupt
+
+    [(_item, result, error)] = pool.map_unordered(work, [1])
+    assert result is None
+    with pytest.raises(KeyboardInterrupt):
+        raise error
+
+
+def test_prefetch_yields_items_in_order():
+    assert list(prefetch(iter(range(50)), buffer_size=4)) == list(range(50))
+
+
+def test_prefetch_reraises_producer_error():
+    def items():
+        yield 1
+        raise ValueError("listing failed")
+
+    videos = prefetch(items(), buffer_size=2)
+    assert next(videos) == 1
+    try:
+        next(videos)
+    except ValueError as e:
+        assert str(e) == "listing failed"
+    else:
+        raise AssertionError("producer error was not re-raised")
+
+
+def test_close_stops_producer_and_closes_items():
+    produced = []
+    closed = threading.Event()
+
+    def items():
+        try:
+            for i in range(1000):
+                produced.append(i)
+                yield i
+        finally:
+            closed.set()
+
+    videos = prefetch(items(), buffer_size=2)
+    assert next(videos) == 0
+    videos.close()
+    assert closed.wait(2.0)
+    count = len(produced)
+    time.sleep(0.3)
+    assert len(produced) == count < 1000
@@ -0,0 +1,50 @@
+import os
+
+from src.cas import HASH_READ_THRESHOLD, ContentStore, StreamingHasher, hash_file, store_download
+
+
+def download(path, chunks, hasher):
+    """Write `chunks` like yt-dlp does: into PATH.part with progress callbacks, then rename."""
+    part = path + ".part"
+    written = 0
+    with open(part, "wb") as f:
+        for chunk in chunks:
+            f.write(chunk)
+            f.flush()
+            written += len(chunk)
+            hasher.on_progress({"status": "downloading", "tmpfilename": part, "filename": path,
+                                "downloaded_bytes": written})
+    os.replace(part, path)
+    hasher.on_progress({"status": "finished", "filename": path})
+
+
+def test_streamed_digest_matches_file(tmp_path):
+    path = str(tmp_path / "user_AAAAAAAAAAA.mp4")
+    chunks = [os.urandom(300 * 1024) for _ in range(10)]
+    hasher = StreamingHasher()
+    download(path, chunks, hasher)
+    assert os.path.getsize(path) > HASH_READ_THRESHOLD
+    assert hasher.digest_for(path) == hash_file(path)
+
+
+def test_digest_is_dropped_when_file_changed(tmp_path):
+    path = str(tmp_path / "user_AAAAAAAAAAA.mp4")
+    hasher = StreamingHasher()
+    download(path, [b"a" * 1000], hasher)
+    with open(path, "ab") as f:
+        f.write(b"merged")
+    assert hasher.digest_for(path) is None
+
+
+def test_duplicates_are_linked_to_one_object(tmp_path):
+    store = ContentStore(str(tmp_path / ".cas"))
+    first = str(tmp_path / "a_AAAAAAAAAAA.mp4")
+    second = str(tmp_path / "b_BBBBBBBBBBB.mp4")
+    for path in (first, second):
+        hasher = StreamingHasher()
+        download(path, [b"same video"], hasher)
+        store_download(store, path, hasher)
+    assert os.path.samefile(first, second)
+    stats = store.stats()
+    assert (stats["objects"], stats["files"], stats["saved_bytes"]) == (1, 2, len(b"same video"))
+    store.close()
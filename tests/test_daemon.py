@@ -0,0 +1,129 @@
+import http.client
+import json
+import os
+import threading
+
+import pytest
+
+from src import daemon as daemon_module
+from src.client import DaemonClient, read_token
+from src.daemon import DownloadDaemon, make_server, write_token
+
+TOKEN = "test-token"
+
+
+@pytest.fixture
+def server(tmp_path):
+    daemon = DownloadDaemon(workers=1, roots=[str(tmp_path)])
+    server = make_server(daemon, "127.0.0.1:0", TOKEN)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    daemon.close()
+
+
+def call(server, method, path, body=None, headers=None):
+    port = server.server_address[1]
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    sent = {"Authorization": f"Bearer {TOKEN}", "Content-Type": "application/json"}
+    sent.update(headers or {})
+    sent = {key: value for key, value in sent.items() if value is not None}
+    connection.request(method, path, json.dumps(body) if body is not None else None, sent)
+    response = connection.getresponse()
+    data = json.loads(response.read() or b"{}")
+    connection.close()
+    return response.status, data
+
+
+def test_token_file_is_private(tmp_path):
+    path = str(tmp_path / "igdl" / "daemon.token")
+    token = write_token(path)
+    assert read_token(path) == token
+    assert os.stat(path).st_mode & 0o777 == 0o600
+    assert write_token(path) != token
+
+
+def test_requests_need_the_token(server):
+    assert call(server, "GET", "/health")[0] == 200
+    assert call(server, "GET", "/health", headers={"Authorization": None})[0] == 401
+    assert call(server, "GET", "/jobs", headers={"Authorization": "Bearer wrong"})[0] == 401
+    assert call(server, "POST", "/jobs", {"kind": "url", "url": "x"}, headers={"Authorization": None})[0] == 401
+
+
+def test_browser_requests_are_rejected(server):
+    assert call(server, "GET", "/jobs", headers={"Host": "evil.example:8765"})[0] == 403
+    assert call(server, "GET", "/jobs", headers={"Origin": "https://evil.example"})[0] == 403
+    assert call(server, "GET", "/jobs", headers={"Origin": "http://localhost:3000"})[0] == 200
+    status, _ = call(server, "POST", "/jobs", {"kind": "url", "url": "x"}, headers={"Content-Type": "text/plain"})
+    assert status == 415
+
+
+def test_paths_are_confined_to_the_roots(server, tmp_path):
+    outside = os.path.dirname(str(tmp_path))
+    url = "https://www.instagram.com/someuser/"
+    for key, value in (
+        ("output_dir", outside),
+        ("report", os.path.join(outside, "report.jsonl")),
+        ("archive", os.path.join(str(tmp_path), "..", "archive.sqlite3")),
+    ):
+        status, data = call(server, "POST", "/jobs", {"kind": "profile", "url": url, "output_dir": str(tmp_path), key: value})
+        assert status == 400, key
+        assert "allowed roots" in data["error"]
+    status, data = call(server, "POST", "/jobs", {"kind": "excel", "source": "/etc/passwd", "output_dir": str(tmp_path)})
+    assert status == 400
+    status, _ = call(server, "POST", "/jobs", {"kind": "excel", "source": "-", "output_dir": str(tmp_path)})
+    assert status == 400
+
+
+def test_symlink_out_of_a_root_is_rejected(server, tmp_path):
+    outside = tmp_path.parent / "outside-root"
+    outside.mkdir(exist_ok=True)
+    (tmp_path / "link").symlink_to(outside)
+    spec = {"kind": "profile", "url": "https://www.instagram.com/someuser/", "output_dir": str(tmp_path / "link")}
+    assert call(server, "POST", "/jobs", spec)[0] == 400
+
+
+def test_client_sends_the_token(server):
+    client = DaemonClient(f"127.0.0.1:{server.server_address[1]}", token=TOKEN)
+    assert client.health()["service"] == "igdl-daemon"
+    assert DaemonClient(client.address, token="wrong").health() is None
+
+
+class FakeSession:
+    closed = []
+
+    def __init__(self, output_dir, *args, **kwargs):
+        self.output_dir = output_dir
+
+    def open(self):
+        return self
+
+    def close(self):
+        FakeSession.closed.append(self.output_dir)
+
+
+def test_worker_sessions_are_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(daemon_module, "DownloadSession", FakeSession)
+    monkeypatch.setattr(daemon_module, "MAX_SESSIONS_PER_WORKER", 2)
+    FakeSession.closed = []
+    daemon = DownloadDaemon(workers=1, roots=[str(tmp_path)])
+    first = daemon._session({"output_dir": "a"}, None)
+    daemon._session({"output_dir": "b"}, None)
+    assert daemon._session({"output_dir": "a"}, None) is first
+    daemon._session({"output_dir": "c"}, None)
+    assert FakeSession.closed == ["b"]
+    assert sorted(session.output_dir for session in daemon._sessions) == ["a", "c"]
+    daemon.close()
+    assert sorted(FakeSession.closed) == ["a", "b", "c"]
+
+
+def test_jobs_run_with_resolved_paths(tmp_path):
+    daemon = DownloadDaemon(workers=1, roots=[str(tmp_path)])
+    (tmp_path / "real").mkdir()
+    (tmp_path / "link").symlink_to(tmp_path / "real")
+    spec = {"output_dir": str(tmp_path / "link" / "out"), "report": str(tmp_path / "link" / ".." / "r.jsonl")}
+    daemon._confine(spec)
+    assert spec == {"output_dir": str(tmp_path / "real" / "out"), "report": str(tmp_path / "r.jsonl")}
+    daemon.close()
@@ -0,0 +1,135 @@
+import os
+import sys
+
+import pytest
+
+from src import cas, merge
+from src.cas import ContentStore, hash_file
+from src.downloader import DownloadSession
+from src.merge import MergePool
+
+URL = "https://www.instagram.com/reel/ABCDEFGHIJK/"
+
+
+class FakeYDL:
+    """Stands in for YoutubeDL: downloads the given streams like yt-dlp's HTTP downloader."""
+
+    def __init__(self, session, streams):
+        self.session = session
+        self.streams = streams
+        self.params = {"outtmpl": {"default": ""}}
+        self.downloads = 0
+
+    def prepare_filename(self, info, outtmpl=None):
+        template = outtmpl or self.params["outtmpl"]["default"]
+        for field in ("uploader", "id", "format_id", "ext"):
+            template = template.replace(f"%({field})s", str(info.get(field, "NA")))
+        return template
+
+    def extract_info(self, url, download=True, process=True):
+        assert not download and not process
+        return {"id": "ABCDEFGHIJK", "uploader": "user", "webpage_url": url}
+
+    def process_ie_result(self, info, download=True):
+        self.downloads += 1
+        requested = []
+        for format_id, ext, vcodec, data in self.streams:
+            stream = dict(info, format_id=format_id, ext=ext, vcodec=vcodec)
+            path = self.prepare_filename(stream)
+            part = path + ".part"
+            with open(part, "wb") as f:
+                for offset in range(0, len(data), 256 * 1024):
+                    f.write(data[offset:offset + 256 * 1024])
+                    f.flush()
+                    self.session._dispatch_progress({
+                        "status": "downloading", "tmpfilename": part, "filename": path,
+                        "downloaded_bytes": f.tell(), "info_dict": stream,
+                    })
+            os.replace(part, path)
+            self.session._dispatch_progress({"status": "finished", "filename": path, "info_dict": stream})
+            requested.append(dict(stream, filepath=path))
+        return dict(info, requested_downloads=requested)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = ContentStore(str(tmp_path / "store"))
+    digests = []
+    original_add = store.add
+
+    def add(path, digest=None):
+        digests.append(digest)
+        return original_add(path, digest)
+
+    monkeypatch.setattr(store, "add", add)
+    store.digests = digests
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def merge_pool(tmp_path, monkeypatch):
+    # ffmpeg stand-in: concatenates the two inputs into the output file
+    script = tmp_path / "ffmpeg"
+    script.write_text(
+        f"#!{sys.executable}\n"
+        "import sys\n"
+        "args = sys.argv[1:]\n"
+        "inputs = [args[i + 1] for i, arg in enumerate(args) if arg == '-i']\n"
+        "with open(args[-1], 'wb') as out:\n"
+        "    for path in inputs:\n"
+        "        out.write(open(path, 'rb').read())\n"
+    )
+    script.chmod(0o755)
+    monkeypatch.setattr(merge, "ffmpeg_executable", lambda: str(script))
+    pool = MergePool(workers=1)
+    yield pool
+    pool.close()
+
+
+def open_session(output_dir, store, merge_pool, streams):
+    session = DownloadSession(output_dir, content_store=store, merge_pool=merge_pool)
+    session._ydl = FakeYDL(session, streams)
+    return session
+
+
+def test_progressive_stream_keeps_streamed_hash(tmp_path, store, merge_pool, monkeypatch):
+    output_dir = str(tmp_path / "out")
+    data = os.urandom(3 * 1024 * 1024)
+    session = open_session(output_dir, store, merge_pool, [("8", "mp4", "h264", data)])
+    monkeypatch.setattr(cas, "hash_file", lambda path: pytest.fail("the download was read again"))
+    assert session.download(URL) == 0
+    final = os.path.join(output_dir, "user_ABCDEFGHIJK.mp4")
+    assert session.last_filepath == final
+    assert not os.path.exists(os.path.join(output_dir, "user_ABCDEFGHIJK.f8.mp4"))
+    assert store.digests == [hash_file(final)]
+
+
+def test_merged_streams_are_stored(tmp_path, store, merge_pool):
+    output_dir = str(tmp_path / "out")
+    streams = [("v", "mp4", "h264", b"video" * 1000), ("a", "m4a", "none", b"audio" * 1000)]
+    session = open_session(output_dir, store, merge_pool, streams)
+    assert session.download(URL) == 0
+    assert session.last_merge.result() == os.path.join(output_dir, "user_ABCDEFGHIJK.mp4")
+    assert sorted(os.listdir(output_dir)) == ["user_ABCDEFGHIJK.mp4"]
+    with open(session.last_filepath, "rb") as f:
+        assert f.read() == b"video" * 1000 + b"audio" * 1000
+    assert len(store.digests) == 1
+
+
+def test_finished_post_is_not_downloaded_again(tmp_path, store, merge_pool):
+    output_dir = str(tmp_path / "out")
+    streams = [("8", "mp4", "h264", b"x" * 1000)]
+    session = open_session(output_dir, store, merge_pool, streams)
+    assert session.download(URL) == 0
+    final = session.last_filepath
+    mtime = os.stat(final).st_mtime_ns
+
+    session = open_session(output_dir, store, merge_pool, streams)
+    assert session.download(URL) == 0
+    assert session._ydl.downloads == 0
+    assert session.last_filepath == final
+    assert os.stat(final).st_mtime_ns == mtime
@@ -0,0 +1,108 @@
+import threading
+import time
+
+import pytest
+
+from src.job_queue import DONE, FAILED, LEASED, QUEUED, JobQueue, SQLiteJobQueue, open_queue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = SQLiteJobQueue(str(tmp_path / "queue.db"))
+    yield queue
+    queue.close()
+
+
+def test_job_queue_is_abstract():
+    with pytest.raises(TypeError):
+        JobQueue()
+
+
+def test_lease_hands_out_jobs_in_order_once(queue):
+    first = queue.enqueue("url", {"url": "a"})
+    second = queue.enqueue("url", {"url": "b"})
+    job = queue.lease("w1")
+    assert (job["id"], job["payload"], job["attempt"]) == (first, {"url": "a"}, 1)
+    assert queue.lease("w2")["id"] == second
+    assert queue.lease("w3") is None
+    assert queue.stats() == {QUEUED: 0, LEASED: 2, DONE: 0, FAILED: 0}
+
+
+def test_expired_lease_is_taken_over(queue):
+    job_id = queue.enqueue("url", {"url": "a"})
+    queue.lease("dead", lease_seconds=0.05)
+    assert queue.lease("w2") is None
+    time.sleep(0.1)
+    job = queue.lease("w2")
+    assert (job["id"], job["attempt"]) == (job_id, 2)
+    # The first worker lost its lease and can no longer extend or finish the job
+    assert not queue.heartbeat(job_id, "dead")
+    queue.complete(job_id, "dead", {"success": 1})
+    assert queue.get(job_id)["status"] == LEASED
+    assert queue.heartbeat(job_id, "w2")
+    queue.complete(job_id, "w2", {"success": 1})
+    assert queue.get(job_id)["status"] == DONE
+    assert queue.get(job_id)["result"] == {"success": 1}
+
+
+def test_expired_leases_give_up_after_max_attempts(queue):
+    job_id = queue.enqueue("url", {"url": "a"}, max_attempts=2)
+    for _ in range(2):
+        assert queue.lease("w", lease_seconds=0.01)["id"] == job_id
+        time.sleep(0.03)
+    assert queue.lease("w") is None
+    job = queue.get(job_id)
+    assert job["status"] == FAILED
+    assert job["error"] == "lease expired too many times"
+
+
+def test_fail_requeues_until_attempts_are_used_up(queue):
+    job_id = queue.enqueue("url", {"url": "a"}, max_attempts=2)
+    queue.lease("w")
+    queue.fail(job_id, "w", "timeout")
+    assert queue.get(job_id)["status"] == QUEUED
+    queue.lease("w")
+    queue.fail(job_id, "w", "timeout")
+    assert queue.get(job_id)["status"] == FAILED
+    other = queue.enqueue("url", {"url": "b"})
+    queue.lease("w")
+    queue.fail(other, "w", "gone", retry=False)
+    assert queue.get(other)["status"] == FAILED
+
+
+def test_concurrent_workers_never_share_a_job(tmp_path):
+    path = str(tmp_path / "queue.db")
+    setup = SQLiteJobQueue(path)
+    for i in range(40):
+        setup.enqueue("url", {"url": str(i)})
+    setup.close()
+    leased = []
+
+    def work(worker_id):
+        queue = SQLiteJobQueue(path)
+        while True:
+            job = queue.lease(worker_id)
+            if job is None:
+                break
+            leased.append(job["id"])
+            queue.complete(job["id"], worker_id, {})
+        queue.close()
+
+    threads = [threading.Thread(target=work, args=(f"w{i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(leased) == list(range(1, 41))
+
+
+def test_open_queue_locations(tmp_path):
+    local = open_queue(str(tmp_path / "a.db"))
+    shared = open_queue(f"sqlite-shared:///{tmp_path / 'b.db'}")
+    assert not local.shared and shared.shared
+    assert shared.path == str(tmp_path / "b.db")
+    assert shared._conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+    local.close()
+    shared.close()
+    with pytest.raises(ValueError):
+        open_queue("redis://localhost")
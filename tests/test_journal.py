@@ -0,0 +1,85 @@
+import os
+
+from src.cli import JOB_PARAM_KEYS, parse_args, restore_job_params, run
+from src.journal import JobJournal, cleanup_partial_files
+
+REEL = "https://www.instagram.com/reel/{}/"
+
+
+def touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write("x")
+
+
+def test_resume_restores_item_states(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    with JobJournal(path, flush_every=1000) as journal:
+        job = journal.create_job("excel", {"excel_file": "urls.xlsx"})
+        for code in ("AAAAAAAAAAA", "BBBBBBBBBBB", "CCCCCCCCCCC", "DDDDDDDDDDD"):
+            job.register(REEL.format(code))
+        job.started(REEL.format("AAAAAAAAAAA"))
+        job.finished(REEL.format("AAAAAAAAAAA"), True)
+        job.started(REEL.format("BBBBBBBBBBB"))
+        job.finished(REEL.format("BBBBBBBBBBB"), False, "gone")
+        job.started(REEL.format("CCCCCCCCCCC"))
+        job_id = job.id
+    # Closing the journal flushes the buffered states
+
+    with JobJournal(path) as journal:
+        resumed = journal.load_job(job_id)
+        assert resumed.params == {"excel_file": "urls.xlsx"}
+        assert resumed.finished_urls == {REEL.format("AAAAAAAAAAA"), REEL.format("BBBBBBBBBBB")}
+        assert resumed.interrupted_urls == {REEL.format("CCCCCCCCCCC")}
+        assert not resumed.is_finished(REEL.format("DDDDDDDDDDD"))
+        assert journal.load_job("missing") is None
+        [info] = journal.list_jobs()
+        assert (info["done"], info["failed"], info["items"]) == (1, 1, 4)
+
+
+def test_cleanup_only_touches_the_jobs_items(tmp_path):
+    out = str(tmp_path)
+    failed = os.path.join(out, "user", "user_BBBBBBBBBBB.mp4.part")
+    interrupted = os.path.join(out, "user", "user_CCCCCCCCCCC.mp4.part")
+    other_job = os.path.join(out, "other", "other_ZZZZZZZZZZZ.mp4.part")
+    finished = os.path.join(out, "user", "user_BBBBBBBBBBB.mp4")
+    for path in (failed, interrupted, other_job, finished):
+        touch(path)
+
+    removed = cleanup_partial_files(
+        out,
+        [REEL.format("BBBBBBBBBBB"), REEL.format("CCCCCCCCCCC")],
+        [REEL.format("CCCCCCCCCCC")],
+    )
+    assert removed == 1
+    assert not os.path.exists(failed)
+    assert os.path.exists(interrupted)
+    assert os.path.exists(other_job)
+    assert os.path.exists(finished)
+    assert cleanup_partial_files(out, []) == 0
+
+
+def test_resume_restores_archive_dedup_and_report(tmp_path, monkeypatch):
+    out = str(tmp_path)
+    monkeypatch.setattr("sys.argv", [
+        "igdl", "--excel", "urls.xlsx", "-o", out, "--archive", "--dedup", "symlink", "--report", "r.jsonl",
+    ])
+    args = parse_args()
+    with JobJournal(os.path.join(out, ".jobs.sqlite3")) as journal:
+        job = journal.create_job("excel", {key: getattr(args, key) for key in JOB_PARAM_KEYS})
+
+    monkeypatch.setattr("sys.argv", ["igdl", "-o", out, "--resume", job.id])
+    resumed = parse_args()
+    restore_job_params(resumed)
+    assert resumed.excel_file == "urls.xlsx"
+    assert resumed.archive == ""
+    assert resumed.dedup == "symlink"
+    assert resumed.report == "r.jsonl"
+
+
+def test_rebuild_archive_records_no_job(tmp_path, monkeypatch):
+    out = str(tmp_path)
+    monkeypatch.setattr("sys.argv", ["igdl", "--page", "https://www.instagram.com/someone/", "-o", out, "--rebuild-archive"])
+    run(parse_args())
+    with JobJournal(os.path.join(out, ".jobs.sqlite3")) as journal:
+        assert journal.list_jobs() == []
@@ -0,0 +1,138 @@
+import pytest
+
+from src.pagination import ListingCheckpoint, WindowedProfileListing, iter_entries
+
+
+def videos(*codes):
+    return [{"url": f"https://www.instagram.com/p/{code}/", "id": code} for code in codes]
+
+
+def url(code):
+    return f"https://www.instagram.com/p/{code}/"
+
+
+def test_checkpoint_stays_at_oldest_unsettled_window():
+    saved = []
+    checkpoint = ListingCheckpoint(1, saved.append)
+    checkpoint.listed(1, 2, videos("A", "B"))
+    checkpoint.listed(3, 2, videos("C", "D"))
+    for code in ("C", "D", "A"):
+        checkpoint.settled(url(code))
+    # B is still waiting for a retry
+    assert saved == []
+    checkpoint.settled(url("B"))
+    assert saved == [5]
+
+
+def test_checkpoint_clears_once_complete_and_settled():
+    saved = []
+    checkpoint = ListingCheckpoint(1, saved.append)
+    checkpoint.listed(1, 2, videos("A", "B"))
+    checkpoint.settled(url("A"))
+    checkpoint.complete()
+    assert saved == []
+    checkpoint.settled(url("B"))
+    assert saved == [None]
+
+
+def test_checkpoint_counts_repeated_urls():
+    saved = []
+    checkpoint = ListingCheckpoint(1, saved.append)
+    checkpoint.listed(1, 2, videos("A", "A"))
+    checkpoint.settled(url("A"))
+    assert saved == []
+    checkpoint.settled(url("A"))
+    assert saved == [3]
+
+
+class FakeListing(WindowedProfileListing):
+    def __init__(self, posts, fail_at=None, **kwargs):
+        super().__init__("https://www.instagram.com/profileuser/", window_size=2, **kwargs)
+        self.posts = posts
+        self.fail_at = fail_at
+
+    def entries(self):
+        for index, post in enumerate(self.posts[self.start - 1:], self.start):
+            if index == self.fail_at:
+                raise RuntimeError("HTTP Error 503")
+            yield post
+
+
+def test_windows_are_reported_before_their_posts():
+    saved = []
+    checkpoint = ListingCheckpoint(1, saved.append)
+    listing = FakeListing(videos("A", "B", "C"), checkpoint=checkpoint)
+    held = []
+    for video_info in listing:
+        # Nothing moves past a post the consumer is still holding
+        held.append(list(saved))
+        checkpoint.settled(video_info["url"])
+    assert held == [[], [], [3]]
+    assert listing.complete
+    assert saved == [3, 5, None]
+
+
+def test_failed_listing_resumes_at_unlisted_window():
+    saved = []
+    checkpoint = ListingCheckpoint(1, saved.append)
+    listing = FakeListing(videos("A", "B", "C"), fail_at=3, checkpoint=checkpoint)
+    for video_info in listing:
+        checkpoint.settled(video_info["url"])
+    assert listing.error is not None
+    assert saved == [3]
+
+
+def test_listing_stops_at_max_videos():
+    saved = []
+    checkpoint = ListingCheckpoint(1, saved.append)
+    listing = FakeListing(videos("A", "B", "C", "D"), max_videos=3, checkpoint=checkpoint)
+    listed = [video_info["id"] for video_info in listing]
+    assert listed == ["A", "B", "C"]
+    assert listing.complete and listing.windows == 2
+
+
+class PagedEntries:
+    def __init__(self, entries):
+        self.entries = entries
+        self.slices = []
+
+    def getslice(self, start, end):
+        self.slices.append(start)
+        return self.entries[start:end]
+
+
+def test_iter_entries_skips_to_the_start():
+    assert list(iter_entries(iter(range(10)), 7)) == [7, 8, 9]
+    paged = PagedEntries(list(range(120)))
+    assert list(iter_entries(paged, 100)) == list(range(100, 120))
+    # Paged lists are addressed directly, without the pages before the start
+    assert paged.slices == [100, 120]
+
+
+def test_interrupted_consumer_keeps_window():
+    saved = []
+    checkpoint = ListingCheckpoint(3, saved.append)
+    listing = FakeListing(videos("A", "B", "C", "D", "E", "F"), start=3, checkpoint=checkpoint)
+    iterator = iter(listing)
+    checkpoint.settled(next(iterator)["url"])
+    iterator.close()
+    assert saved == []
+
+
+def test_filtered_out_posts_settle():
+    from src.metadata import MetadataFilter
+
+    pytest.importorskip("pandas")
+    saved = []
+    checkpoint = ListingCheckpoint(1, saved.append)
+    listed = videos("A", "B")
+    listed[0]["duration"], listed[1]["duration"] = 10, 100
+    checkpoint.listed(1, 2, listed)
+
+    def settle(video):
+        checkpoint.settled(video["url"])
+
+    matched = list(MetadataFilter("duration < 60").filter(listed, on_reject=settle))
+    assert [video["id"] for video in matched] == ["A"]
+    checkpoint.settled(url("A"))
+    assert saved == [3]
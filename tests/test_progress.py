@@ -0,0 +1,51 @@
+from src.progress import ProgressTracker, format_bytes, format_eta
+
+POST = "https://www.instagram.com/reel/ABC/"
+
+
+def status(state, format_id, downloaded, total=None, speed=None):
+    return {
+        "status": state,
+        "info_dict": {"webpage_url": POST, "id": "ABC", "title": "clip", "format_id": format_id},
+        "downloaded_bytes": downloaded,
+        "total_bytes": total,
+        "speed": speed,
+    }
+
+
+def test_updates_coalesce_per_task():
+    tracker = ProgressTracker()
+    for downloaded in (100, 200, 300):
+        tracker.hook(status("downloading", "720p", downloaded, 1000, 50.0))
+    [task] = tracker.drain()
+    assert task["downloaded"] == 300 and task["percent"] == 30.0
+    assert tracker.drain() == []
+
+
+def test_separate_streams_add_up():
+    tracker = ProgressTracker()
+    tracker.hook(status("downloading", "video", 800, 800))
+    tracker.hook(status("finished", "video", 800, 800))
+    tracker.hook(status("downloading", "audio", 100, 200, 10.0))
+    [task] = tracker.drain()
+    assert task["downloaded"] == 900
+    assert task["total"] == 1000
+    assert task["state"] == "downloading"
+    assert tracker.totals() == {"active": 1, "speed": 10.0, "eta": 10.0}
+
+
+def test_forget_finished():
+    tracker = ProgressTracker()
+    tracker.hook(status("finished", "720p", 1000, 1000))
+    tracker.forget_finished()
+    assert tracker.drain() == []
+    assert tracker.totals()["active"] == 0
+
+
+def test_formatting():
+    assert format_bytes(None) == "-"
+    assert format_bytes(512) == "512 B"
+    assert format_bytes(1.5 * 1024 * 1024) == "1.5 MB"
+    assert format_eta(None) == "-"
+    assert format_eta(75) == "1:15"
+    assert format_eta(3700) == "1h01m"
@@ -0,0 +1,45 @@
+import urllib.request
+
+from src.ratelimit import AdaptiveRateLimiter, install_rate_limiter, is_media_request, is_throttle_error
+
+
+class FakeYDL:
+    def __init__(self, error=None):
+        self.error = error
+        self.opened = []
+
+    def urlopen(self, req):
+        self.opened.append(req)
+        if self.error is not None:
+            raise self.error
+        return "response"
+
+
+def test_media_requests():
+    assert is_media_request("https://scontent-ams2-1.cdninstagram.com/v/t50/video.mp4?x=1")
+    assert is_media_request(urllib.request.Request("https://video.xx.fbcdn.net/v/frag1.m4s"))
+    assert not is_media_request("https://www.instagram.com/api/v1/media/1/info/")
+    assert not is_media_request("https://evilcdninstagram.com/x")
+
+
+def test_media_downloads_take_no_tokens():
+    limiter = AdaptiveRateLimiter(rate=1, burst=1)
+    ydl = FakeYDL()
+    install_rate_limiter(ydl, limiter)
+    for _ in range(20):
+        assert ydl.urlopen("https://scontent.cdninstagram.com/video.mp4") == "response"
+    assert limiter.requests == 0
+    ydl.urlopen("https://www.instagram.com/p/ABC/")
+    assert limiter.requests == 1
+
+
+def test_media_throttling_slows_the_limiter():
+    limiter = AdaptiveRateLimiter(rate=2, backoff=0.01)
+    ydl = FakeYDL(Exception("HTTP Error 429: Too Many Requests"))
+    install_rate_limiter(ydl, limiter)
+    try:
+        ydl.urlopen("https://scontent.cdninstagram.com/video.mp4")
+    except Exception as e:
+        assert is_throttle_error(e)
+    assert limiter.throttle_events == 1
+    assert limiter.rate == 1
@@ -0,0 +1,109 @@
+import socket
+
+import pytest
+
+from src import downloader
+from src.aio import DownloadCancelled
+from src.retry import AUTH, PERMANENT, TRANSIENT, RetryQueue, classify_failure, reraise_interrupt
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message="HTTP error"):
+        super().__init__(message)
+        self.status = status
+
+
+class DownloadError(Exception):
+    """Shaped like yt-dlp's: the original error in `exc_info`."""
+
+    def __init__(self, message, cause=None):
+        super().__init__(message)
+        self.exc_info = (type(cause), cause, None) if cause is not None else None
+
+
+@pytest.mark.parametrize("error, expected", [
+    (HTTPError(404), PERMANENT),
+    (HTTPError(410), PERMANENT),
+    (HTTPError(401), AUTH),
+    (HTTPError(403), AUTH),
+    (HTTPError(429), TRANSIENT),
+    (HTTPError(503), TRANSIENT),
+    (HTTPError(599), TRANSIENT),
+    (DownloadError("ERROR: wrapped", HTTPError(404)), PERMANENT),
+    (DownloadError("ERROR: wrapped", socket.timeout("timed out")), TRANSIENT),
+    (ConnectionResetError("reset"), TRANSIENT),
+    (DownloadError("ERROR: [Instagram] abc: Unsupported URL: https://example.com"), PERMANENT),
+    (DownloadError("ERROR: This video has been removed"), PERMANENT),
+    (DownloadError("ERROR: There is no video in this post"), PERMANENT),
+    (DownloadError("ERROR: This content is only available for registered users"), AUTH),
+    (DownloadError("ERROR: Requested content is not available, private account"), AUTH),
+    (DownloadError("ERROR: Remote end closed connection without response"), TRANSIENT),
+    (DownloadError("download stalled: no data for 60s at 40%"), TRANSIENT),
+    ("Service Unavailable", TRANSIENT),
+    (DownloadError("something nobody has seen before"), TRANSIENT),
+    (None, TRANSIENT),
+])
+def test_classify_failure(error, expected):
+    assert classify_failure(error) == expected
+
+
+def test_interrupts_are_reraised():
+    reraise_interrupt(None)
+    reraise_interrupt(ValueError("an item failure"))
+    for interrupt in (DownloadCancelled("job"), KeyboardInterrupt()):
+        with pytest.raises(type(interrupt)):
+            reraise_interrupt(interrupt)
+
+
+def test_defer_respects_class_and_attempts():
+    retries = RetryQueue(max_attempts=3, base_delay=10.0)
+    assert retries.defer("a", "a", PERMANENT) is None
+    assert retries.defer("a", "a", AUTH) is None
+    assert 5.0 <= retries.defer("a", "a", TRANSIENT) <= 15.0
+    assert retries.attempts("a") == 2
+    assert 10.0 <= retries.defer("a", "a", TRANSIENT) <= 30.0
+    assert retries.defer("a", "a", TRANSIENT) is None
+    assert len(retries) == 2 and retries.deferred == 2
+    assert RetryQueue(retry_auth=True).defer("b", "b", AUTH) is not None
+
+
+def test_due_retries_are_interleaved_and_drained():
+    retries = RetryQueue(base_delay=0.0)
+    retries.defer("x", "x", TRANSIENT)
+    assert list(retries.interleave(["a", "b"])) == ["x", "a", "b"]
+    retries.defer("y", "y", TRANSIENT)
+    assert list(retries.drain()) == ["y"]
+    assert len(retries) == 0
+
+
+class CancelledSession:
+    downloads = []
+
+    def __init__(self, *args, **kwargs):
+        self.last_info = self.last_filepath = self.last_merge = self.last_error = None
+        self.last_duration = 0.0
+        self.last_skipped = False
+
+    def open(self):
+        return self
+
+    def download(self, url):
+        CancelledSession.downloads.append(url)
+        raise DownloadCancelled("job")
+
+    def close(self):
+        pass
+
+
+@pytest.mark.parametrize("jobs", [1, 3])
+def test_cancelled_batch_stops_instead_of_retrying(tmp_path, monkeypatch, jobs):
+    monkeypatch.setattr(downloader, "DownloadSession", CancelledSession)
+    monkeypatch.setattr(downloader, "open_merge_pool", lambda: None)
+    CancelledSession.downloads = []
+    source = tmp_path / "urls.txt"
+    source.write_text("".join(f"https://www.instagram.com/reel/C{i:010d}/\n" for i in range(20)))
+    with pytest.raises(DownloadCancelled):
+        downloader.download_videos_from_excel(str(source), str(tmp_path / "out"), None, jobs=jobs)
+    # Only the downloads already running when the job was cancelled; nothing deferred or retried
+    assert 1 <= len(CancelledSession.downloads) <= jobs
+    assert len(set(CancelledSession.downloads)) == len(CancelledSession.downloads)
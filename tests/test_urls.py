@@ -0,0 +1,140 @@
+import pytest
+
+from src.urls import (
+    POST,
+    PROFILE,
+    STORY,
+    UrlDeduplicator,
+    canonical_url,
+    extract_post_shortcode,
+    extract_profile_username,
+    parse_instagram_url,
+)
+
+CODE = "C1a2B3c4D5e"
+
+# (input, kind, key, canonical URL)
+URL_SHAPES = [
+    # Posts, reels and IGTV
+    (f"https://www.instagram.com/p/{CODE}/", POST, CODE, f"https://www.instagram.com/p/{CODE}/"),
+    (f"https://www.instagram.com/reel/{CODE}/", POST, CODE, f"https://www.instagram.com/reel/{CODE}/"),
+    (f"https://www.instagram.com/reels/{CODE}/", POST, CODE, f"https://www.instagram.com/reel/{CODE}/"),
+    (f"https://www.instagram.com/tv/{CODE}/", POST, CODE, f"https://www.instagram.com/tv/{CODE}/"),
+    (f"https://www.instagram.com/REEL/{CODE}/", POST, CODE, f"https://www.instagram.com/reel/{CODE}/"),
+    (f"https://www.instagram.com/someuser/p/{CODE}/", POST, CODE, f"https://www.instagram.com/p/{CODE}/"),
+    (f"https://www.instagram.com/someuser/reel/{CODE}/", POST, CODE, f"https://www.instagram.com/reel/{CODE}/"),
+    (f"https://www.instagram.com/p/{CODE}-_x/", POST, f"{CODE}-_x", f"https://www.instagram.com/p/{CODE}-_x/"),
+    # Query strings and fragments
+    (f"https://www.instagram.com/reel/{CODE}/?igsh=MWQ1ZGUxMzBkMA==", POST, CODE,
+     f"https://www.instagram.com/reel/{CODE}/"),
+    (f"https://www.instagram.com/p/{CODE}/?utm_source=ig_web_copy_link&img_index=2", POST, CODE,
+     f"https://www.instagram.com/p/{CODE}/"),
+    (f"https://www.instagram.com/p/{CODE}/#comments", POST, CODE, f"https://www.instagram.com/p/{CODE}/"),
+    (f"https://www.instagram.com/p/{CODE}?hl=en#top", POST, CODE, f"https://www.instagram.com/p/{CODE}/"),
+    # Trailing and repeated slashes, sub-pages
+    (f"https://www.instagram.com/p/{CODE}", POST, CODE, f"https://www.instagram.com/p/{CODE}/"),
+    (f"https://www.instagram.com//p//{CODE}///", POST, CODE, f"https://www.instagram.com/p/{CODE}/"),
+    (f"https://www.instagram.com/p/{CODE}/embed/captioned/", POST, CODE, f"https://www.instagram.com/p/{CODE}/"),
+    (f"https://www.instagram.com/p/{CODE}/liked_by/", POST, CODE, f"https://www.instagram.com/p/{CODE}/"),
+    # Hosts and schemes
+    (f"http://instagram.com/p/{CODE}/", POST, CODE, f"https://www.instagram.com/p/{CODE}/"),
+    (f"https://m.instagram.com/reel/{CODE}/", POST, CODE, f"https://www.instagram.com/reel/{CODE}/"),
+    (f"https://WWW.Instagram.COM/p/{CODE}/", POST, CODE, f"https://www.instagram.com/p/{CODE}/"),
+    (f"https://instagr.am/p/{CODE}/", POST, CODE, f"https://www.instagram.com/p/{CODE}/"),
+    (f"https://www.instagram.com:443/p/{CODE}/", POST, CODE, f"https://www.instagram.com/p/{CODE}/"),
+    (f"www.instagram.com/p/{CODE}/", POST, CODE, f"https://www.instagram.com/p/{CODE}/"),
+    (f"instagram.com/reel/{CODE}", POST, CODE, f"https://www.instagram.com/reel/{CODE}/"),
+    (f"//www.instagram.com/p/{CODE}/", POST, CODE, f"https://www.instagram.com/p/{CODE}/"),
+    (f"  https://www.instagram.com/p/{CODE}/\n", POST, CODE, f"https://www.instagram.com/p/{CODE}/"),
+    # Profiles
+    ("https://www.instagram.com/SomeUser/", PROFILE, "someuser", "https://www.instagram.com/someuser/"),
+    ("https://www.instagram.com/some.user_1", PROFILE, "some.user_1", "https://www.instagram.com/some.user_1/"),
+    ("https://www.instagram.com/someuser/?hl=en", PROFILE, "someuser", "https://www.instagram.com/someuser/"),
+    ("https://www.instagram.com/someuser/reels/", PROFILE, "someuser", "https://www.instagram.com/someuser/"),
+    ("https://www.instagram.com/someuser/tagged/", PROFILE, "someuser", "https://www.instagram.com/someuser/"),
+    ("https://m.instagram.com/someuser", PROFILE, "someuser", "https://www.instagram.com/someuser/"),
+    ("https://www.instagram.com/@someuser", PROFILE, "someuser", "https://www.instagram.com/someuser/"),
+    ("instagram.com/someuser", PROFILE, "someuser", "https://www.instagram.com/someuser/"),
+    ("@SomeUser", PROFILE, "someuser", "https://www.instagram.com/someuser/"),
+    # Stories
+    ("https://www.instagram.com/stories/SomeUser/3141592653589793238/", STORY, "3141592653589793238",
+     "https://www.instagram.com/stories/someuser/3141592653589793238/"),
+    ("https://www.instagram.com/stories/someuser/3141592653589793238?utm_source=ig_story_item_share", STORY,
+     "3141592653589793238", "https://www.instagram.com/stories/someuser/3141592653589793238/"),
+]
+
+# Not a post, profile or story: passed through unchanged
+INVALID = [
+    "",
+    "   ",
+    "not a url",
+    "@",
+    "@bad name",
+    "https://www.instagram.com/",
+    "https://www.instagram.com/explore/",
+    "https://www.instagram.com/explore/tags/cats/",
+    "https://www.instagram.com/accounts/login/?next=/p/C1a2B3c4D5e/",
+    "https://www.instagram.com/direct/inbox/",
+    "https://www.instagram.com/p/",
+    "https://www.instagram.com/reel/abc/",
+    "https://www.instagram.com/p/bad*code!/",
+    "https://www.instagram.com/stories/someuser/",
+    "https://www.instagram.com/stories/highlights/17890000000000000/",
+    "https://www.instagram.com/this.name.is.much.too.long.for.instagram/",
+    # Share links carry a token that only resolves by redirect, not the shortcode
+    "https://www.instagram.com/share/reel/BAq9Xz3kL1/",
+    "https://www.instagram.com/share/p/BAq9Xz3kL1/",
+    "https://www.instagram.com/share/BAq9Xz3kL1/",
+    "https://www.instagram.com/s/aGlnaGxpZ2h0OjE3ODk=/",
+    # Look-alike and other hosts
+    f"https://www.instagram.com.evil.example/p/{CODE}/",
+    f"https://notinstagram.com/p/{CODE}/",
+    f"https://www.youtube.com/watch?v={CODE}",
+    f"https://instagram.com@evil.example/p/{CODE}/",
+    f"ftp://evil.example/www.instagram.com/p/{CODE}/",
+]
+
+
+@pytest.mark.parametrize("url, kind, key, canonical", URL_SHAPES)
+def test_url_shapes(url, kind, key, canonical):
+    parsed = parse_instagram_url(url)
+    assert parsed is not None, url
+    assert (parsed.kind, parsed.key, parsed.url) == (kind, key, canonical)
+    assert canonical_url(url) == canonical
+    # Canonical URLs are fixed points
+    assert parse_instagram_url(canonical) == parsed
+
+
+@pytest.mark.parametrize("url", INVALID)
+def test_invalid_urls_pass_through(url):
+    assert parse_instagram_url(url) is None
+    assert canonical_url(url) == url.strip()
+    assert extract_post_shortcode(url) is None
+
+
+def test_extractors():
+    assert extract_post_shortcode(f"https://instagram.com/reel/{CODE}?igsh=x") == CODE
+    assert extract_post_shortcode("https://instagram.com/someuser/") is None
+    assert extract_profile_username("https://instagram.com/SomeUser/") == "someuser"
+    assert extract_profile_username(f"https://instagram.com/p/{CODE}/") is None
+
+
+def test_deduplicator_collapses_variants():
+    dedup = UrlDeduplicator()
+    urls = [
+        f"https://www.instagram.com/p/{CODE}/",
+        f"https://instagram.com/reel/{CODE}?igsh=abc",
+        f"m.instagram.com/p/{CODE}",
+        "https://www.instagram.com/SomeUser/",
+        "@someuser",
+        "https://example.com/video.mp4",
+        "https://example.com/video.mp4",
+        "https://example.com/video.mp4?x=1",
+    ]
+    assert list(dedup.filter(urls)) == [
+        f"https://www.instagram.com/p/{CODE}/",
+        "https://www.instagram.com/someuser/",
+        "https://example.com/video.mp4",
+        "https://example.com/video.mp4?x=1",
+    ]
+    assert dedup.duplicates == 4
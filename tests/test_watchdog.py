@@ -0,0 +1,85 @@
+import socket
+
+import pytest
+
+from src import watchdog
+from src.watchdog import SPEED_WINDOW, DownloadStalled, StallWatchdog, is_stall_error
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(watchdog.time, "monotonic", clock)
+    return clock
+
+
+def progress(downloaded, path="video.part"):
+    return {"status": "downloading", "tmpfilename": path, "downloaded_bytes": downloaded, "total_bytes": 100000}
+
+
+def feed(dog, clock, seconds, rate, downloaded=0):
+    """Report one callback per second at `rate` bytes/s; returns the bytes reached."""
+    for _ in range(seconds):
+        clock.now += 1
+        downloaded += rate
+        dog.on_progress(progress(downloaded))
+    return downloaded
+
+
+def test_crawling_transfer_is_aborted(clock):
+    dog = StallWatchdog(min_speed=1024)
+    dog.on_progress(progress(0))
+    with pytest.raises(DownloadStalled, match="KB/s"):
+        feed(dog, clock, int(SPEED_WINDOW) + 1, 100)
+
+
+def test_fast_transfer_is_not_aborted(clock):
+    dog = StallWatchdog(min_speed=1024)
+    dog.on_progress(progress(0))
+    feed(dog, clock, int(SPEED_WINDOW) * 2, 4096)
+
+
+def test_throttled_time_does_not_count(clock):
+    dog = StallWatchdog(min_speed=1024)
+    dog.on_progress(progress(0))
+    downloaded = 0
+    for _ in range(int(SPEED_WINDOW) * 2):
+        # Two of every three seconds are spent waiting on the bandwidth governor
+        clock.now += 3
+        dog.throttled(2)
+        downloaded += 1024 + 100
+        dog.on_progress(progress(downloaded))
+
+
+def test_minimum_speed_off(clock):
+    dog = StallWatchdog(min_speed=0)
+    dog.on_progress(progress(0))
+    feed(dog, clock, int(SPEED_WINDOW) * 2, 0)
+
+
+def test_new_file_restarts_the_window(clock):
+    dog = StallWatchdog(min_speed=1024)
+    dog.on_progress(progress(0))
+    feed(dog, clock, int(SPEED_WINDOW) - 5, 100)
+    dog.on_progress(progress(0, path="audio.part"))
+    clock.now += 10
+    dog.on_progress(progress(100, path="audio.part"))
+
+
+def test_is_stall_error():
+    assert is_stall_error(DownloadStalled("download stalled"))
+    assert is_stall_error(socket.timeout())
+    assert is_stall_error(Exception("ERROR: Read timed out"))
+    wrapped = Exception("ERROR: download failed")
+    wrapped.exc_info = (DownloadStalled, DownloadStalled("x"), None)
+    assert is_stall_error(wrapped)
+    assert not is_stall_error(Exception("HTTP Error 404: Not Found"))
+    assert not is_stall_error(None)